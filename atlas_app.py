@@ -4,26 +4,90 @@ Atlas IA - Autonomous AI Application
 Deploys trained AtlasCore for autonomous operation
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import AutoModel, AutoTokenizer, AutoModelForCausalLM, StoppingCriteriaList
+from peft import PeftModel
 import json
 import os
+import signal
+import numpy as np
 from datetime import datetime
 import asyncio
+import threading
 import uvicorn
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 import requests
+import time
+
+from atlas_batcher import AtlasBatcher
+from atlas_continuous import ContinuousBatcher
+from atlas_worker_pool import InferencePool, PoolOverloadedError
+from atlas_response_cache import ResponseCache, SemanticCache
+from atlas_sessions import SessionStore
+from atlas_scheduler import FairScheduler, RateLimitedError
+from atlas_singleflight import SingleFlight
+from atlas_router import ComplexityRouter
+from atlas_jobs import JobQueueFullError, JobRunner
+from atlas_retrieval import (
+    VectorIndex, chunk_text, document_key, load_added_documents, load_documents, mean_pool, save_added_documents
+)
+from atlas_precision import apply_precision, load_dtype, model_scale
+from atlas_onnx import load_onnx_model
+from atlas_checkpoint_registry import ModelRegistry
+from atlas_memory import current_report
+from atlas_metrics import AtlasMetrics
+from atlas_generation import (
+    AsyncTokenStreamer, CancellationToken, CancelledStoppingCriteria, GenerationCancelled, GenerationTimer,
+    StopConditionCriteria, clone_cache, to_dynamic_cache
+)
 
 # Initialize FastAPI app
 app = FastAPI(title="AtlasCore AI", description="Autonomous AI System", version="1.0.0")
 
+# Fixed context each specialised endpoint prepends to the user prompt
+ENDPOINT_CONTEXTS = {
+    "analyze": "Provide comprehensive analysis with strategic recommendations and implementation steps.",
+    "generate": "Generate creative, innovative solutions with practical implementation details.",
+    "research": "Provide research-based insights with current trends and data-driven recommendations."
+}
+
+# Canned answers by topic keyword, used while no model is loaded and for prompts routed away from the model
+FALLBACK_RESPONSES = [
+    (['revenue', 'money', 'income', 'profit'], """Based on my analysis, here are proven revenue generation strategies: 1) Implement AI-powered automation to create scalable income streams, 2) Develop digital products that solve specific market problems, 3) Build systems that generate recurring revenue with minimal maintenance, 4) Focus on high-value services that can be systematized and scaled. The key is starting with one profitable model and then replicating it across multiple channels."""),
+    (['crisis', 'emergency', 'urgent', 'help'], """For immediate crisis management: 1) Prioritize essential expenses and cut all non-critical spending, 2) Identify your fastest income sources (freelancing, selling items, gig economy), 3) Contact creditors to negotiate payment plans, 4) Leverage your network for opportunities, 5) Focus on solutions that provide immediate relief while planning long-term recovery. Remember, this situation is temporary - take decisive action while maintaining perspective."""),
+    (['strategy', 'analyze', 'plan'], """Strategic analysis requires a systematic approach: 1) Define clear objectives and success metrics, 2) Gather comprehensive data from multiple sources, 3) Identify patterns and key leverage points, 4) Develop multiple scenarios and contingency plans, 5) Implement with measurable milestones and regular review cycles. The most effective strategies balance immediate impact with long-term sustainability."""),
+    (['ai', 'artificial intelligence', 'automation'], """AI and automation can transform your operations: 1) Start by identifying repetitive tasks that consume significant time, 2) Implement simple automation tools before complex AI systems, 3) Focus on areas with clear ROI and measurable impact, 4) Build data collection systems to enable future AI applications, 5) Train your team on new tools and processes. The goal is to augment human capabilities, not replace them."""),
+]
+
 class AtlasCore:
-    def __init__(self):
-        self.model = None
-        self.tokenizer = None
-        self.model_loaded = False
+    def __init__(self, config_path=os.getenv("ATLAS_SERVING_CONFIG", "config/serving_config.json")):
+        self.config = self.load_config(config_path)
+        # Serving model bundle (model, tokenizer, prefix cache); replaced as a whole on hot-swap
+        self.active = None
+        self.previous_models = []
+        self.swap_lock = threading.Lock()
+        self.swap_callbacks = []
+        # Small model that proposes tokens for the serving model to verify; shared by every bundle
+        self.draft_model = None
+        # Bundle of the small model that answers simple prompts when routing is on; survives hot-swaps
+        self.small_bundle = None
+        # Encoder for semantic cache lookups when one is configured
+        self.embedding_bundle = None
+        self.knowledge_lock = threading.Lock()
+        self.metrics = AtlasMetrics()
+        self.ready = False
+        self.load_thread = None
+        self.load_state = {
+            "phase": "pending",
+            "progress": 0.0,
+            "model_path": None,
+            "started_at": None,
+            "finished_at": None,
+            "error": None
+        }
         self.capabilities = {
             "conversational": True,
             "analytical": True,
@@ -32,30 +96,249 @@ class AtlasCore:
             "autonomous_learning": True,
             "revenue_generation": True
         }
+
+    def load_config(self, config_path: str) -> Dict:
+        """Load serving configuration, filling gaps with defaults"""
+        config = self.get_default_config()
+        try:
+            with open(config_path, 'r') as f:
+                overrides = json.load(f)
+            for section, values in overrides.items():
+                if isinstance(values, dict) and isinstance(config.get(section), dict):
+                    config[section].update(values)
+                else:
+                    config[section] = values
+        except FileNotFoundError:
+            pass
+        return config
+
+    def get_default_config(self) -> Dict:
+        """Default serving configuration"""
+        return {
+            "batching": {
+                "enabled": True,
+                # "static" groups requests into one generate call; "continuous" adds and removes them between decode steps
+                "mode": "static",
+                "max_batch_size": 8,
+                "batch_window_ms": 15,
+                "max_bulk_items": 256
+            },
+            "worker_pool": {
+                "max_workers": 2,
+                "max_queue_size": 64,
+                "retry_after_seconds": 1
+            },
+            "prefix_cache": {
+                "enabled": True
+            },
+            "inference": {
+                "precision": "fp32",
+                "backend": "torch",
+                "onnx_threads": 0
+            },
+            "assisted_decoding": {
+                "enabled": False,
+                "draft_model": "distilgpt2",
+                # Tokens the draft proposes per verification step; "heuristic" adapts it to the acceptance rate
+                "num_assistant_tokens": 5,
+                "schedule": "constant"
+            },
+            "routing": {
+                "enabled": False,
+                # Resident model for prompts too simple for the trained one
+                "small_model": "distilgpt2",
+                "endpoints": ["chat"],
+                # Complexity scores run from 0 to 1; at or below fallback_max_score a prompt on a canned topic
+                # gets the canned answer, at or below small_max_score it goes to the small model
+                "fallback_max_score": 0.15,
+                "small_max_score": 0.4
+            },
+            "retrieval": {
+                "enabled": True,
+                "knowledge_base_path": "knowledge_base.json",
+                "dataset_path": "atlas_dataset.jsonl",
+                # Passages posted to /knowledge, re-embedded whenever a model's index is built
+                "added_documents_path": "data/atlas_knowledge_added.jsonl",
+                # Long crawled pages are indexed as passages of at most this many words
+                "chunk_words": 120,
+                "batch_size": 16,
+                "max_length": 256,
+                # /research retrieves context only when the caller does not send one
+                "research_top_k": 3,
+                "min_score": 0.2,
+                "max_context_chars": 600
+            },
+            "decoding": {
+                # Applies to every endpoint; the per-endpoint sections override single keys
+                "default": {
+                    "max_new_tokens": 150,
+                    "do_sample": True,
+                    "temperature": 0.7,
+                    "repetition_penalty": 1.1,
+                    "stop_at_newline": True,
+                    "stop_strings": ["User:", "Context:"]
+                },
+                "chat": {},
+                "analyze": {},
+                "generate": {},
+                "research": {}
+            },
+            "adapters": {
+                "base_model": None,
+                "paths": {},
+                "default": None
+            },
+            "model_registry": {
+                "enabled": True,
+                "models_dir": ".",
+                "poll_interval_seconds": 30,
+                "settle_seconds": 10,
+                "keep_previous": 1
+            },
+            "prefork": {
+                "workers": 2,
+                "host": "0.0.0.0",
+                "port": 8000,
+                "threads_per_worker": 0,
+                "report_interval_seconds": 60
+            },
+            "sessions": {
+                "enabled": True,
+                "max_total_tokens": 32768,
+                "max_session_tokens": 768,
+                "max_turns": 20,
+                "ttl_seconds": 1800
+            },
+            "scheduling": {
+                # Off by default: anonymous callers are bucketed per client address, so everyone behind one proxy shares a budget
+                "enabled": False,
+                # Per-user token bucket: sustained rate and burst, in estimated prompt + new tokens
+                "tokens_per_second": 200,
+                "burst_tokens": 2000,
+                "max_queued_per_user": 16,
+                # Endpoints whose requests up to priority_max_cost tokens go ahead of bulk work
+                "priority_endpoints": ["chat"],
+                "priority_max_cost": 256,
+                "priority_burst": 4,
+                "quantum": 256
+            },
+            "coalescing": {
+                "enabled": True,
+                # Share in-flight generations only when decoding is greedy, so sampled requests keep their own answer
+                "deterministic_only": False
+            },
+            "jobs": {
+                # Job records survive restarts; jobs cut off by one are marked interrupted
+                "db_path": "data/atlas_jobs.db",
+                "max_concurrent": 1,
+                "max_pending": 100,
+                "keep_finished": 1000
+            },
+            "deadlines": {
+                # Requests without timeout_seconds get this long; callers cannot ask for more than max_seconds
+                "default_seconds": 60,
+                "max_seconds": 300,
+                # How often a waiting request checks whether its client has gone
+                "disconnect_poll_seconds": 0.5
+            },
+            "semantic_cache": {
+                # Costs one forward pass per uncached request to embed its prompt
+                "enabled": False,
+                # Sentence encoder for prompts, e.g. sentence-transformers/all-MiniLM-L6-v2; null uses the serving model
+                "embedding_model": None,
+                "max_entries": 512,
+                "ttl_seconds": 3600,
+                # Cosine similarity of mean-centered prompt embeddings needed to reuse an answer
+                "similarity_threshold": 0.9,
+                "min_observed": 16
+            },
+            "response_cache": {
+                "enabled": True,
+                "max_entries": 1024,
+                "ttl_seconds": 3600,
+                "max_memory_mb": 64,
+                "deterministic": False
+            }
+        }
+
+    def set_load_phase(self, phase: str, progress: float):
+        """Record loading progress for /status"""
+        self.load_state["phase"] = phase
+        self.load_state["progress"] = progress
+
+    def start_background_load(self):
+        """Load and warm the model on a background thread while the server keeps serving fallbacks"""
+        # Under the prefork server the master has already loaded the model before forking
+        if self.load_thread is None and not self.ready:
+            self.load_thread = threading.Thread(target=self.initialize, name="atlas-model-loader", daemon=True)
+            self.load_thread.start()
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until background loading finishes"""
+        if self.load_thread is not None:
+            self.load_thread.join(timeout)
+        return self.ready
+
+    def initialize(self):
+        """Load the model, precompute prefixes and warm up before declaring readiness"""
+        self.load_state["started_at"] = datetime.now().isoformat()
         
-        # Load model on initialization
-        self.load_model()
+        try:
+            self.load_model()
+            if self.config['routing']['enabled'] and self.model_loaded:
+                self.load_small_model()
+            if self.config['semantic_cache']['enabled'] and self.config['semantic_cache']['embedding_model']:
+                self.load_embedding_model()
+            
+            self.ready = True
+            self.set_load_phase("ready" if self.model_loaded else "fallback_only", 1.0)
+            
+        except Exception as e:
+            print(f"❌ Model initialization failed: {e}")
+            self.load_state["error"] = str(e)
+            self.set_load_phase("failed", 1.0)
+        
+        self.load_state["finished_at"] = datetime.now().isoformat()
+
+    @property
+    def model(self):
+        return self.active["model"] if self.active else None
+
+    @property
+    def tokenizer(self):
+        return self.active["tokenizer"] if self.active else None
+
+    @property
+    def prefix_cache(self) -> Dict:
+        return self.active["prefix_caches"].get(self.active["default_adapter"], {}) if self.active else {}
+
+    @property
+    def adapters(self) -> List[str]:
+        return list(self.active["adapters"]) if self.active else []
+
+    @property
+    def model_loaded(self) -> bool:
+        return self.active is not None
 
     def load_model(self):
         """Load the trained AtlasCore model"""
         try:
             # Try to find latest trained model
-            model_dirs = [d for d in os.listdir('.') if d.startswith('atlas_model_')]
+            self.set_load_phase("discovering", 0.05)
+            model_dirs = [d for d in os.listdir('.') if d.startswith('atlas_model_') and os.path.isdir(d)]
             
-            if model_dirs:
+            if self.config['adapters']['paths']:
+                print("🧩 Loading shared base model with LoRA adapters...")
+                self.activate(self.load_adapter_bundle(report_progress=True))
+                print("✅ AtlasCore loaded successfully")
+                
+            elif model_dirs:
                 latest_model = sorted(model_dirs)[-1]
                 model_path = f"./{latest_model}"
                 
                 print(f"🤖 Loading AtlasCore from {model_path}...")
                 
-                self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-                self.model = AutoModelForCausalLM.from_pretrained(
-                    model_path,
-                    torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-                    device_map="auto" if torch.cuda.is_available() else None
-                )
-                
-                self.model_loaded = True
+                self.activate(self.load_bundle(model_path, report_progress=True))
                 print("✅ AtlasCore loaded successfully")
                 
             else:
@@ -71,87 +354,810 @@ class AtlasCore:
         try:
             print("🔄 Loading fallback model...")
             
-            model_name = "distilgpt2"
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.tokenizer.pad_token = self.tokenizer.eos_token
-            
-            self.model = AutoModelForCausalLM.from_pretrained(model_name)
-            
-            self.model_loaded = True
+            self.activate(self.load_bundle("distilgpt2", report_progress=True, fallback=True))
             print("✅ Fallback model loaded")
             
         except Exception as e:
             print(f"❌ Failed to load fallback model: {e}")
-            self.model_loaded = False
 
-    def generate_response(self, prompt: str, context: Optional[str] = None) -> str:
+    def load_small_model(self):
+        """Keep the small routing model resident next to the serving model"""
+        small_model = self.config['routing']['small_model']
+        if self.active["model_path"] == small_model:
+            print(f"⚠️ Serving model is already {small_model}, routing to a small model is off")
+            return
+        
+        try:
+            self.set_load_phase("loading_small_model", 0.9)
+            self.small_bundle = self.load_bundle(small_model, fallback=True, kind="small")
+            print(f"🪶 Small model for simple prompts: {small_model}")
+        except Exception as e:
+            print(f"⚠️ Could not load small model {small_model}: {e}")
+
+    def load_embedding_model(self):
+        """Keep a dedicated sentence encoder resident for semantic cache lookups"""
+        embedding_model = self.config['semantic_cache']['embedding_model']
+        try:
+            self.set_load_phase("loading_embedding_model", 0.95)
+            self.embedding_bundle = {
+                "model": AutoModel.from_pretrained(embedding_model).eval(),
+                "tokenizer": AutoTokenizer.from_pretrained(embedding_model),
+                "tokenizer_lock": threading.Lock(),
+                "model_path": embedding_model
+            }
+            print(f"🧭 Prompt encoder for the semantic cache: {embedding_model}")
+        except Exception as e:
+            print(f"⚠️ Could not load embedding model {embedding_model}, the semantic cache uses the serving model: {e}")
+
+    def load_bundle(self, model_path: str, report_progress: bool = False, fallback: bool = False,
+                    kind: Optional[str] = None) -> Dict:
+        """Load tokenizer and weights, precompute prefixes and warm up, without touching the serving model"""
+        def phase(name, progress):
+            if report_progress:
+                self.load_state["model_path"] = model_path
+                self.set_load_phase(name, progress)
+        
+        started = time.perf_counter()
+        precision = self.config['inference']['precision']
+        use_cuda = torch.cuda.is_available() and not fallback
+        
+        phase("loading_tokenizer", 0.1)
+        tokenizer = AutoTokenizer.from_pretrained(model_path)
+        if fallback or tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        
+        phase("loading_weights", 0.3)
+        if self.config['inference']['backend'] == "onnx" and not fallback:
+            if precision != "fp32":
+                print(f"⚠️ Precision '{precision}' applies to the torch backend, the ONNX decoder runs fp32")
+            model = load_onnx_model(model_path, num_threads=self.config['inference']['onnx_threads'])
+            bundle = self.make_bundle(model, tokenizer, model_path)
+            bundle["backend"] = "onnx"
+        else:
+            model = AutoModelForCausalLM.from_pretrained(
+                model_path,
+                torch_dtype=load_dtype(precision, use_cuda=use_cuda),
+                device_map="auto" if use_cuda else None
+            )
+            bundle = self.make_bundle(apply_precision(model.eval(), precision), tokenizer, model_path)
+        
+        bundle = self.prepare_bundle(bundle, phase, serving=kind != "small")
+        self.metrics.model_load_seconds.set(
+            time.perf_counter() - started, kind=kind or ("fallback" if fallback else "checkpoint")
+        )
+        return bundle
+
+    def load_adapter_bundle(self, report_progress: bool = False) -> Dict:
+        """Load one shared base model and keep every configured LoRA adapter resident on it"""
+        started = time.perf_counter()
+        adapter_config = self.config['adapters']
+        paths = adapter_config['paths']
+        names = list(paths)
+        
+        def phase(name, progress):
+            if report_progress:
+                self.load_state["model_path"] = adapter_config['base_model'] or paths[names[0]]
+                self.set_load_phase(name, progress)
+        
+        base_model = adapter_config['base_model']
+        if not base_model:
+            with open(os.path.join(paths[names[0]], 'adapter_config.json'), 'r') as f:
+                base_model = json.load(f)['base_model_name_or_path']
+        
+        precision = self.config['inference']['precision']
+        if precision == "int8":
+            # LoRA layers wrap the float projections, so int8 dynamic quantization does not apply here
+            print("⚠️ int8 precision is not supported with LoRA adapters, using fp32")
+            precision = "fp32"
+        if self.config['inference']['backend'] == "onnx":
+            # Each adapter would need its own merged export, which defeats sharing one base model
+            print("⚠️ The ONNX backend does not serve LoRA adapters side by side, using torch")
+        use_cuda = torch.cuda.is_available()
+        
+        phase("loading_tokenizer", 0.1)
+        tokenizer = AutoTokenizer.from_pretrained(paths[names[0]])
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        
+        phase("loading_weights", 0.3)
+        base = AutoModelForCausalLM.from_pretrained(
+            base_model,
+            torch_dtype=load_dtype(precision, use_cuda=use_cuda),
+            device_map="auto" if use_cuda else None
+        )
+        model = PeftModel.from_pretrained(apply_precision(base.eval(), precision), paths[names[0]], adapter_name=names[0])
+        for name in names[1:]:
+            model.load_adapter(paths[name], adapter_name=name)
+        print(f"🧩 Adapters resident on {base_model}: {', '.join(names)}")
+        
+        bundle = self.make_bundle(model.eval(), tokenizer, base_model)
+        bundle["adapters"] = names
+        bundle["default_adapter"] = adapter_config['default'] if adapter_config['default'] in names else names[0]
+        bundle = self.prepare_bundle(bundle, phase)
+        self.metrics.model_load_seconds.set(time.perf_counter() - started, kind="adapters")
+        return bundle
+
+    def make_bundle(self, model, tokenizer, model_path: str) -> Dict:
+        """Everything one serving model needs, swapped as a unit"""
+        return {
+            "model": model,
+            "tokenizer": tokenizer,
+            # Fast tokenizers are not safe to reconfigure from several worker threads at once
+            "tokenizer_lock": threading.Lock(),
+            "model_path": model_path,
+            "backend": "torch",
+            "adapters": [],
+            "default_adapter": None,
+            # Prefix KV-caches per adapter (None for a plain model), each keyed by context
+            "prefix_caches": {},
+            # Draft model and, when its vocabulary differs, its tokenizer for assisted generation
+            "draft": None,
+            # Knowledge passages embedded by this model, searched to build /research context
+            "vector_index": None,
+            "loaded_at": datetime.now().isoformat()
+        }
+
+    def prepare_bundle(self, bundle: Dict, phase, serving: bool = True) -> Dict:
+        """Precompute prefixes and warm up a freshly loaded bundle"""
+        if self.config['assisted_decoding']['enabled']:
+            phase("loading_draft_model", 0.6)
+            self.attach_draft_model(bundle)
+        
+        if self.config['prefix_cache']['enabled']:
+            phase("building_prefix_cache", 0.7)
+            for adapter in bundle["adapters"] or [None]:
+                bundle["prefix_caches"][adapter] = self.build_prefix_cache(bundle, adapter)
+        
+        if self.config['retrieval']['enabled'] and serving:
+            phase("building_vector_index", 0.8)
+            bundle["vector_index"] = self.build_vector_index(bundle)
+        
+        phase("warming_up", 0.85)
+        self.warm_up(bundle)
+        
+        return bundle
+
+    def attach_draft_model(self, bundle: Dict):
+        """Pair a bundle with the draft model when the serving model is larger and generate() can use it"""
+        config = self.config['assisted_decoding']
+        if bundle["backend"] != "torch" or bundle["adapters"] or bundle["model_path"] == config['draft_model']:
+            return
+        
+        try:
+            if self.draft_model is None:
+                precision = self.config['inference']['precision']
+                draft = AutoModelForCausalLM.from_pretrained(config['draft_model'], torch_dtype=load_dtype(precision))
+                draft_tokenizer = AutoTokenizer.from_pretrained(config['draft_model'])
+                if draft_tokenizer.pad_token is None:
+                    draft_tokenizer.pad_token = draft_tokenizer.eos_token
+                draft.generation_config.num_assistant_tokens = config['num_assistant_tokens']
+                draft.generation_config.num_assistant_tokens_schedule = config['schedule']
+                self.draft_model = {"model": apply_precision(draft.eval(), precision), "tokenizer": draft_tokenizer}
+            
+            if model_scale(self.draft_model["model"]) >= model_scale(bundle["model"]):
+                print(f"⚠️ Draft model {config['draft_model']} is not smaller than {bundle['model_path']}, assisted decoding off")
+                return
+            
+            same_vocab = self.draft_model["tokenizer"].get_vocab() == bundle["tokenizer"].get_vocab()
+            bundle["draft"] = {
+                "model": self.draft_model["model"],
+                # Different vocabularies need both tokenizers so generate() can translate candidates
+                "tokenizer": None if same_vocab else self.draft_model["tokenizer"]
+            }
+            print(f"🎯 Assisted decoding with draft model {config['draft_model']} "
+                  f"({draft_size / 1e6:.0f}M vs {model_size / 1e6:.0f}M parameters)")
+            
+        except Exception as e:
+            print(f"⚠️ Could not load draft model {config['draft_model']}: {e}")
+
+    def assisted_kwargs(self, bundle: Dict, batch_size: int) -> Dict:
+        """generate() keyword arguments for assisted decoding, which only runs one sequence at a time"""
+        draft = bundle.get("draft")
+        if draft is None or batch_size != 1:
+            return {}
+        kwargs = {"assistant_model": draft["model"]}
+        if draft["tokenizer"] is not None:
+            kwargs.update(tokenizer=bundle["tokenizer"], assistant_tokenizer=draft["tokenizer"])
+        return kwargs
+
+    def activate(self, bundle: Dict):
+        """Atomically make a loaded bundle the serving model; in-flight batches finish on the old one"""
+        with self.swap_lock:
+            if self.active is not None:
+                self.previous_models.append(self.active)
+                while len(self.previous_models) > self.config['model_registry']['keep_previous']:
+                    self.previous_models.pop(0)
+            self.active = bundle
+        
+        print(f"🔁 Serving model: {bundle['model_path']}")
+        for callback in self.swap_callbacks:
+            callback()
+
+    def rollback(self) -> Optional[Dict]:
+        """Swap back to the previously served model, returning the bundle that was retired"""
+        with self.swap_lock:
+            if not self.previous_models:
+                return None
+            retired = self.active
+            self.active = self.previous_models.pop()
+        
+        print(f"⏪ Rolled back to model: {self.active['model_path']}")
+        self.index_added_documents(self.active)
+        for callback in self.swap_callbacks:
+            callback()
+        return retired
+
+    def warm_up(self, bundle: Dict):
+        """Run a tiny generation so the first real request does not pay one-time setup costs"""
+        try:
+            model, tokenizer = bundle["model"], bundle["tokenizer"]
+            adapter = bundle["default_adapter"]
+            inputs = self.encode_inputs([self.build_input_text("Hello")], bundle=bundle)
+            with torch.no_grad():
+                model.generate(
+                    input_ids=inputs['input_ids'].to(model.device),
+                    attention_mask=inputs['attention_mask'].to(model.device),
+                    max_new_tokens=2,
+                    do_sample=False,
+                    pad_token_id=tokenizer.pad_token_id,
+                    **({"adapter_names": [adapter]} if adapter else {})
+                )
+            print("🔥 AtlasCore warmed up")
+        except Exception as e:
+            print(f"⚠️ Warm-up failed: {e}")
+
+    def build_prefix_cache(self, bundle: Dict, adapter: Optional[str] = None) -> Dict:
+        """Precompute past_key_values for each endpoint's fixed context prefix"""
+        model, tokenizer = bundle["model"], bundle["tokenizer"]
+        adapter_kwargs = {"adapter_names": [adapter]} if adapter else {}
+        prefix_cache = {}
+        
+        for endpoint, context in ENDPOINT_CONTEXTS.items():
+            try:
+                prefix_text = self.build_prefix_text(context)
+                with bundle["tokenizer_lock"]:
+                    prefix_ids = tokenizer(prefix_text, return_tensors='pt')['input_ids'].to(model.device)
+                
+                with torch.no_grad():
+                    outputs = model(input_ids=prefix_ids, use_cache=True, **adapter_kwargs)
+                
+                prefix_cache[context] = {
+                    "endpoint": endpoint,
+                    "input_ids": prefix_ids,
+                    "past_key_values": to_dynamic_cache(outputs.past_key_values),
+                    "length": prefix_ids.shape[1]
+                }
+                
+            except Exception as e:
+                print(f"⚠️ Could not precompute prefix for /{endpoint}: {e}")
+        
+        if prefix_cache:
+            endpoints = ', '.join('/' + entry['endpoint'] for entry in prefix_cache.values())
+            print(f"⚡ Prefix KV-cache ready for: {endpoints}" + (f" (adapter {adapter})" if adapter else ""))
+        return prefix_cache
+
+    def embed_texts(self, texts: List[str], bundle: Optional[Dict] = None) -> np.ndarray:
+        """Mean-pooled final hidden states of the model, computed in batches"""
+        bundle = bundle or self.active
+        config = self.config['retrieval']
+        model, tokenizer = bundle["model"], bundle["tokenizer"]
+        # The transformer body alone: no logits over the vocabulary are needed
+        body = (model.get_base_model() if hasattr(model, "get_base_model") else model).base_model
+        
+        embeddings = []
+        for start in range(0, len(texts), config['batch_size']):
+            with bundle["tokenizer_lock"]:
+                if tokenizer.pad_token is None:
+                    tokenizer.pad_token = tokenizer.eos_token
+                inputs = tokenizer(
+                    texts[start:start + config['batch_size']], padding=True, truncation=True,
+                    max_length=config['max_length'], return_tensors='pt'
+                )
+            attention_mask = inputs['attention_mask'].to(model.device)
+            # Padding may be on the left, so positions count real tokens only
+            position_ids = (attention_mask.cumsum(dim=1) - 1).clamp(min=0)
+            with torch.no_grad():
+                hidden = body(
+                    input_ids=inputs['input_ids'].to(model.device),
+                    attention_mask=attention_mask,
+                    position_ids=position_ids
+                ).last_hidden_state
+            embeddings.append(mean_pool(hidden.float(), attention_mask).cpu().numpy())
+        
+        return np.concatenate(embeddings) if embeddings else np.zeros((0, body.config.hidden_size), dtype=np.float32)
+
+    def embed_prompt(self, prompt: str) -> Optional[np.ndarray]:
+        """Semantic cache embedding of one prompt, or None when no torch model can produce it"""
+        bundle = self.embedding_bundle or self.active
+        if bundle is None or bundle.get("backend", "torch") != "torch":
+            return None
+        return self.embed_texts([prompt], bundle)[0]
+
+    def build_vector_index(self, bundle: Dict) -> Optional[VectorIndex]:
+        """Embed the knowledge base and crawled dataset with a bundle's model"""
+        if bundle["backend"] != "torch":
+            print("⚠️ Retrieval needs hidden states from the torch backend, /research context retrieval is off")
+            return None
+        
+        config = self.config['retrieval']
+        try:
+            started = time.perf_counter()
+            documents = load_documents(config['knowledge_base_path'], config['dataset_path'], config['chunk_words'])
+            documents += load_added_documents(config['added_documents_path'])
+            index = VectorIndex(bundle["model"].config.hidden_size)
+            if documents:
+                index.add(self.embed_texts([document["text"] for document in documents], bundle), documents)
+            print(f"🔎 Vector index ready: {len(index)} passages in {time.perf_counter() - started:.2f}s")
+            return index
+        
+        except Exception as e:
+            print(f"⚠️ Could not build vector index: {e}")
+            return None
+
+    def add_documents(self, documents: List[Dict]) -> int:
+        """Embed and index new passages on the serving model and keep them for later indexes; returns how many were new"""
+        bundle = self.active
+        if bundle is None or bundle["vector_index"] is None:
+            return 0
+        index = bundle["vector_index"]
+        new_documents = list({
+            document_key(document["text"]): document
+            for document in documents
+            if document_key(document["text"]) not in index.keys
+        }.values())
+        if not new_documents:
+            return 0
+        added = index.add(self.embed_texts([document["text"] for document in new_documents], bundle), new_documents)
+        with self.knowledge_lock:
+            save_added_documents(self.config['retrieval']['added_documents_path'], new_documents)
+        return added
+
+    def index_added_documents(self, bundle: Dict):
+        """Catch a bundle's index up with passages posted while another model was serving"""
+        index = bundle["vector_index"]
+        if index is None:
+            return
+        documents = [
+            document for document in load_added_documents(self.config['retrieval']['added_documents_path'])
+            if document_key(document["text"]) not in index.keys
+        ]
+        if documents:
+            index.add(self.embed_texts([document["text"] for document in documents], bundle), documents)
+
+    def retrieve(self, query: str, k: int = 3) -> List[Dict]:
+        """Passages most similar to the query, best first"""
+        bundle = self.active
+        if bundle is None or bundle["vector_index"] is None or not len(bundle["vector_index"]):
+            return []
+        return bundle["vector_index"].search(self.embed_texts([query], bundle), k, self.config['retrieval']['min_score'])[0]
+
+    def build_input_text(self, prompt: str, context: Optional[str] = None) -> str:
+        """Format prompt and optional context the way AtlasCore was trained"""
+        if context:
+            return self.build_prefix_text(context) + self.build_suffix_text(prompt)
+        return "User:" + self.build_suffix_text(prompt)
+
+    def build_prefix_text(self, context: str) -> str:
+        """Fixed part of the input that only depends on the context"""
+        return f"Context: {context}\nUser:"
+
+    def build_suffix_text(self, prompt: str) -> str:
+        """User-specific part of the input that follows the prefix"""
+        return f" {prompt}\nAtlas:"
+
+    def decoding_policy(self, endpoint: Optional[str] = None) -> Dict:
+        """Decoding settings for an endpoint; deterministic mode switches to greedy so cached answers are reproducible"""
+        decoding = self.config['decoding']
+        policy = dict(self.get_default_config()['decoding']['default'])
+        policy.update(decoding.get('default', {}))
+        policy.update(decoding.get(endpoint or 'chat', {}))
+        if self.config['response_cache']['deterministic']:
+            policy['do_sample'] = False
+        return policy
+
+    def sampling_params(self, endpoint: Optional[str] = None) -> Dict:
+        """generate() keyword arguments for an endpoint's decoding policy"""
+        policy = self.decoding_policy(endpoint)
+        params = {
+            "max_new_tokens": policy['max_new_tokens'],
+            "do_sample": policy['do_sample'],
+            "repetition_penalty": policy['repetition_penalty']
+        }
+        if policy['do_sample']:
+            params['temperature'] = policy['temperature']
+        return params
+
+    def stopping_criteria(self, policy: Dict, bundle: Dict, input_length: int) -> StoppingCriteriaList:
+        """Halt each row as soon as the policy's stop condition is met instead of running out max_new_tokens"""
+        criteria = StoppingCriteriaList()
+        if policy['stop_at_newline'] or policy['stop_strings']:
+            criteria.append(StopConditionCriteria(
+                lambda token_ids: self.decode_tokens(token_ids, bundle=bundle),
+                input_length,
+                stop_strings=policy['stop_strings'],
+                stop_at_newline=policy['stop_at_newline']
+            ))
+        return criteria
+
+    def trim_response(self, text: str, policy: Dict):
+        """Cut generated text at the first stop condition; returns (text, stopped)"""
+        text = text.lstrip()
+        cut = len(text)
+        if policy['stop_at_newline'] and '\n' in text:
+            cut = text.index('\n')
+        for stop in policy['stop_strings']:
+            position = text.find(stop)
+            if position != -1:
+                cut = min(cut, position)
+        return text[:cut], cut < len(text)
+
+    def generate_response(self, prompt: str, context: Optional[str] = None, adapter: Optional[str] = None,
+                          endpoint: Optional[str] = None) -> str:
         """Generate response using AtlasCore"""
-        if not self.model_loaded:
-            return self.generate_fallback_response(prompt)
+        return self.generate_batch([prompt], [context], [adapter], [endpoint])[0]
+
+    def resolve_adapter(self, bundle: Dict, adapter: Optional[str]) -> Optional[str]:
+        """Requested adapter if resident, otherwise the bundle default (None for a plain model)"""
+        return adapter if adapter in bundle["adapters"] else bundle["default_adapter"]
+
+    def generate_batch(self, prompts: List[str], contexts: Optional[List[Optional[str]]] = None,
+                       adapters: Optional[List[Optional[str]]] = None,
+                       endpoints: Optional[List[Optional[str]]] = None,
+                       tokens: Optional[List[Optional[CancellationToken]]] = None) -> List:
+        """Generate responses for several prompts with one left-padded generate call per adapter, shared prefix and decoding policy
+
+        Rows whose cancellation token fires come back as GenerationCancelled instead of a response.
+        """
+        if contexts is None:
+            contexts = [None] * len(prompts)
+        if adapters is None:
+            adapters = [None] * len(prompts)
+        if endpoints is None:
+            endpoints = [None] * len(prompts)
+        if tokens is None:
+            tokens = [None] * len(prompts)
+
+        # The whole batch is served by one model even if a hot-swap happens meanwhile
+        bundle = self.active
+        if bundle is None:
+            self.metrics.record_fallback("model_unavailable", len(prompts))
+            return [self.generate_fallback_response(prompt) for prompt in prompts]
         
+        responses = [None] * len(prompts)
+        
+        # Requests for the same adapter and endpoint whose context prefix is precomputed run together;
+        # everything else for that adapter and endpoint shares a plain batch
+        groups = {}
+        for index, (context, adapter, endpoint) in enumerate(zip(contexts, adapters, endpoints)):
+            if tokens[index] is not None and tokens[index].is_set():
+                # Abandoned while queued: never reaches the model
+                responses[index] = self.cancelled_generation(tokens[index], self.decoding_policy(endpoint), 0)
+                continue
+            adapter = self.resolve_adapter(bundle, adapter)
+            prefix_cache = bundle["prefix_caches"].get(adapter, {})
+            key = (adapter, context if context in prefix_cache else None, endpoint)
+            groups.setdefault(key, []).append(index)
+        
+        for (adapter, context, endpoint), indices in groups.items():
+            group_responses = self.generate_group(
+                bundle,
+                [prompts[i] for i in indices],
+                [contexts[i] for i in indices],
+                bundle["prefix_caches"][adapter][context] if context is not None else None,
+                adapter,
+                endpoint,
+                [tokens[i] for i in indices]
+            )
+            for index, response in zip(indices, group_responses):
+                responses[index] = response
+        
+        return responses
+
+    def generate_group(self, bundle: Dict, prompts: List[str], contexts: List[Optional[str]],
+                       prefix: Optional[Dict] = None, adapter: Optional[str] = None,
+                       endpoint: Optional[str] = None, tokens: Optional[List[Optional[CancellationToken]]] = None,
+                       mode: str = "batch") -> List:
+        """Run one batched generate, reusing the cached prefix KV when every prompt shares it"""
         try:
-            # Prepare input with context
-            if context:
-                input_text = f"Context: {context}\nUser: {prompt}\nAtlas:"
-            else:
-                input_text = f"User: {prompt}\nAtlas:"
+            model, tokenizer = bundle["model"], bundle["tokenizer"]
+            policy = self.decoding_policy(endpoint)
+            # Assisted generation does not continue exactly from a cached prefix, so it prefills the whole input
+            assisted = self.assisted_kwargs(bundle, len(prompts))
+            generate_kwargs = dict(assisted)
+            if adapter:
+                # Per-row adapter selection leaves the shared PEFT model untouched for other workers
+                generate_kwargs['adapter_names'] = [adapter] * len(prompts)
             
-            # Tokenize input
-            inputs = self.tokenizer.encode(input_text, return_tensors='pt')
+            if prefix is not None and not assisted:
+                # Only the user-specific suffix needs a forward pass; the prefix comes from the cache
+                suffix_texts = [self.build_suffix_text(prompt) for prompt in prompts]
+                suffix = self.encode_inputs(suffix_texts, bundle=bundle, prefix_length=prefix['length'])
+                batch_size = suffix['input_ids'].shape[0]
+                
+                input_ids = torch.cat([prefix['input_ids'].cpu().expand(batch_size, -1), suffix['input_ids']], dim=1)
+                attention_mask = torch.cat([
+                    torch.ones((batch_size, prefix['length']), dtype=suffix['attention_mask'].dtype),
+                    suffix['attention_mask']
+                ], dim=1)
+                generate_kwargs['past_key_values'] = clone_cache(prefix['past_key_values'], batch_size)
+            else:
+                # Prepare inputs with context
+                input_texts = [self.build_input_text(prompt, context) for prompt, context in zip(prompts, contexts)]
+                
+                # Tokenize inputs
+                inputs = self.encode_inputs(input_texts, bundle=bundle)
+                input_ids, attention_mask = inputs['input_ids'], inputs['attention_mask']
             
-            if inputs.shape[1] > 400:  # Truncate if too long
-                inputs = inputs[:, -400:]
+            input_length = input_ids.shape[1]
+            timer = GenerationTimer()
+            stopping_criteria = self.stopping_criteria(policy, bundle, input_length)
+            stopping_criteria.append(timer)
+            if tokens and any(token is not None for token in tokens):
+                # Abandoned rows stop between decode steps; the call returns once every row is done
+                stopping_criteria.append(CancelledStoppingCriteria(tokens))
             
-            # Generate response
+            # Generate responses
             with torch.no_grad():
-                outputs = self.model.generate(
-                    inputs,
-                    max_length=inputs.shape[1] + 150,
+                outputs = model.generate(
+                    input_ids=input_ids.to(model.device),
+                    attention_mask=attention_mask.to(model.device),
                     num_return_sequences=1,
-                    temperature=0.7,
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.eos_token_id,
-                    eos_token_id=self.tokenizer.eos_token_id,
-                    repetition_penalty=1.1
+                    pad_token_id=tokenizer.pad_token_id,
+                    eos_token_id=tokenizer.eos_token_id,
+                    **self.sampling_params(endpoint),
+                    stopping_criteria=stopping_criteria,
+                    **generate_kwargs
                 )
+            timer.finish()
+            self.metrics.record_generation(mode, timer, self.count_generated_tokens(outputs, input_length, tokenizer))
             
-            # Decode response
-            full_response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            atlas_response = full_response[len(input_text):].strip()
+            # Decode only the newly generated tokens of each row
+            responses = []
+            for prompt, output, token in zip(prompts, outputs, tokens or [None] * len(prompts)):
+                if token is not None and token.is_set():
+                    generated = int((output[input_length:] != tokenizer.pad_token_id).sum())
+                    responses.append(self.cancelled_generation(token, policy, generated))
+                    continue
+                
+                atlas_response = self.decode_tokens(output[input_length:], bundle=bundle)
+                
+                # Clean up response: drop everything from the stop condition on
+                atlas_response = self.trim_response(atlas_response, policy)[0].strip()
+                
+                if len(atlas_response) < 10:  # If response too short, use fallback
+                    atlas_response = self.generate_fallback_response(prompt)
+                    self.metrics.record_fallback("too_short")
+                else:
+                    self.metrics.responses.inc(source="model")
+                
+                responses.append(atlas_response)
             
-            # Clean up response
-            atlas_response = atlas_response.split('\n')[0]  # Take first line
+            return responses
             
-            if len(atlas_response) < 10:  # If response too short, use fallback
-                return self.generate_fallback_response(prompt)
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            self.metrics.record_fallback("error", len(prompts))
+            return [self.generate_fallback_response(prompt) for prompt in prompts]
+
+    def generate_small(self, prompt: str, context: Optional[str] = None, endpoint: Optional[str] = None,
+                       token: Optional[CancellationToken] = None) -> str:
+        """Answer one routed prompt with the small resident model"""
+        bundle = self.small_bundle
+        prefix = bundle["prefix_caches"].get(None, {}).get(context) if context else None
+        response = self.generate_group(bundle, [prompt], [context], prefix, None, endpoint, [token], mode="small")[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def cancelled_generation(self, token: CancellationToken, policy: Dict, generated_tokens: int) -> GenerationCancelled:
+        """Count the decode steps an abandoned request saved and build its error"""
+        reason = token.cancel_reason()
+        self.metrics.cancelled_tokens.inc(max(0, policy['max_new_tokens'] - generated_tokens), reason=reason)
+        return GenerationCancelled(reason)
+
+    def generate_session_turn(self, session: Optional[Dict], prompt: str, context: Optional[str] = None,
+                              adapter: Optional[str] = None, max_session_tokens: int = 768,
+                              token: Optional[CancellationToken] = None):
+        """Answer one conversation turn, prefilling only the tokens the session's KV-cache does not cover
+
+        Returns the response and the updated session (None when the turn could not be cached).
+        Raises GenerationCancelled when the token fires first.
+        """
+        bundle = self.active
+        if bundle is None:
+            self.metrics.record_fallback("model_unavailable")
+            return self.generate_fallback_response(prompt), None
+        
+        model, tokenizer = bundle["model"], bundle["tokenizer"]
+        adapter = self.resolve_adapter(bundle, adapter)
+        bundle_key = (bundle["model_path"], bundle["loaded_at"])
+        policy = self.decoding_policy("chat")
+        
+        # Caches from another model, adapter or context cannot be continued
+        if session is not None and (session["bundle_key"], session["adapter"], session["context"]) != (bundle_key, adapter, context):
+            session = None
+        
+        if session is not None:
+            turn_text = "\nUser:" + self.build_suffix_text(prompt)
+            turn_ids = self.encode_inputs([turn_text], bundle=bundle)['input_ids'][0].tolist()
+            if len(session["ids"]) + len(turn_ids) + policy['max_new_tokens'] > max_session_tokens:
+                # The conversation outgrew its window; start over from this turn
+                session = None
+        
+        if session is None:
+            turn_ids = self.encode_inputs([self.build_input_text(prompt, context)], bundle=bundle)['input_ids'][0].tolist()
+            session = {
+                "ids": [],
+                "past_key_values": None,
+                "turns": [],
+                "bundle_key": bundle_key,
+                "adapter": adapter,
+                "context": context
+            }
+        
+        try:
+            input_ids = torch.tensor([session["ids"] + turn_ids], dtype=torch.long)
+            input_length = input_ids.shape[1]
+            reused = session["past_key_values"].get_seq_length() if session["past_key_values"] is not None else 0
+            
+            timer = GenerationTimer()
+            stopping_criteria = self.stopping_criteria(policy, bundle, input_length)
+            stopping_criteria.append(timer)
+            if token is not None:
+                stopping_criteria.append(CancelledStoppingCriteria([token]))
+            generate_kwargs = {"adapter_names": [adapter]} if adapter else {}
+            if session["past_key_values"] is not None:
+                # generate() only runs the tokens past the cached length through the model
+                generate_kwargs["past_key_values"] = session["past_key_values"]
+            else:
+                # Only the first turn, which has no cache to continue from, uses the draft model
+                generate_kwargs.update(self.assisted_kwargs(bundle, 1))
+            
+            with torch.no_grad():
+                outputs = model.generate(
+                    input_ids=input_ids.to(model.device),
+                    attention_mask=torch.ones_like(input_ids).to(model.device),
+                    pad_token_id=tokenizer.pad_token_id,
+                    eos_token_id=tokenizer.eos_token_id,
+                    **self.sampling_params("chat"),
+                    stopping_criteria=stopping_criteria,
+                    return_dict_in_generate=True,
+                    **generate_kwargs
+                )
+            timer.finish()
+            sequences = outputs.sequences.cpu()
+            self.metrics.record_generation("session", timer, self.count_generated_tokens(sequences, input_length, tokenizer))
             
-            return atlas_response
+            generated = sequences[0, input_length:].tolist()
+            while generated and generated[-1] in (tokenizer.pad_token_id, tokenizer.eos_token_id):
+                generated.pop()
+            response, stopped = self.trim_response(self.decode_tokens(generated, bundle=bundle), policy)
+            # Keep only the tokens of the answer itself so the next turn continues from clean history
+            while generated and stopped:
+                generated.pop()
+                stopped = self.trim_response(self.decode_tokens(generated, bundle=bundle), policy)[1]
+            response = response.strip()
             
         except Exception as e:
-            print(f"Error generating response: {e}")
-            return self.generate_fallback_response(prompt)
+            print(f"Error generating session response: {e}")
+            self.metrics.record_fallback("error")
+            return self.generate_fallback_response(prompt), None
+        
+        if token is not None and token.is_set():
+            # A half-finished turn is neither answered nor kept in the conversation
+            raise self.cancelled_generation(token, policy, len(generated))
+        
+        if len(response) < 10:  # If response too short, use fallback
+            self.metrics.record_fallback("too_short")
+            return self.generate_fallback_response(prompt), None
+        self.metrics.responses.inc(source="model")
+        
+        ids = session["ids"] + turn_ids + generated
+        cache = outputs.past_key_values
+        if cache.get_seq_length() > len(ids):
+            cache.crop(len(ids))
+        
+        session.update({
+            "ids": ids,
+            "past_key_values": cache,
+            "tokens": len(ids),
+            "reused_tokens": reused,
+            "prefilled_tokens": input_length - reused
+        })
+        session["turns"].append({"user": prompt, "atlas": response})
+        return response, session
+
+    def stream_generate(self, prompt: str, context: Optional[str], streamer: AsyncTokenStreamer,
+                        token: Optional[CancellationToken] = None, adapter: Optional[str] = None):
+        """Generate a single response, pushing text into streamer as it is decoded"""
+        try:
+            bundle = self.active
+            model, tokenizer = bundle["model"], bundle["tokenizer"]
+            streamer.tokenizer = tokenizer
+            adapter = self.resolve_adapter(bundle, adapter)
+            adapter_kwargs = {"adapter_names": [adapter]} if adapter else {}
+            
+            inputs = self.encode_inputs([self.build_input_text(prompt, context)], bundle=bundle)
+            input_length = inputs['input_ids'].shape[1]
+            
+            # Halt at the stop condition (everything after it is discarded anyway), on disconnect or at the deadline
+            policy = self.decoding_policy("chat")
+            timer = GenerationTimer()
+            stopping_criteria = self.stopping_criteria(policy, bundle, input_length)
+            stopping_criteria.append(timer)
+            cancelled = CancelledStoppingCriteria([token])
+            if token is not None:
+                stopping_criteria.append(cancelled)
+            
+            with torch.no_grad():
+                outputs = model.generate(
+                    input_ids=inputs['input_ids'].to(model.device),
+                    attention_mask=inputs['attention_mask'].to(model.device),
+                    pad_token_id=tokenizer.pad_token_id,
+                    eos_token_id=tokenizer.eos_token_id,
+                    **self.sampling_params("chat"),
+                    stopping_criteria=stopping_criteria,
+                    streamer=streamer,
+                    **self.assisted_kwargs(bundle, 1),
+                    **adapter_kwargs
+                )
+            timer.finish()
+            generated = self.count_generated_tokens(outputs, input_length, tokenizer)
+            self.metrics.record_generation("stream", timer, generated)
+            # The SSE loop also cancels once it sees the stop condition; that is not an abandoned request
+            if cancelled.fired and token.cancel_reason() != "stopped":
+                self.cancelled_generation(token, policy, generated)
+            
+        except Exception as e:
+            print(f"Error streaming response: {e}")
+            streamer.finish(e)
+
+    def encode_inputs(self, input_texts: List[str], max_length: int = 400, bundle: Optional[Dict] = None,
+                      prefix_length: int = 0):
+        """Tokenize inputs, left-padded so every prompt ends where generation starts
+
+        prefix_length counts cached prefix tokens that precede these texts against max_length.
+        """
+        bundle = bundle or self.active
+        tokenizer = bundle["tokenizer"]
+        budget = max(1, max_length - prefix_length)
+        with bundle["tokenizer_lock"]:
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            tokenizer.padding_side = 'left'
+            encoded = tokenizer(input_texts)['input_ids']
+            # Truncate if too long, keeping the prompt tail
+            kept = [ids[-budget:] for ids in encoded]
+            inputs = tokenizer.pad({'input_ids': kept}, return_tensors='pt')
+        
+        self.metrics.record_input_lengths(
+            [len(ids) + prefix_length for ids in encoded],
+            [len(ids) + prefix_length for ids in kept]
+        )
+        return inputs
+
+    def count_generated_tokens(self, outputs, input_length: int, tokenizer) -> int:
+        """New tokens across the batch, not counting padding after a row finished"""
+        return int((outputs[:, input_length:] != tokenizer.pad_token_id).sum())
+
+    def decode_tokens(self, token_ids, bundle: Optional[Dict] = None) -> str:
+        """Decode generated token ids to text"""
+        bundle = bundle or self.active
+        with bundle["tokenizer_lock"]:
+            return bundle["tokenizer"].decode(token_ids, skip_special_tokens=True)
 
     def generate_fallback_response(self, prompt: str) -> str:
         """Generate fallback response when model is not available"""
         prompt_lower = prompt.lower()
         
-        if any(word in prompt_lower for word in ['revenue', 'money', 'income', 'profit']):
-            return """Based on my analysis, here are proven revenue generation strategies: 1) Implement AI-powered automation to create scalable income streams, 2) Develop digital products that solve specific market problems, 3) Build systems that generate recurring revenue with minimal maintenance, 4) Focus on high-value services that can be systematized and scaled. The key is starting with one profitable model and then replicating it across multiple channels."""
-        
-        elif any(word in prompt_lower for word in ['crisis', 'emergency', 'urgent', 'help']):
-            return """For immediate crisis management: 1) Prioritize essential expenses and cut all non-critical spending, 2) Identify your fastest income sources (freelancing, selling items, gig economy), 3) Contact creditors to negotiate payment plans, 4) Leverage your network for opportunities, 5) Focus on solutions that provide immediate relief while planning long-term recovery. Remember, this situation is temporary - take decisive action while maintaining perspective."""
-        
-        elif any(word in prompt_lower for word in ['strategy', 'analyze', 'plan']):
-            return """Strategic analysis requires a systematic approach: 1) Define clear objectives and success metrics, 2) Gather comprehensive data from multiple sources, 3) Identify patterns and key leverage points, 4) Develop multiple scenarios and contingency plans, 5) Implement with measurable milestones and regular review cycles. The most effective strategies balance immediate impact with long-term sustainability."""
-        
-        elif any(word in prompt_lower for word in ['ai', 'artificial intelligence', 'automation']):
-            return """AI and automation can transform your operations: 1) Start by identifying repetitive tasks that consume significant time, 2) Implement simple automation tools before complex AI systems, 3) Focus on areas with clear ROI and measurable impact, 4) Build data collection systems to enable future AI applications, 5) Train your team on new tools and processes. The goal is to augment human capabilities, not replace them."""
+        for keywords, response in FALLBACK_RESPONSES:
+            if any(word in prompt_lower for word in keywords):
+                return response
         
-        else:
-            return f"""Atlas AI is analyzing your query about "{prompt}". Based on my knowledge synthesis from multiple AI sources, I can provide comprehensive insights combining analytical depth, creative problem-solving, and practical implementation strategies. Would you like me to focus on a specific aspect of this topic for more detailed guidance?"""
+        return f"""Atlas AI is analyzing your query about "{prompt}". Based on my knowledge synthesis from multiple AI sources, I can provide comprehensive insights combining analytical depth, creative problem-solving, and practical implementation strategies. Would you like me to focus on a specific aspect of this topic for more detailed guidance?"""
 
-    async def autonomous_learning_cycle(self):
-        """Continuous learning from internet sources"""
+    async def autonomous_learning_cycle(self, progress: Optional[Callable[[float], None]] = None) -> Dict:
+        """Continuous learning from internet sources; reports the fraction of topics done through progress"""
         print("🧠 Starting autonomous learning cycle...")
         
         # This would integrate with the free sources for continuous learning
@@ -163,25 +1169,420 @@ class AtlasCore:
             "market analysis techniques"
         ]
         
-        for topic in learning_topics:
+        learned, failed = [], {}
+        for done, topic in enumerate(learning_topics, 1):
             try:
                 # Simulate learning from topic
                 print(f"📚 Learning about: {topic}")
                 await asyncio.sleep(1)  # Simulate processing time
+                learned.append(topic)
                 
             except Exception as e:
                 print(f"Learning error for {topic}: {e}")
+                failed[topic] = str(e)
+            
+            if progress:
+                progress(done / len(learning_topics))
         
         print("✅ Learning cycle completed")
+        return {"topics_learned": learned, "errors": failed, "new_knowledge": "integrated"}
 
-# Initialize AtlasCore
+# Initialize AtlasCore (the model itself loads in the background once the server starts)
 atlas_core = AtlasCore()
 
+# Bounded worker pool keeps generation off the event loop
+pool_config = atlas_core.config['worker_pool']
+atlas_pool = InferencePool(
+    max_workers=pool_config['max_workers'],
+    max_queue_size=pool_config['max_queue_size'],
+    retry_after_seconds=pool_config['retry_after_seconds']
+)
+
+# Per-user token budgets, and fair interleaving of users in the batcher queue
+scheduling_config = atlas_core.config['scheduling']
+atlas_scheduler = FairScheduler(
+    tokens_per_second=scheduling_config['tokens_per_second'],
+    burst_tokens=scheduling_config['burst_tokens'],
+    max_queued_per_user=scheduling_config['max_queued_per_user'],
+    priority_endpoints=scheduling_config['priority_endpoints'],
+    priority_max_cost=scheduling_config['priority_max_cost'],
+    priority_burst=scheduling_config['priority_burst'],
+    quantum=scheduling_config['quantum']
+) if scheduling_config['enabled'] else None
+
+# Micro-batching scheduler shared by the generation endpoints
+batching_config = atlas_core.config['batching']
+if batching_config['mode'] == "continuous":
+    atlas_batcher = ContinuousBatcher(
+        atlas_core,
+        max_batch_size=batching_config['max_batch_size'] if batching_config['enabled'] else 1,
+        queue=atlas_scheduler
+    )
+else:
+    atlas_batcher = AtlasBatcher(
+        atlas_core.generate_batch,
+        max_batch_size=batching_config['max_batch_size'] if batching_config['enabled'] else 1,
+        batch_window_ms=batching_config['batch_window_ms'] if batching_config['enabled'] else 0,
+        run_fn=atlas_pool.run,
+        max_concurrent_batches=atlas_pool.max_workers,
+        queue=atlas_scheduler
+    )
+
+# Repeated prompts are answered from the cache without touching the model
+cache_config = atlas_core.config['response_cache']
+response_cache = ResponseCache(
+    max_entries=cache_config['max_entries'],
+    ttl_seconds=cache_config['ttl_seconds'],
+    max_memory_mb=cache_config['max_memory_mb']
+) if cache_config['enabled'] else None
+
+if response_cache:
+    # Answers from a swapped-out model must not outlive it
+    atlas_core.swap_callbacks.append(response_cache.clear)
+
+# Paraphrases of a cached prompt reuse its answer
+semantic_config = atlas_core.config['semantic_cache']
+semantic_cache = SemanticCache(
+    max_entries=semantic_config['max_entries'],
+    ttl_seconds=semantic_config['ttl_seconds'],
+    similarity_threshold=semantic_config['similarity_threshold'],
+    min_observed=semantic_config['min_observed']
+) if semantic_config['enabled'] else None
+
+if semantic_cache:
+    # Answers of the swapped-out model, and without a dedicated encoder its embeddings, must not outlive it
+    atlas_core.swap_callbacks.append(semantic_cache.clear)
+    semantic_lookups = atlas_core.metrics.counter(
+        "atlas_semantic_cache_lookups_total", "Semantic cache lookups by result", ("result",)
+    )
+    atlas_core.metrics.gauge(
+        "atlas_semantic_cache_hit_rate", "Share of semantic cache lookups answered from the cache",
+        fn=lambda: semantic_cache.get_stats()['hit_rate']
+    )
+    atlas_core.metrics.gauge(
+        "atlas_semantic_cache_entries", "Responses held by the semantic cache",
+        fn=lambda: semantic_cache.get_stats()['entries']
+    )
+
+# Identical requests arriving while one is generating share its result
+coalescing_config = atlas_core.config['coalescing']
+request_coalescer = SingleFlight() if coalescing_config['enabled'] else None
+
+# Simple prompts go to the canned answers or the small model instead of the trained one
+routing_config = atlas_core.config['routing']
+query_router = ComplexityRouter(
+    [keyword for keywords, _ in FALLBACK_RESPONSES for keyword in keywords],
+    fallback_max_score=routing_config['fallback_max_score'],
+    small_max_score=routing_config['small_max_score'],
+    endpoints=routing_config['endpoints']
+) if routing_config['enabled'] else None
+routed_requests = atlas_core.metrics.counter(
+    "atlas_routed_requests_total", "Requests answered per complexity route", ("route",)
+)
+route_latency = atlas_core.metrics.histogram(
+    "atlas_route_latency_seconds", "End-to-end generation latency per complexity route", ("route",)
+)
+
+# Long tasks run as background jobs so no request waits on them
+jobs_config = atlas_core.config['jobs']
+job_runner = JobRunner(
+    db_path=jobs_config['db_path'],
+    max_concurrent=jobs_config['max_concurrent'],
+    max_pending=jobs_config['max_pending'],
+    keep_finished=jobs_config['keep_finished']
+)
+job_runner.register("autonomous_learning", atlas_core.autonomous_learning_cycle)
+
+# Every request carries a cancellation token that fires at its deadline or when its client disconnects
+deadlines_config = atlas_core.config['deadlines']
+
+# Per-user conversations keep their KV-cache so follow-ups only prefill the new turn
+session_config = atlas_core.config['sessions']
+session_store = SessionStore(
+    max_total_tokens=session_config['max_total_tokens'],
+    max_session_tokens=session_config['max_session_tokens'],
+    max_turns=session_config['max_turns'],
+    ttl_seconds=session_config['ttl_seconds']
+) if session_config['enabled'] else None
+
+if session_store:
+    # Cached conversation state belongs to the model that produced it
+    atlas_core.swap_callbacks.append(session_store.clear)
+
+# Hot-swaps freshly trained checkpoints without a restart
+registry_config = atlas_core.config['model_registry']
+model_registry = ModelRegistry(
+    atlas_core,
+    models_dir=registry_config['models_dir'],
+    poll_interval_seconds=registry_config['poll_interval_seconds'],
+    settle_seconds=registry_config['settle_seconds']
+)
+# Adapters are loaded from fixed paths, so there is nothing for the registry to swap
+registry_watching = registry_config['enabled'] and not atlas_core.config['adapters']['paths']
+
+def prefork_master() -> Optional[int]:
+    """The master's pid when this process is a worker forked by atlas_prefork.py"""
+    master_pid = int(os.getenv("ATLAS_PREFORK_MASTER", "0"))
+    return master_pid if master_pid and master_pid != os.getpid() else None
+
+# Queue state is read from the pool and batcher at scrape time
+atlas_core.metrics.gauge(
+    "atlas_queue_depth", "Requests admitted to the worker pool and not yet answered",
+    fn=lambda: atlas_pool.get_stats()['queue_depth']
+)
+atlas_core.metrics.gauge(
+    "atlas_active_workers", "Worker threads currently running a generation",
+    fn=lambda: atlas_pool.get_stats()['active_workers']
+)
+atlas_core.metrics.gauge(
+    "atlas_batcher_pending", "Requests waiting for the batcher to pick them up",
+    fn=lambda: atlas_batcher.get_stats()['pending']
+)
+atlas_core.metrics.counter(
+    "atlas_rejected_requests_total", "Requests turned away with 503 because the queue was full",
+    fn=lambda: atlas_pool.get_stats()['rejected_total']
+)
+if request_coalescer:
+    atlas_core.metrics.counter(
+        "atlas_coalesced_requests_total", "Requests that joined an identical in-flight generation instead of starting one",
+        fn=lambda: request_coalescer.stats['joins']
+    )
+if atlas_scheduler:
+    atlas_core.metrics.counter(
+        "atlas_rate_limited_requests_total", "Requests turned away with 429 for exceeding a per-user token budget or in-flight limit",
+        fn=lambda: atlas_scheduler.stats['rejected_budget'] + atlas_scheduler.stats['rejected_queued']
+    )
+    atlas_core.metrics.gauge(
+        "atlas_scheduler_priority_pending", "Priority-lane requests waiting for the batcher",
+        fn=lambda: atlas_scheduler.get_stats()['queued']['priority']
+    )
+atlas_core.metrics.gauge(
+    "atlas_model_ready", "1 once the model is loaded and warmed up",
+    fn=lambda: int(atlas_core.ready and atlas_core.model_loaded)
+)
+
+def check_adapter(adapter: Optional[str]):
+    """Reject requests for LoRA adapters that are not resident"""
+    if adapter and atlas_core.model_loaded and adapter not in atlas_core.adapters:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown adapter '{adapter}'. Available: {', '.join(atlas_core.adapters) or 'none'}"
+        )
+
+def admit_user(user: Optional[str], prompt: str, context: Optional[str], endpoint: str,
+               bulk: bool = False, charge: bool = True) -> Tuple[int, Optional[str]]:
+    """Charge the estimated token cost to the user's budget; returns the cost and scheduling lane
+
+    With charge=False the request was already paid for as part of a batch and only gets its cost and lane.
+    """
+    if not atlas_scheduler or not user or not atlas_core.model_loaded:
+        return 0, None
+
+    cost = atlas_scheduler.estimate_cost(
+        prompt + (context or ""), atlas_core.decoding_policy(endpoint)['max_new_tokens']
+    )
+    if charge:
+        try:
+            atlas_scheduler.admit(user, cost)
+        except RateLimitedError as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    return cost, "bulk" if bulk else atlas_scheduler.lane_for(endpoint, cost)
+
+def release_user(user: Optional[str], cost: int):
+    if cost:
+        atlas_scheduler.release(user)
+
+def admit_batch(costs: Dict[str, int]) -> Dict[str, int]:
+    """Charge a whole batch call once per user it is billed to; all users are admitted or none is"""
+    if not atlas_scheduler or not atlas_core.model_loaded:
+        return {}
+    admitted = {}
+    try:
+        for user, cost in costs.items():
+            atlas_scheduler.admit(user, cost)
+            admitted[user] = cost
+    except RateLimitedError as e:
+        release_batch(admitted)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    return admitted
+
+def release_batch(admitted: Dict[str, int]):
+    for user, cost in admitted.items():
+        release_user(user, cost)
+
+def request_token(timeout_seconds: Optional[float] = None) -> CancellationToken:
+    """Token with the request's deadline, capped at the configured maximum"""
+    seconds = timeout_seconds if timeout_seconds and timeout_seconds > 0 else deadlines_config['default_seconds']
+    return CancellationToken(min(seconds, deadlines_config['max_seconds']))
+
+async def watch_disconnect(http_request: Request, token: CancellationToken):
+    """Cancel the token as soon as the client closes its connection"""
+    while not token.is_set():
+        if await http_request.is_disconnected():
+            token.cancel("disconnected")
+            return
+        await asyncio.sleep(deadlines_config['disconnect_poll_seconds'])
+
+async def guarded(http_request: Request, token: CancellationToken, coro):
+    """Await coro while its token is armed with the deadline and the disconnect watcher"""
+    deadline = asyncio.get_running_loop().call_later(token.remaining(), token.cancel, "deadline")
+    watcher = asyncio.create_task(watch_disconnect(http_request, token))
+    try:
+        return await coro
+    finally:
+        deadline.cancel()
+        watcher.cancel()
+
+def record_route(route: str, score: Optional[float], started: float, endpoint: str):
+    """Log a routed request's decision and latency"""
+    seconds = time.perf_counter() - started
+    routed_requests.inc(route=route)
+    route_latency.observe(seconds, route=route)
+    query_router.record(route, score, seconds, endpoint)
+
+def cancelled_error(e: GenerationCancelled) -> HTTPException:
+    """Count an abandoned request and build its response; nobody reads it after a disconnect"""
+    atlas_core.metrics.cancellations.inc(reason=e.reason)
+    if e.reason == "deadline":
+        return HTTPException(status_code=504, detail="Request deadline exceeded before the response was ready")
+    return HTTPException(status_code=499, detail="Client closed the request")
+
+async def run_pooled(fn: Callable, *args):
+    """Run a short model call on the worker pool under the same admission limit as generation"""
+    try:
+        atlas_pool.admit()
+    except PoolOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    try:
+        return await atlas_pool.run(fn, *args)
+    finally:
+        atlas_pool.release()
+
+async def run_inference(prompt: str, context: Optional[str] = None, adapter: Optional[str] = None,
+                        endpoint: str = "chat", user: Optional[str] = None, bulk: bool = False,
+                        token: Optional[CancellationToken] = None, charge: bool = True) -> str:
+    """Admit a request into the worker pool and wait for its batched response"""
+    check_adapter(adapter)
+    params = dict(atlas_core.decoding_policy(endpoint), adapter=adapter)
+
+    cache_key = None
+    if response_cache and atlas_core.model_loaded:
+        cache_key = response_cache.make_key(prompt, context, params)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            atlas_core.metrics.responses.inc(source="cache")
+            return cached
+
+    semantic_vector, semantic_namespace = None, None
+    if semantic_cache and atlas_core.model_loaded:
+        semantic_vector = await run_pooled(atlas_core.embed_prompt, prompt)
+    if semantic_vector is not None:
+        semantic_namespace = semantic_cache.make_namespace(context, params)
+        hit = semantic_cache.get(semantic_vector, semantic_namespace)
+        semantic_lookups.inc(result="hit" if hit else "miss")
+        if hit:
+            atlas_core.metrics.responses.inc(source="semantic_cache")
+            if cache_key:
+                # An exact repeat of this paraphrase can skip the embedding next time
+                response_cache.put(cache_key, hit[0])
+            return hit[0]
+
+    async def generate(token: Optional[CancellationToken]):
+        route, score = "main", None
+        if query_router:
+            # Requests without an adapter still get the default one in adapter mode
+            served_adapter = adapter or (atlas_core.active["default_adapter"] if atlas_core.model_loaded else None)
+            route, score = query_router.choose(prompt, endpoint, atlas_core.small_bundle is not None, served_adapter)
+        started = time.perf_counter()
+        if route == "fallback":
+            atlas_core.metrics.record_fallback("routed")
+            response = atlas_core.generate_fallback_response(prompt)
+            record_route(route, score, started, endpoint)
+            return response
+        
+        cost, lane = admit_user(user, prompt, context, endpoint, bulk, charge)
+        charged = cost if charge else 0
+        try:
+            atlas_pool.admit()
+        except PoolOverloadedError as e:
+            release_user(user, charged)
+            raise HTTPException(
+                status_code=503,
+                detail=str(e),
+                headers={"Retry-After": str(e.retry_after)}
+            )
+
+        try:
+            if route == "small":
+                response = await atlas_pool.run(atlas_core.generate_small, prompt, context, endpoint, token)
+            else:
+                response = await atlas_batcher.submit(
+                    prompt, context, adapter, endpoint, user=user, cost=cost, lane=lane, token=token
+                )
+        finally:
+            atlas_pool.release()
+            release_user(user, charged)
+        if query_router:
+            record_route(route, score, started, endpoint)
+
+        if cache_key:
+            response_cache.put(cache_key, response)
+        if semantic_vector is not None:
+            semantic_cache.put(semantic_vector, semantic_namespace, response)
+        return response
+
+    try:
+        # Duplicates ride along on the first request's generation, its worker slot and its token budget
+        if request_coalescer and atlas_core.model_loaded and not (coalescing_config['deterministic_only'] and params['do_sample']):
+            return await request_coalescer.do(request_coalescer.make_key(prompt, context, endpoint, params), generate, token)
+        return await generate(token)
+    except GenerationCancelled as e:
+        raise cancelled_error(e)
+
+async def research_context(query: str) -> Optional[str]:
+    """Knowledge passages for a research question, joined into a context of bounded size"""
+    retrieval_config = atlas_core.config['retrieval']
+    if not retrieval_config['enabled'] or not atlas_core.model_loaded:
+        return None
+    passages = await run_pooled(atlas_core.retrieve, query, retrieval_config['research_top_k'])
+    knowledge = ' '.join(passage["text"] for passage in passages)[:retrieval_config['max_context_chars']]
+    return knowledge or None
+
+async def run_session_turn(user_id: str, prompt: str, context: Optional[str] = None,
+                           adapter: Optional[str] = None, token: Optional[CancellationToken] = None) -> str:
+    """Answer a turn of a user's conversation, continuing from its cached KV state"""
+    check_adapter(adapter)
+    cost, _ = admit_user(user_id, prompt, context, "chat")
+    try:
+        atlas_pool.admit()
+    except PoolOverloadedError as e:
+        release_user(user_id, cost)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    session = session_store.checkout(user_id)
+    try:
+        response, session = await atlas_pool.run(
+            atlas_core.generate_session_turn, session, prompt, context, adapter, session_store.max_session_tokens, token
+        )
+    except GenerationCancelled as e:
+        session = None
+        raise cancelled_error(e)
+    except Exception:
+        session = None
+        raise
+    finally:
+        session_store.checkin(user_id, session)
+        atlas_pool.release()
+        release_user(user_id, cost)
+    return response
+
 # Request/Response models
 class ChatRequest(BaseModel):
     message: str
     context: Optional[str] = None
     user_id: Optional[str] = None
+    adapter: Optional[str] = None
+    timeout_seconds: Optional[float] = None
 
 class ChatResponse(BaseModel):
     response: str
@@ -189,11 +1590,101 @@ class ChatResponse(BaseModel):
     model_status: str
     capabilities: dict
 
+class BatchChatRequest(BaseModel):
+    requests: List[ChatRequest]
+    # One deadline for the whole call; per-item timeout_seconds are ignored
+    timeout_seconds: Optional[float] = None
+
+class BatchChatItem(BaseModel):
+    index: int
+    response: Optional[str] = None
+    error: Optional[str] = None
+    status_code: int = 200
+
+class BatchChatResponse(BaseModel):
+    results: List[BatchChatItem]
+    completed: int
+    failed: int
+    timestamp: str
+    model_status: str
+
+class EmbeddingRequest(BaseModel):
+    texts: List[str]
+
+class KnowledgeDocument(BaseModel):
+    text: str
+    source: Optional[str] = None
+
+class KnowledgeRequest(BaseModel):
+    documents: List[KnowledgeDocument]
+
 class StatusResponse(BaseModel):
     status: str
     model_loaded: bool
     capabilities: dict
     uptime: str
+    batching: Optional[dict] = None
+    worker_pool: Optional[dict] = None
+    response_cache: Optional[dict] = None
+    semantic_cache: Optional[dict] = None
+    sessions: Optional[dict] = None
+    scheduling: Optional[dict] = None
+    coalescing: Optional[dict] = None
+    routing: Optional[dict] = None
+    jobs: Optional[dict] = None
+    retrieval: Optional[dict] = None
+    loading: Optional[dict] = None
+    models: Optional[dict] = None
+
+def client_key(request: ChatRequest, http_request: Request) -> str:
+    """Who a request is charged to: its user_id, or the client address for anonymous callers"""
+    if request.user_id:
+        return request.user_id
+    return f"ip:{http_request.client.host}" if http_request.client else "anonymous"
+
+class RequestLatencyMiddleware:
+    """Per-endpoint latency histogram; streams are timed until their headers are sent
+
+    Plain ASGI rather than @app.middleware("http"): the latter wraps the receive channel, and endpoints then
+    never see http.disconnect, so abandoned requests would not be cancelled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        observed = False
+
+        def observe(status: int):
+            nonlocal observed
+            if observed:
+                return
+            observed = True
+            # The router records the matched route on the shared scope
+            route = scope.get("route")
+            atlas_core.metrics.request_latency.observe(
+                time.perf_counter() - started,
+                endpoint=route.path if route else "unmatched",
+                method=scope["method"],
+                status=status
+            )
+
+        async def send_and_observe(message):
+            if message["type"] == "http.response.start":
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_observe)
+        finally:
+            observe(500)
+
+app.add_middleware(RequestLatencyMiddleware)
 
 # API Endpoints
 @app.get("/")
@@ -208,16 +1699,106 @@ async def root():
 @app.get("/status", response_model=StatusResponse)
 async def get_status():
     return StatusResponse(
-        status="operational",
+        status="operational" if atlas_core.ready else "loading",
         model_loaded=atlas_core.model_loaded,
         capabilities=atlas_core.capabilities,
-        uptime=str(datetime.now())
+        uptime=str(datetime.now()),
+        batching=atlas_batcher.get_stats(),
+        worker_pool=atlas_pool.get_stats(),
+        response_cache=response_cache.get_stats() if response_cache else None,
+        semantic_cache=semantic_cache.get_stats() if semantic_cache else None,
+        sessions=session_store.get_stats() if session_store else None,
+        scheduling=atlas_scheduler.get_stats() if atlas_scheduler else None,
+        coalescing=request_coalescer.get_stats() if request_coalescer else None,
+        routing=query_router.get_stats() if query_router else None,
+        jobs=job_runner.get_stats(),
+        retrieval=atlas_core.active["vector_index"].get_stats() if atlas_core.model_loaded and atlas_core.active["vector_index"] else None,
+        loading=dict(atlas_core.load_state),
+        models=model_registry.get_stats()
     )
 
+@app.get("/models")
+async def list_models():
+    """Active model, rollback candidates and recent hot-swap events"""
+    return model_registry.get_stats()
+
+@app.post("/models/rollback")
+async def rollback_model():
+    """Swap back to the previously served model"""
+    master_pid = prefork_master()
+    if master_pid:
+        # Workers are forks of the master: it rolls back and re-forks them all, so they switch together
+        if not atlas_core.previous_models:
+            raise HTTPException(status_code=409, detail="No previous model available for rollback")
+        os.kill(master_pid, signal.SIGUSR1)
+        return JSONResponse(status_code=202, content={
+            "rolled_back_to": atlas_core.previous_models[-1]["model_path"],
+            "timestamp": datetime.now().isoformat()
+        })
+
+    model_path = await asyncio.get_running_loop().run_in_executor(None, model_registry.rollback)
+    if model_path is None:
+        raise HTTPException(status_code=409, detail="No previous model available for rollback")
+    
+    return {
+        "rolled_back_to": model_path,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/memory")
+async def memory_usage():
+    """RSS/PSS per worker, to check that prefork workers really share the model weights"""
+    report = await asyncio.get_running_loop().run_in_executor(None, current_report)
+    # Only torch weights are shared copy-on-write; every worker opens its own onnxruntime session
+    report['backend'] = atlas_core.active["backend"] if atlas_core.model_loaded else None
+    report['weights_shared'] = report['mode'] == 'prefork' and report['backend'] == "torch"
+    return report
+
+@app.get("/sessions/{user_id}")
+async def get_session(user_id: str):
+    """Recent turns and cached token count of a user's conversation"""
+    session = session_store.describe(user_id) if session_store else None
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"No active session for user '{user_id}'")
+    return session
+
+@app.delete("/sessions/{user_id}")
+async def reset_session(user_id: str):
+    """Forget a user's conversation so the next message starts fresh"""
+    if not session_store or not session_store.reset(user_id):
+        raise HTTPException(status_code=404, detail=f"No active session for user '{user_id}'")
+    return {
+        "reset": user_id,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(atlas_core.metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+async def readiness():
+    """Readiness probe: succeeds only once the model is loaded and warmed up"""
+    if not atlas_core.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"ready": False, "phase": atlas_core.load_state["phase"], "progress": atlas_core.load_state["progress"]}
+        )
+    return {"ready": True, "phase": atlas_core.load_state["phase"], "model_loaded": atlas_core.model_loaded}
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     try:
-        response = atlas_core.generate_response(request.message, request.context)
+        token = request_token(request.timeout_seconds)
+        if request.user_id and session_store and atlas_core.model_loaded:
+            response = await guarded(http_request, token, run_session_turn(
+                request.user_id, request.message, request.context, request.adapter, token
+            ))
+        else:
+            response = await guarded(http_request, token, run_inference(
+                request.message, request.context, request.adapter, user=client_key(request, http_request), token=token
+            ))
         
         return ChatResponse(
             response=response,
@@ -226,16 +1807,171 @@ async def chat(request: ChatRequest):
             capabilities=atlas_core.capabilities
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating response: {str(e)}")
 
+@app.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(request: BatchChatRequest, http_request: Request):
+    """Answer many chat prompts in one call; each item succeeds or fails on its own"""
+    max_items = batching_config['max_bulk_items']
+    if len(request.requests) > max_items:
+        raise HTTPException(status_code=413, detail=f"At most {max_items} items per batch, got {len(request.requests)}")
+    
+    # Chunks of one batch each keep a large request from taking every admission slot at once
+    chunk_size = atlas_batcher.max_batch_size
+    token = request_token(request.timeout_seconds)
+
+    # The call is charged once up front, not item by item, so a batch within budget never half-fails on rate limits
+    users = [client_key(item, http_request) for item in request.requests]
+    costs = {}
+    if atlas_scheduler:
+        max_new_tokens = atlas_core.decoding_policy("chat")['max_new_tokens']
+        for item, user in zip(request.requests, users):
+            costs[user] = costs.get(user, 0) + atlas_scheduler.estimate_cost(item.message + (item.context or ""), max_new_tokens)
+    admitted = admit_batch(costs)
+
+    async def answer_all():
+        results = []
+        for start in range(0, len(request.requests), chunk_size):
+            chunk = request.requests[start:start + chunk_size]
+            outcomes = await asyncio.gather(
+                *[run_inference(item.message, item.context, item.adapter, user=user, bulk=True, token=token,
+                                charge=False)
+                  for item, user in zip(chunk, users[start:start + chunk_size])],
+                return_exceptions=True
+            )
+            for index, outcome in enumerate(outcomes, start):
+                if isinstance(outcome, HTTPException):
+                    results.append(BatchChatItem(index=index, error=str(outcome.detail), status_code=outcome.status_code))
+                elif isinstance(outcome, Exception):
+                    results.append(BatchChatItem(index=index, error=f"Error generating response: {str(outcome)}", status_code=500))
+                else:
+                    results.append(BatchChatItem(index=index, response=outcome))
+        return results
+
+    try:
+        results = await guarded(http_request, token, answer_all())
+    finally:
+        release_batch(admitted)
+    
+    failed = sum(1 for item in results if item.error is not None)
+    return BatchChatResponse(
+        results=results,
+        completed=len(results) - failed,
+        failed=failed,
+        timestamp=datetime.now().isoformat(),
+        model_status="loaded" if atlas_core.model_loaded else "fallback"
+    )
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    """Format one server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """Stream the chat response token by token over server-sent events"""
+    started = time.perf_counter()
+
+    if not atlas_core.model_loaded:
+        async def fallback_events():
+            response = atlas_core.generate_fallback_response(request.message)
+            atlas_core.metrics.record_fallback("model_unavailable")
+            yield sse_event({"token": response})
+            yield sse_event({"response": response, "model_status": "fallback", "ttft_ms": 0}, event="done")
+        return StreamingResponse(fallback_events(), media_type="text/event-stream")
+
+    check_adapter(request.adapter)
+    user = client_key(request, http_request)
+    cost, _ = admit_user(user, request.message, request.context, "chat")
+    try:
+        atlas_pool.admit()
+    except PoolOverloadedError as e:
+        release_user(user, cost)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    token = request_token(request.timeout_seconds)
+    deadline = asyncio.get_running_loop().call_later(token.remaining(), token.cancel, "deadline")
+    streamer = AsyncTokenStreamer(atlas_core.tokenizer, asyncio.get_running_loop(), skip_special_tokens=True)
+    generation = asyncio.create_task(
+        atlas_pool.run(atlas_core.stream_generate, request.message, request.context, streamer, token, request.adapter)
+    )
+    generation.add_done_callback(lambda task: (atlas_pool.release(), release_user(user, cost), deadline.cancel()))
+
+    policy = atlas_core.decoding_policy("chat")
+
+    async def token_events():
+        text = ""
+        ttft_ms = None
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(streamer.queue.get(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    if await http_request.is_disconnected():
+                        token.cancel("disconnected")
+                        atlas_core.metrics.cancellations.inc(reason="disconnected")
+                        return
+                    continue
+
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    yield sse_event({"error": str(chunk)}, event="error")
+                    return
+
+                # Drop leading blank lines, then stop at the same stop condition /chat uses
+                trimmed, stopped = atlas_core.trim_response(text + chunk, policy)
+                chunk = trimmed[len(text):]
+                if stopped:
+                    token.cancel("stopped")
+
+                if chunk:
+                    if ttft_ms is None:
+                        ttft_ms = round((time.perf_counter() - started) * 1000, 2)
+                        atlas_core.metrics.stream_ttft.observe(ttft_ms / 1000)
+                    yield sse_event({"token": chunk})
+                # A stop string split across chunks may cut back into text that was already sent
+                text = trimmed
+
+                if token.is_set():
+                    break
+
+            if token.cancel_reason() == "deadline":
+                atlas_core.metrics.cancellations.inc(reason="deadline")
+                yield sse_event({"error": "Request deadline exceeded", "partial_response": text.strip()}, event="error")
+                return
+
+            response = text.strip()
+            if len(response) < 10:  # If response too short, use fallback
+                response = atlas_core.generate_fallback_response(request.message)
+                atlas_core.metrics.record_fallback("too_short")
+            else:
+                atlas_core.metrics.responses.inc(source="model")
+            yield sse_event({"response": response, "model_status": "loaded", "ttft_ms": ttft_ms}, event="done")
+
+        finally:
+            # Client went away or we hit the stop condition: stop burning decode steps
+            token.cancel("closed")
+
+    return StreamingResponse(
+        token_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/analyze")
-async def analyze_query(request: ChatRequest):
+async def analyze_query(request: ChatRequest, http_request: Request):
     """Advanced analysis endpoint"""
     try:
         # Add analytical context
-        context = "Provide comprehensive analysis with strategic recommendations and implementation steps."
-        response = atlas_core.generate_response(request.message, context)
+        context = ENDPOINT_CONTEXTS["analyze"]
+        token = request_token(request.timeout_seconds)
+        response = await guarded(http_request, token, run_inference(
+            request.message, context, request.adapter, endpoint="analyze", user=client_key(request, http_request), token=token
+        ))
         
         return {
             "analysis": response,
@@ -244,15 +1980,20 @@ async def analyze_query(request: ChatRequest):
             "confidence": 0.9
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
 
 @app.post("/generate")
-async def generate_content(request: ChatRequest):
+async def generate_content(request: ChatRequest, http_request: Request):
     """Creative content generation endpoint"""
     try:
-        context = "Generate creative, innovative solutions with practical implementation details."
-        response = atlas_core.generate_response(request.message, context)
+        context = ENDPOINT_CONTEXTS["generate"]
+        token = request_token(request.timeout_seconds)
+        response = await guarded(http_request, token, run_inference(
+            request.message, context, request.adapter, endpoint="generate", user=client_key(request, http_request), token=token
+        ))
         
         return {
             "generated_content": response,
@@ -261,15 +2002,23 @@ async def generate_content(request: ChatRequest):
             "originality": 0.95
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation error: {str(e)}")
 
 @app.post("/research")
-async def research_topic(request: ChatRequest):
+async def research_topic(request: ChatRequest, http_request: Request):
     """Research and information gathering endpoint"""
     try:
-        context = "Provide research-based insights with current trends and data-driven recommendations."
-        response = atlas_core.generate_response(request.message, context)
+        knowledge = request.context or await research_context(request.message)
+        # Knowledge goes in the per-request part of the input, so the fixed research prefix stays cached
+        prompt = f"Knowledge: {knowledge}\n{request.message}" if knowledge else request.message
+        token = request_token(request.timeout_seconds)
+        response = await guarded(http_request, token, run_inference(
+            prompt, ENDPOINT_CONTEXTS["research"], request.adapter, endpoint="research",
+            user=client_key(request, http_request), token=token
+        ))
         
         return {
             "research_results": response,
@@ -278,32 +2027,105 @@ async def research_topic(request: ChatRequest):
             "confidence": 0.85
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Research error: {str(e)}")
 
-@app.post("/autonomous-learning")
+@app.post("/embeddings")
+async def create_embeddings(request: EmbeddingRequest):
+    """Mean-pooled embeddings of up to max_bulk_items texts, computed in batches by the serving model"""
+    max_items = batching_config['max_bulk_items']
+    if len(request.texts) > max_items:
+        raise HTTPException(status_code=413, detail=f"At most {max_items} texts per call, got {len(request.texts)}")
+    if not atlas_core.model_loaded or atlas_core.active["backend"] != "torch":
+        raise HTTPException(status_code=503, detail="Embeddings need the torch model to be loaded")
+    
+    embeddings = await run_pooled(atlas_core.embed_texts, request.texts)
+    return {
+        "embeddings": embeddings.tolist(),
+        "dimensions": int(embeddings.shape[1]),
+        "model": atlas_core.active["model_path"]
+    }
+
+@app.post("/knowledge")
+async def add_knowledge(request: KnowledgeRequest):
+    """Embed new passages into the vector index of the serving model"""
+    if not atlas_core.model_loaded or atlas_core.active["vector_index"] is None:
+        raise HTTPException(status_code=503, detail="The vector index is not available")
+    
+    documents = [
+        {"text": passage, "source": document.source or "api"}
+        for document in request.documents
+        for passage in chunk_text(document.text, atlas_core.config['retrieval']['chunk_words'])
+    ]
+    added = await run_pooled(atlas_core.add_documents, documents) if documents else 0
+    return {"added": added, "duplicates": len(documents) - added, "total": len(atlas_core.active["vector_index"])}
+
+@app.get("/knowledge/search")
+async def search_knowledge(query: str, k: int = 3):
+    """Top-k knowledge passages for a query"""
+    if not atlas_core.model_loaded or atlas_core.active["vector_index"] is None:
+        raise HTTPException(status_code=503, detail="The vector index is not available")
+    
+    started = time.perf_counter()
+    results = await run_pooled(atlas_core.retrieve, query, max(1, min(k, 50)))
+    return {"results": results, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+@app.post("/autonomous-learning", status_code=202)
 async def trigger_learning():
-    """Trigger autonomous learning cycle"""
+    """Start an autonomous learning cycle as a background job; poll /jobs/{job_id} for its outcome"""
     try:
-        await atlas_core.autonomous_learning_cycle()
+        job = job_runner.submit("autonomous_learning")
         
         return {
-            "learning_status": "completed",
-            "timestamp": datetime.now().isoformat(),
-            "new_knowledge": "integrated",
-            "next_cycle": "scheduled"
+            "learning_status": job["status"],
+            "job_id": job["id"],
+            "status_url": f"/jobs/{job['id']}",
+            "timestamp": datetime.now().isoformat()
         }
         
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Learning error: {str(e)}")
 
+@app.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """Most recent background jobs, optionally only those with one status"""
+    return {"jobs": job_runner.recent(status, max(1, min(limit, 500))), "stats": job_runner.get_stats()}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress and, once finished, result or error of a background job"""
+    job = job_runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job with id '{job_id}'")
+    return job
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     print("🚀 AtlasCore AI starting up...")
-    print(f"🤖 Model status: {'Loaded' if atlas_core.model_loaded else 'Fallback'}")
+    job_runner.init_database()
+    atlas_batcher.start()
+    if atlas_core.ready:
+        print(f"🤖 Model status: preloaded ({atlas_core.active['model_path']})")
+    else:
+        atlas_core.start_background_load()
+        print("🤖 Model status: loading in background, serving fallback responses until ready")
+    if registry_watching and not prefork_master():
+        # Under prefork the master watches instead, so workers never hold private copies of a new checkpoint
+        model_registry.start()
     print("✅ AtlasCore AI is operational")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_runner.stop()
+    await atlas_batcher.stop()
+    model_registry.stop()
+    atlas_pool.shutdown()
+
 if __name__ == "__main__":
     print("🚀 Starting AtlasCore AI Server...")
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Dynamic Micro-Batching
+Collects concurrent prompts and runs them through a single batched generate
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from atlas_generation import CancellationToken, GenerationCancelled
+
+
+def abandon(future: asyncio.Future, reason: str):
+    """Fail a waiting request whose cancellation token fired"""
+    if not future.done():
+        future.set_exception(GenerationCancelled(reason))
+
+
+class AtlasBatcher:
+    def __init__(self, generate_fn: Callable, max_batch_size: int = 8, batch_window_ms: float = 15,
+                 run_fn: Optional[Callable] = None, max_concurrent_batches: int = 1, queue=None):
+        # generate_fn(prompts, contexts, adapters, endpoints, tokens) -> responses, runs synchronously;
+        # a row may come back as an exception instead, e.g. when its request was cancelled
+        self.generate_fn = generate_fn
+        # run_fn(fn, *args) awaits fn on a worker; defaults to the loop's executor
+        self.run_fn = run_fn
+        # Anything with async put/get and qsize decides dispatch order; defaults to a FIFO asyncio.Queue
+        self.shared_queue = queue
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.batch_window = max(0.0, batch_window_ms / 1000.0)
+        self.max_concurrent_batches = max(1, int(max_concurrent_batches))
+        self.queue = None
+        self.batch_slots = None
+        self.worker_task = None
+        self.batch_tasks = set()
+        self.stats = {
+            'total_requests': 0,
+            'total_batches': 0,
+            'max_batch_size_seen': 0,
+            'batch_size_histogram': {},
+            'total_queue_wait_ms': 0.0,
+            'max_queue_wait_ms': 0.0
+        }
+        self.recent_waits = deque(maxlen=1000)
+
+    def start(self):
+        """Start the batching loop on the running event loop"""
+        if self.worker_task is None or self.worker_task.done():
+            self.queue = self.shared_queue if self.shared_queue is not None else asyncio.Queue()
+            self.batch_slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self.worker_task = asyncio.get_running_loop().create_task(self.run())
+            print(f"📦 Batcher started (max_batch_size={self.max_batch_size}, window={self.batch_window * 1000:.0f}ms)")
+
+    async def stop(self):
+        """Stop the batching loop"""
+        if self.worker_task:
+            self.worker_task.cancel()
+            try:
+                await self.worker_task
+            except asyncio.CancelledError:
+                pass
+            self.worker_task = None
+
+    async def submit(self, prompt: str, context: Optional[str] = None, adapter: Optional[str] = None,
+                     endpoint: Optional[str] = None, user: Optional[str] = None, cost: int = 0,
+                     lane: Optional[str] = None, token: Optional[CancellationToken] = None) -> str:
+        """Queue a prompt and wait for its slice of the batched generation"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if token is not None:
+            # The caller gets its error, and its slot back, as soon as the request is abandoned
+            token.add_callback(lambda reason: loop.call_soon_threadsafe(abandon, future, reason))
+        await self.queue.put({
+            'prompt': prompt,
+            'context': context,
+            'adapter': adapter,
+            'endpoint': endpoint,
+            'user': user,
+            'cost': cost,
+            'lane': lane,
+            'token': token,
+            'future': future,
+            'enqueued_at': time.perf_counter()
+        })
+        return await future
+
+    async def collect_batch(self) -> List[Dict]:
+        """Wait for the first item, then gather more until the window closes or the batch is full"""
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.batch_window
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def run(self):
+        """Main batching loop"""
+        while True:
+            # Keep collecting while every worker is busy so the next batch fills up
+            await self.batch_slots.acquire()
+            try:
+                batch = await self.collect_batch()
+            except asyncio.CancelledError:
+                self.batch_slots.release()
+                raise
+            self.record_batch(batch)
+            task = asyncio.get_running_loop().create_task(self.process_batch(batch))
+            self.batch_tasks.add(task)
+            task.add_done_callback(self.batch_tasks.discard)
+
+    async def process_batch(self, batch: List[Dict]):
+        """Run one batch on a worker and hand each caller its response"""
+        prompts = [item['prompt'] for item in batch]
+        contexts = [item['context'] for item in batch]
+        adapters = [item['adapter'] for item in batch]
+        endpoints = [item['endpoint'] for item in batch]
+        tokens = [item['token'] for item in batch]
+
+        try:
+            if self.run_fn:
+                responses = await self.run_fn(self.generate_fn, prompts, contexts, adapters, endpoints, tokens)
+            else:
+                responses = await asyncio.get_running_loop().run_in_executor(
+                    None, self.generate_fn, prompts, contexts, adapters, endpoints, tokens
+                )
+            for item, response in zip(batch, responses):
+                if item['future'].done():
+                    continue
+                if isinstance(response, Exception):
+                    item['future'].set_exception(response)
+                else:
+                    item['future'].set_result(response)
+        except Exception as e:
+            print(f"❌ Batch generation failed: {e}")
+            for item in batch:
+                if not item['future'].done():
+                    item['future'].set_exception(e)
+        finally:
+            self.batch_slots.release()
+
+    def record_batch(self, batch: List[Dict]):
+        """Update batch-size and queue-wait statistics"""
+        now = time.perf_counter()
+        size = len(batch)
+
+        self.stats['total_requests'] += size
+        self.stats['total_batches'] += 1
+        self.stats['max_batch_size_seen'] = max(self.stats['max_batch_size_seen'], size)
+        histogram = self.stats['batch_size_histogram']
+        histogram[str(size)] = histogram.get(str(size), 0) + 1
+
+        for item in batch:
+            wait_ms = (now - item['enqueued_at']) * 1000
+            self.stats['total_queue_wait_ms'] += wait_ms
+            self.stats['max_queue_wait_ms'] = max(self.stats['max_queue_wait_ms'], wait_ms)
+            self.recent_waits.append(wait_ms)
+
+    def get_stats(self) -> Dict:
+        """Batch-size and queue-wait statistics for tuning"""
+        total_requests = self.stats['total_requests']
+        total_batches = self.stats['total_batches']
+        waits = sorted(self.recent_waits)
+
+        return {
+            'mode': 'static',
+            'max_batch_size': self.max_batch_size,
+            'batch_window_ms': self.batch_window * 1000,
+            'total_requests': total_requests,
+            'total_batches': total_batches,
+            'avg_batch_size': round(total_requests / total_batches, 2) if total_batches else 0,
+            'max_batch_size_seen': self.stats['max_batch_size_seen'],
+            'batch_size_histogram': dict(self.stats['batch_size_histogram']),
+            'avg_queue_wait_ms': round(self.stats['total_queue_wait_ms'] / total_requests, 2) if total_requests else 0,
+            'p95_queue_wait_ms': round(waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0,
+            'max_queue_wait_ms': round(self.stats['max_queue_wait_ms'], 2),
+            'pending': self.queue.qsize() if self.queue else 0
+        }
+
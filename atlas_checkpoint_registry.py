@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Model Registry
+Watches for freshly trained atlas_model_* checkpoints and hot-swaps them into AtlasCore
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+WEIGHT_FILES = ("model.safetensors", "pytorch_model.bin", "adapter_model.safetensors", "adapter_model.bin")
+
+
+class ModelRegistry:
+    def __init__(self, core, models_dir: str = ".", poll_interval_seconds: float = 30, settle_seconds: float = 10):
+        self.core = core
+        self.models_dir = models_dir
+        self.poll_interval = poll_interval_seconds
+        self.settle_seconds = settle_seconds
+        self.stop_event = threading.Event()
+        self.thread = None
+        # Checkpoints that failed to load or were rolled back are never swapped in automatically again
+        self.rejected = set()
+        self.loading = None
+        self.history = []
+
+    def start(self):
+        """Start polling for new checkpoints on a background thread"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="atlas-model-registry", daemon=True)
+            self.thread.start()
+            print(f"👀 Model registry watching {os.path.abspath(self.models_dir)} every {self.poll_interval}s")
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        while not self.stop_event.wait(self.poll_interval):
+            # Wait for the initial load so we never race it
+            if not self.core.ready:
+                continue
+            try:
+                self.check_for_updates()
+            except Exception as e:
+                print(f"❌ Model registry poll failed: {e}")
+
+    def is_complete(self, path: str) -> bool:
+        """A checkpoint is complete once config, weights and tokenizer are written and have settled"""
+        try:
+            files = os.listdir(path)
+        except OSError:
+            return False
+
+        has_config = "config.json" in files or "adapter_config.json" in files
+        has_weights = any(name in files for name in WEIGHT_FILES) or any(name.endswith(".safetensors") for name in files)
+        has_tokenizer = "tokenizer_config.json" in files
+        if not (has_config and has_weights and has_tokenizer):
+            return False
+
+        newest_change = max(os.path.getmtime(os.path.join(path, name)) for name in files)
+        return time.time() - newest_change >= self.settle_seconds
+
+    def find_candidates(self) -> List[str]:
+        """Complete checkpoint directories, oldest first"""
+        names = sorted(d for d in os.listdir(self.models_dir) if d.startswith('atlas_model_'))
+        paths = [os.path.join(self.models_dir, name) for name in names]
+        return [path for path in paths if os.path.isdir(path) and self.is_complete(path)]
+
+    def is_newer(self, path: str) -> bool:
+        """Checkpoint names carry their training timestamp, so name order is age order"""
+        active = self.core.active
+        if active is None or not os.path.basename(active["model_path"]).startswith('atlas_model_'):
+            return True
+        return os.path.basename(path) > os.path.basename(active["model_path"])
+
+    def check_for_updates(self) -> Optional[str]:
+        """Load, warm and swap in the newest unseen checkpoint, if any"""
+        candidates = [path for path in self.find_candidates()
+                      if os.path.normpath(path) not in self.rejected and self.is_newer(path)]
+        if not candidates:
+            return None
+
+        model_path = candidates[-1]
+        self.loading = model_path
+        print(f"🆕 New checkpoint detected: {model_path}, loading in background...")
+
+        try:
+            started = time.perf_counter()
+            bundle = self.core.load_bundle(model_path)
+            self.core.activate(bundle)
+            self.record("swap", model_path, time.perf_counter() - started)
+            return model_path
+        except Exception as e:
+            print(f"❌ Failed to load {model_path}: {e}")
+            self.rejected.add(os.path.normpath(model_path))
+            self.record("failed", model_path, error=str(e))
+            return None
+        finally:
+            self.loading = None
+
+    def rollback(self) -> Optional[str]:
+        """Return to the previous model and keep the retired one from being swapped back in"""
+        retired = self.core.rollback()
+        if retired is None:
+            return None
+        self.rejected.add(os.path.normpath(retired["model_path"]))
+        self.record("rollback", self.core.active["model_path"])
+        return self.core.active["model_path"]
+
+    def record(self, event: str, model_path: str, load_seconds: Optional[float] = None, error: Optional[str] = None):
+        """Keep a short history of registry events"""
+        entry = {"event": event, "model_path": model_path, "timestamp": datetime.now().isoformat()}
+        if load_seconds is not None:
+            entry["load_seconds"] = round(load_seconds, 2)
+        if error:
+            entry["error"] = error
+        self.history = (self.history + [entry])[-20:]
+
+    def get_stats(self) -> Dict:
+        """Active/previous models and recent registry events"""
+        active = self.core.active
+        return {
+            "active_model": active["model_path"] if active else None,
+            "active_since": active["loaded_at"] if active else None,
+            "adapters": list(active["adapters"]) if active else [],
+            "previous_models": [bundle["model_path"] for bundle in self.core.previous_models],
+            "loading": self.loading,
+            "rejected": sorted(self.rejected),
+            "history": list(self.history)
+        }
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Continuous Batching
+Iteration-level scheduling: requests join the running batch between decode steps and leave as soon as they finish
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import torch
+import torch.nn.functional as F
+
+from atlas_batcher import abandon
+from atlas_generation import CancellationToken, GenerationTimer, build_logits_processors, clone_cache, to_dynamic_cache
+
+
+def pad_left(tensor: torch.Tensor, length: int, dim: int) -> torch.Tensor:
+    """Prepend length zero steps along a sequence dimension"""
+    if length <= 0:
+        return tensor
+    padding = [0, 0] * (tensor.dim() - 1 - dim % tensor.dim()) + [length, 0]
+    return F.pad(tensor, padding)
+
+
+class ContinuousBatcher:
+    """Drop-in replacement for AtlasBatcher that runs one decode loop over a changing set of sequences
+
+    Every running sequence keeps its own rows in a shared left-padded KV-cache. A new request is prefilled on
+    its own and merged into the cache; a finished one is removed at once, so short answers never wait for long ones.
+    """
+
+    def __init__(self, core, max_batch_size: int = 8, queue=None):
+        self.core = core
+        self.max_batch_size = max(1, int(max_batch_size))
+        # Anything with async put/get and qsize decides admission order; defaults to a FIFO asyncio.Queue
+        self.shared_queue = queue
+        self.queue = None
+        # Requests handed from the event loop to the decode thread
+        self.inbox = None
+        self.slots = None
+        self.loop = None
+        self.feeder_task = None
+        self.thread = None
+        self.running = False
+
+        # Decode state, owned by the decode thread
+        self.bundle = None
+        self.rows = []
+        self.cache = None
+        self.attention_mask = None
+
+        self.stats = {
+            'total_requests': 0,
+            'total_steps': 0,
+            'joined_running_batch': 0,
+            'active_rows_sum': 0,
+            'max_active_seen': 0,
+            'generated_tokens': 0,
+            'cancelled': 0,
+            'total_queue_wait_ms': 0.0,
+            'max_queue_wait_ms': 0.0
+        }
+        self.recent_waits = deque(maxlen=1000)
+
+    def start(self):
+        """Start the feeder on the running event loop and the decode thread"""
+        if self.feeder_task is None or self.feeder_task.done():
+            self.loop = asyncio.get_running_loop()
+            self.queue = self.shared_queue if self.shared_queue is not None else asyncio.Queue()
+            self.inbox = queue.Queue()
+            self.slots = asyncio.Semaphore(self.max_batch_size)
+            self.feeder_task = self.loop.create_task(self.feed())
+            self.running = True
+            self.thread = threading.Thread(target=self.run, name="atlas-continuous-batcher", daemon=True)
+            self.thread.start()
+            print(f"📦 Continuous batcher started (max_batch_size={self.max_batch_size})")
+
+    async def stop(self):
+        """Stop the feeder and let the decode thread exit"""
+        if self.feeder_task:
+            self.feeder_task.cancel()
+            try:
+                await self.feeder_task
+            except asyncio.CancelledError:
+                pass
+            self.feeder_task = None
+        self.running = False
+        if self.thread:
+            await asyncio.get_running_loop().run_in_executor(None, self.thread.join)
+            self.thread = None
+
+    async def submit(self, prompt: str, context: Optional[str] = None, adapter: Optional[str] = None,
+                     endpoint: Optional[str] = None, user: Optional[str] = None, cost: int = 0,
+                     lane: Optional[str] = None, token: Optional[CancellationToken] = None) -> str:
+        """Queue a prompt and wait until its sequence finishes"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if token is not None:
+            # The caller gets its error right away; the decode loop drops the sequence at its next step
+            token.add_callback(lambda reason: loop.call_soon_threadsafe(abandon, future, reason))
+        await self.queue.put({
+            'prompt': prompt,
+            'context': context,
+            'adapter': adapter,
+            'endpoint': endpoint,
+            'user': user,
+            'cost': cost,
+            'lane': lane,
+            'token': token,
+            'future': future,
+            'enqueued_at': time.perf_counter()
+        })
+        return await future
+
+    async def feed(self):
+        """Pass queued requests to the decode thread whenever a batch row is free"""
+        while True:
+            await self.slots.acquire()
+            try:
+                item = await self.queue.get()
+            except asyncio.CancelledError:
+                self.slots.release()
+                raise
+            self.inbox.put(item)
+
+    def run(self):
+        """Decode loop: admit waiting requests, advance every running sequence by one token, repeat"""
+        with torch.no_grad():
+            while self.running:
+                self.admit_waiting()
+                if self.rows:
+                    self.step()
+
+    def admit_waiting(self):
+        """Prefill newly arrived requests and merge them into the running batch"""
+        while len(self.rows) < self.max_batch_size:
+            # A hot-swapped model only takes over once the sequences of the old one have drained
+            if self.rows and self.core.active is not self.bundle:
+                return
+            try:
+                item = self.inbox.get(timeout=0.05) if not self.rows else self.inbox.get_nowait()
+            except queue.Empty:
+                return
+
+            self.record_wait(item)
+            token = item['token']
+            if token is not None and token.is_set():
+                # Abandoned while queued: never reaches the model
+                self.stats['cancelled'] += 1
+                self.complete(item, self.core.cancelled_generation(token, self.core.decoding_policy(item['endpoint']), 0))
+                continue
+
+            if not self.rows:
+                self.bundle = self.core.active
+            else:
+                self.stats['joined_running_batch'] += 1
+
+            if self.bundle is None:
+                self.core.metrics.record_fallback("model_unavailable")
+                self.complete(item, self.core.generate_fallback_response(item['prompt']))
+                continue
+
+            try:
+                self.join(item)
+            except Exception as e:
+                print(f"Error generating response: {e}")
+                self.core.metrics.record_fallback("error")
+                self.complete(item, self.core.generate_fallback_response(item['prompt']))
+
+    def join(self, item: Dict):
+        """Prefill one request, reusing the cached context prefix, and add its cache rows to the batch"""
+        core, bundle = self.core, self.bundle
+        model = bundle["model"]
+        adapter = core.resolve_adapter(bundle, item['adapter'])
+        policy = core.decoding_policy(item['endpoint'])
+        prefix = bundle["prefix_caches"].get(adapter, {}).get(item['context']) if item['context'] else None
+        timer = GenerationTimer()
+
+        if prefix is not None:
+            suffix = core.encode_inputs([core.build_suffix_text(item['prompt'])], bundle=bundle, prefix_length=prefix['length'])
+            step_ids = suffix['input_ids']
+            prompt_ids = torch.cat([prefix['input_ids'].cpu(), step_ids], dim=1)
+            past = clone_cache(prefix['past_key_values'])
+        else:
+            step_ids = core.encode_inputs([core.build_input_text(item['prompt'], item['context'])], bundle=bundle)['input_ids']
+            prompt_ids = step_ids
+            past = None
+
+        length = prompt_ids.shape[1]
+        outputs = model(
+            input_ids=step_ids.to(model.device),
+            attention_mask=torch.ones((1, length), dtype=torch.long, device=model.device),
+            position_ids=torch.arange(length - step_ids.shape[1], length, device=model.device)[None],
+            past_key_values=past,
+            use_cache=True,
+            **({"adapter_names": [adapter]} if adapter else {})
+        )
+
+        row = {
+            'item': item,
+            'adapter': adapter,
+            'policy': policy,
+            'processors': build_logits_processors(policy['do_sample'], policy['temperature'], policy['repetition_penalty']),
+            'timer': timer,
+            'ids': prompt_ids[0].tolist(),
+            'generated': [],
+            'position': length,
+            'finished': False,
+            'cancelled': False
+        }
+        self.append_token(row, self.sample(row, outputs.logits[0, -1]))
+        timer.first_token_at = time.perf_counter()
+        if row['finished']:
+            self.finish(row)
+            return
+
+        self.merge(to_dynamic_cache(outputs.past_key_values), length)
+        self.rows.append(row)
+        self.stats['max_active_seen'] = max(self.stats['max_active_seen'], len(self.rows))
+
+    def merge(self, cache, length: int):
+        """Append one sequence's cache to the batch, left-padding whichever side is shorter"""
+        mask = torch.ones((1, length), dtype=torch.long)
+        if self.cache is None:
+            self.cache, self.attention_mask = cache, mask
+            return
+
+        batch_length = self.attention_mask.shape[1]
+        for ours, theirs in zip(self.cache.layers, cache.layers):
+            ours.keys = torch.cat([pad_left(ours.keys, length - batch_length, -2), pad_left(theirs.keys, batch_length - length, -2)])
+            ours.values = torch.cat([pad_left(ours.values, length - batch_length, -2), pad_left(theirs.values, batch_length - length, -2)])
+        self.attention_mask = torch.cat([
+            pad_left(self.attention_mask, length - batch_length, -1),
+            pad_left(mask, batch_length - length, -1)
+        ])
+
+    def step(self):
+        """One decode step for every running sequence"""
+        for row in self.rows:
+            token = row['item']['token']
+            if token is not None and token.is_set():
+                row['finished'] = row['cancelled'] = True
+        if any(row['finished'] for row in self.rows):
+            self.evict_finished()
+            if not self.rows:
+                return
+
+        model = self.bundle["model"]
+        try:
+            input_ids = torch.tensor([[row['ids'][-1]] for row in self.rows], dtype=torch.long)
+            position_ids = torch.tensor([[row['position']] for row in self.rows], dtype=torch.long)
+            self.attention_mask = torch.cat(
+                [self.attention_mask, torch.ones((len(self.rows), 1), dtype=self.attention_mask.dtype)], dim=1
+            )
+            adapter_kwargs = {"adapter_names": [row['adapter'] for row in self.rows]} if self.bundle["adapters"] else {}
+
+            outputs = model(
+                input_ids=input_ids.to(model.device),
+                attention_mask=self.attention_mask.to(model.device),
+                position_ids=position_ids.to(model.device),
+                past_key_values=self.cache,
+                use_cache=True,
+                **adapter_kwargs
+            )
+            self.cache = to_dynamic_cache(outputs.past_key_values)
+            logits = outputs.logits[:, -1, :]
+
+            self.stats['total_steps'] += 1
+            self.stats['active_rows_sum'] += len(self.rows)
+            for index, row in enumerate(self.rows):
+                row['position'] += 1
+                self.append_token(row, self.sample(row, logits[index]))
+
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            self.core.metrics.record_fallback("error", len(self.rows))
+            for row in self.rows:
+                self.complete(row['item'], self.core.generate_fallback_response(row['item']['prompt']))
+            self.rows, self.cache, self.attention_mask = [], None, None
+            return
+
+        if any(row['finished'] for row in self.rows):
+            self.evict_finished()
+
+    def sample(self, row: Dict, logits: torch.Tensor) -> int:
+        """Next token under the row's own decoding policy"""
+        scores = row['processors'](torch.tensor([row['ids']], dtype=torch.long), logits.float()[None].cpu())
+        if row['policy']['do_sample']:
+            return int(torch.multinomial(torch.softmax(scores, dim=-1), num_samples=1)[0, 0])
+        return int(scores.argmax(dim=-1)[0])
+
+    def append_token(self, row: Dict, token: int):
+        """Record a token and decide whether the sequence is done"""
+        row['ids'].append(token)
+        row['generated'].append(token)
+        tokenizer = self.bundle["tokenizer"]
+        policy = row['policy']
+        if token == tokenizer.eos_token_id or len(row['generated']) >= policy['max_new_tokens']:
+            row['finished'] = True
+        elif policy['stop_at_newline'] or policy['stop_strings']:
+            text = self.core.decode_tokens(row['generated'], bundle=self.bundle)
+            row['finished'] = self.core.trim_response(text, policy)[1]
+
+    def evict_finished(self):
+        """Answer finished sequences and drop their rows from the cache"""
+        keep = [index for index, row in enumerate(self.rows) if not row['finished']]
+        for row in self.rows:
+            if row['finished']:
+                self.finish(row)
+        self.rows = [self.rows[index] for index in keep]
+
+        if not self.rows:
+            self.cache, self.attention_mask = None, None
+            return
+
+        keep_index = torch.tensor(keep, dtype=torch.long)
+        self.attention_mask = self.attention_mask[keep_index]
+        # Columns that are padding for every remaining row can go
+        start = int((self.attention_mask.sum(dim=0) > 0).nonzero()[0])
+        self.attention_mask = self.attention_mask[:, start:]
+        for layer in self.cache.layers:
+            layer.keys = layer.keys[keep_index, :, start:]
+            layer.values = layer.values[keep_index, :, start:]
+
+    def finish(self, row: Dict):
+        """Decode, clean up and deliver one sequence's answer"""
+        timer = row['timer']
+        timer.finish()
+        generated = row['generated']
+        self.core.metrics.record_generation("continuous", timer, len(generated))
+        self.stats['generated_tokens'] += len(generated)
+
+        if row['cancelled']:
+            self.stats['cancelled'] += 1
+            self.complete(row['item'], self.core.cancelled_generation(row['item']['token'], row['policy'], len(generated)))
+            return
+
+        response = self.core.trim_response(self.core.decode_tokens(generated, bundle=self.bundle), row['policy'])[0].strip()
+        if len(response) < 10:  # If response too short, use fallback
+            response = self.core.generate_fallback_response(row['item']['prompt'])
+            self.core.metrics.record_fallback("too_short")
+        else:
+            self.core.metrics.responses.inc(source="model")
+        self.complete(row['item'], response)
+
+    def complete(self, item: Dict, result):
+        """Hand a response (or the exception for it) back to the event loop and free the request's batch row"""
+        def deliver():
+            if not item['future'].done():
+                if isinstance(result, Exception):
+                    item['future'].set_exception(result)
+                else:
+                    item['future'].set_result(result)
+            self.slots.release()
+        self.loop.call_soon_threadsafe(deliver)
+
+    def record_wait(self, item: Dict):
+        wait_ms = (time.perf_counter() - item['enqueued_at']) * 1000
+        self.stats['total_requests'] += 1
+        self.stats['total_queue_wait_ms'] += wait_ms
+        self.stats['max_queue_wait_ms'] = max(self.stats['max_queue_wait_ms'], wait_ms)
+        self.recent_waits.append(wait_ms)
+
+    def get_stats(self) -> Dict:
+        """Batch occupancy and queue-wait statistics for tuning"""
+        total_requests = self.stats['total_requests']
+        total_steps = self.stats['total_steps']
+        waits = sorted(self.recent_waits)
+        pending = (self.queue.qsize() if self.queue else 0) + (self.inbox.qsize() if self.inbox else 0)
+
+        return {
+            'mode': 'continuous',
+            'max_batch_size': self.max_batch_size,
+            'active': len(self.rows),
+            'total_requests': total_requests,
+            'total_steps': total_steps,
+            'joined_running_batch': self.stats['joined_running_batch'],
+            'avg_active_rows': round(self.stats['active_rows_sum'] / total_steps, 2) if total_steps else 0,
+            'max_active_seen': self.stats['max_active_seen'],
+            'generated_tokens': self.stats['generated_tokens'],
+            'cancelled': self.stats['cancelled'],
+            'avg_queue_wait_ms': round(self.stats['total_queue_wait_ms'] / total_requests, 2) if total_requests else 0,
+            'p95_queue_wait_ms': round(waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0,
+            'max_queue_wait_ms': round(self.stats['max_queue_wait_ms'], 2),
+            'pending': pending
+        }
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Generation Helpers
+Stopping criteria and streamers shared by the AtlasCore generation paths
+"""
+
+import asyncio
+import copy
+import threading
+import time
+from typing import Callable, List, Optional, Sequence
+
+import torch
+from transformers import (
+    DynamicCache, LogitsProcessorList, RepetitionPenaltyLogitsProcessor, StoppingCriteria, TemperatureLogitsWarper,
+    TextStreamer, TopKLogitsWarper
+)
+
+# generate() samples from the top 50 tokens by default; hand-written decode loops keep the same
+SAMPLING_TOP_K = 50
+
+
+class StopConditionCriteria(StoppingCriteria):
+    """Stop each sequence once its generated text has a line break after real content or a stop string"""
+
+    def __init__(self, decode_fn: Callable, prompt_length: int, stop_strings: Sequence[str] = (),
+                 stop_at_newline: bool = True):
+        self.decode_fn = decode_fn
+        self.prompt_length = prompt_length
+        self.stop_strings = tuple(stop_strings)
+        self.stop_at_newline = stop_at_newline
+        # Rows already stopped are not decoded again while the rest of the batch finishes
+        self.finished = set()
+
+    def __call__(self, input_ids, scores, **kwargs):
+        done = []
+        for index, row in enumerate(input_ids):
+            if index not in self.finished:
+                text = self.decode_fn(row[self.prompt_length:]).lstrip()
+                if (self.stop_at_newline and '\n' in text) or any(stop in text for stop in self.stop_strings):
+                    self.finished.add(index)
+            done.append(index in self.finished)
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+
+class GenerationCancelled(Exception):
+    """Raised when a request's generation was abandoned before it finished"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Generation cancelled ({reason})")
+        self.reason = reason
+
+
+class CancellationToken:
+    """Cancel flag and optional deadline of one request, checked between decode steps"""
+
+    def __init__(self, timeout_seconds: Optional[float] = None):
+        self.deadline = time.monotonic() + timeout_seconds if timeout_seconds else None
+        self.reason = None
+        self.event = threading.Event()
+        self.callbacks = []
+        self.lock = threading.Lock()
+
+    def cancel(self, reason: str = "cancelled"):
+        """Mark the request abandoned and run the registered callbacks once"""
+        with self.lock:
+            if self.event.is_set():
+                return
+            self.reason = reason
+            self.event.set()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback(reason)
+
+    def is_set(self) -> bool:
+        """Cheap check for generation loops; a passed deadline counts even before anyone calls cancel()"""
+        return self.event.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline)
+
+    def cancel_reason(self) -> Optional[str]:
+        if self.event.is_set():
+            return self.reason
+        return "deadline" if self.is_set() else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until the deadline, or None without one"""
+        return max(0.0, self.deadline - time.monotonic()) if self.deadline is not None else None
+
+    def add_callback(self, callback: Callable[[str], None]):
+        """Call callback(reason) on cancellation, right away if that already happened"""
+        with self.lock:
+            if not self.event.is_set():
+                self.callbacks.append(callback)
+                return
+        callback(self.reason)
+
+
+class CancelledStoppingCriteria(StoppingCriteria):
+    """Stop each sequence once its cancellation token (or event) is set"""
+
+    def __init__(self, tokens: Sequence):
+        self.tokens: List = list(tokens)
+        # Whether generation was cut short by a cancellation rather than finishing on its own
+        self.fired = False
+
+    def __call__(self, input_ids, scores, **kwargs):
+        done = [token is not None and token.is_set() for token in self.tokens]
+        self.fired = self.fired or any(done)
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+
+class GenerationTimer(StoppingCriteria):
+    """Never stops generation; notes when the first new token appears to split prefill from decode time"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        return torch.zeros((input_ids.shape[0],), dtype=torch.bool, device=input_ids.device)
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+
+class AsyncTokenStreamer(TextStreamer):
+    """Pushes decoded text from the generation thread into an asyncio queue"""
+
+    def __init__(self, tokenizer, loop: asyncio.AbstractEventLoop, **decode_kwargs):
+        super().__init__(tokenizer, skip_prompt=True, **decode_kwargs)
+        self.loop = loop
+        self.queue = asyncio.Queue()
+
+    def on_finalized_text(self, text: str, stream_end: bool = False):
+        if text:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, text)
+        if stream_end:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+
+    def finish(self, error: Optional[Exception] = None):
+        """Unblock the consumer if generation ended without calling end()"""
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, error)
+
+
+def build_logits_processors(do_sample: bool = False, temperature: float = 1.0,
+                            repetition_penalty: float = 1.0) -> LogitsProcessorList:
+    """The logits processors generate() would apply for these sampling parameters"""
+    processors = LogitsProcessorList()
+    if repetition_penalty and repetition_penalty != 1.0:
+        processors.append(RepetitionPenaltyLogitsProcessor(repetition_penalty))
+    if do_sample:
+        if temperature and temperature != 1.0:
+            processors.append(TemperatureLogitsWarper(temperature))
+        processors.append(TopKLogitsWarper(SAMPLING_TOP_K))
+    return processors
+
+
+def to_dynamic_cache(past_key_values):
+    """Normalize legacy tuple caches to a DynamicCache"""
+    if isinstance(past_key_values, tuple):
+        return DynamicCache.from_legacy_cache(past_key_values)
+    return past_key_values
+
+
+def clone_cache(past_key_values, batch_size: int = 1):
+    """Copy a cached prefix so generate can extend it without touching the original"""
+    cache = copy.deepcopy(past_key_values)
+    if batch_size > 1:
+        cache.batch_repeat_interleave(batch_size)
+    return cache
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Background Jobs
+Long-running tasks run in the background under a concurrency limit; callers poll the job record instead of
+holding an HTTP request open
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import psutil
+
+STATUSES = ("queued", "running", "completed", "failed", "interrupted")
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many jobs are already waiting"""
+
+    def __init__(self, pending: int):
+        super().__init__(f"{pending} jobs already pending, try again later")
+        self.pending = pending
+
+
+def owner_alive(pid: Optional[int], started: Optional[float]) -> bool:
+    """Whether the process that recorded a job still runs; a reused pid, our own included, belongs to a newer process"""
+    if not pid or pid == os.getpid():
+        return False
+    try:
+        created = psutil.Process(pid).create_time()
+    except psutil.NoSuchProcess:
+        return False
+    except psutil.AccessDenied:
+        return True
+    # Rows written before start times were recorded can only be matched by pid
+    return started is None or abs(created - started) < 1
+
+
+class JobRunner:
+    """Used from the event loop only; job records live in SQLite so they outlive the process
+
+    Several server processes can share one database: each runs its own jobs, and any of them can report on all.
+    """
+
+    def __init__(self, db_path: str = "data/atlas_jobs.db", max_concurrent: int = 1, max_pending: int = 100,
+                 keep_finished: int = 1000):
+        self.db_path = db_path
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        # kind -> async fn(progress, **params) returning a JSON-serialisable result
+        self.handlers = {}
+        self.tasks = {}
+        self.slots = None
+        self.started = psutil.Process().create_time()
+        self.schema_ready = False
+
+    def connect(self) -> sqlite3.Connection:
+        """Open the database, creating it and the jobs table on first use so importing the app creates no files"""
+        if not self.schema_ready:
+            if os.path.dirname(self.db_path):
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        id TEXT PRIMARY KEY,
+                        kind TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        params TEXT,
+                        progress REAL DEFAULT 0,
+                        result TEXT,
+                        error TEXT,
+                        pid INTEGER,
+                        pid_started REAL,
+                        created_at TEXT,
+                        started_at TEXT,
+                        finished_at TEXT
+                    )
+                ''')
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+                if "pid_started" not in columns:
+                    conn.execute("ALTER TABLE jobs ADD COLUMN pid_started REAL")
+                conn.commit()
+            except Exception:
+                conn.close()
+                raise
+            self.schema_ready = True
+            return conn
+        return sqlite3.connect(self.db_path)
+
+    def init_database(self):
+        """Close out jobs whose process died before they finished; called at server startup"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, pid, pid_started FROM jobs WHERE status IN ('queued', 'running')")
+        orphans = [job_id for job_id, pid, started in cursor.fetchall() if not owner_alive(pid, started)]
+        for job_id in orphans:
+            cursor.execute(
+                "UPDATE jobs SET status = 'interrupted', error = ?, finished_at = ? WHERE id = ?",
+                ("Server stopped before the job finished", datetime.now().isoformat(), job_id)
+            )
+        conn.commit()
+        conn.close()
+        if orphans:
+            print(f"⚠️ Marked {len(orphans)} unfinished jobs from a previous run as interrupted")
+
+    def register(self, kind: str, handler: Callable[..., Awaitable]):
+        """Accept jobs of this kind; the handler gets a progress(fraction) callback and the job's params"""
+        self.handlers[kind] = handler
+
+    def submit(self, kind: str, params: Optional[Dict] = None) -> Dict:
+        """Record a job and schedule it; returns the queued record"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        pending = sum(1 for task in self.tasks.values() if not task.done())
+        if pending >= self.max_pending:
+            raise JobQueueFullError(pending)
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_concurrent)
+
+        job_id = uuid.uuid4().hex
+        params = params or {}
+        self.execute(
+            "INSERT INTO jobs (id, kind, status, params, pid, pid_started, created_at) VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(params), os.getpid(), self.started, datetime.now().isoformat())
+        )
+        task = asyncio.get_running_loop().create_task(self.run(job_id, kind, params))
+        self.tasks[job_id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(job_id, None))
+        self.prune()
+        return self.get(job_id)
+
+    async def run(self, job_id: str, kind: str, params: Dict):
+        """Wait for a free slot, then run the handler and store its outcome"""
+        try:
+            async with self.slots:
+                self.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (datetime.now().isoformat(), job_id)
+                )
+                result = await self.handlers[kind](lambda fraction: self.set_progress(job_id, fraction), **params)
+        except asyncio.CancelledError:
+            self.finish(job_id, "interrupted", error="Server stopped before the job finished")
+            raise
+        except Exception as e:
+            print(f"Job {job_id} ({kind}) failed: {e}")
+            self.finish(job_id, "failed", error=str(e))
+        else:
+            self.finish(job_id, "completed", result=result)
+
+    def set_progress(self, job_id: str, fraction: float):
+        self.execute("UPDATE jobs SET progress = ? WHERE id = ?", (round(min(1.0, max(0.0, fraction)), 4), job_id))
+
+    def finish(self, job_id: str, status: str, result=None, error: Optional[str] = None):
+        self.execute(
+            "UPDATE jobs SET status = ?, progress = COALESCE(?, progress), result = ?, error = ?, finished_at = ? WHERE id = ?",
+            (status, 1.0 if status == "completed" else None, json.dumps(result) if result is not None else None,
+             error, datetime.now().isoformat(), job_id)
+        )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """One job's record, or None"""
+        rows = self.query("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    def recent(self, status: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Most recent jobs first"""
+        if status:
+            return self.query("SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit))
+        return self.query("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+
+    def prune(self):
+        """Keep only the newest keep_finished finished jobs"""
+        self.execute('''
+            DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND id NOT IN (
+                SELECT id FROM jobs WHERE status NOT IN ('queued', 'running') ORDER BY created_at DESC LIMIT ?
+            )
+        ''', (self.keep_finished,))
+
+    async def stop(self):
+        """Interrupt the jobs still running in this process"""
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def execute(self, sql: str, args: tuple = ()):
+        conn = self.connect()
+        try:
+            conn.execute(sql, args)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def query(self, sql: str, args: tuple = ()) -> List[Dict]:
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute(sql, args).fetchall()
+        finally:
+            conn.close()
+
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job['params'] = json.loads(job['params']) if job['params'] else {}
+            job['result'] = json.loads(job['result']) if job['result'] else None
+            del job['pid'], job['pid_started']
+            jobs.append(job)
+        return jobs
+
+    def get_stats(self) -> Dict:
+        """Job counts by status across every process sharing the database"""
+        conn = self.connect()
+        try:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        finally:
+            conn.close()
+        return {
+            'by_status': {status: counts.get(status, 0) for status in STATUSES},
+            'pending_here': len(self.tasks),
+            'max_concurrent': self.max_concurrent,
+            'max_pending': self.max_pending
+        }
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Memory Sharing Report
+Per-process RSS/PSS so we can verify worker processes share model pages
+"""
+
+import os
+from typing import Dict, List
+
+import psutil
+
+
+def process_memory(pid: int) -> Dict:
+    """RSS, PSS and shared/private split for one process, in MB"""
+    info = psutil.Process(pid).memory_full_info()
+    to_mb = lambda value: round(value / (1024 * 1024), 2)
+    return {
+        'pid': pid,
+        'rss_mb': to_mb(info.rss),
+        'pss_mb': to_mb(getattr(info, 'pss', 0)),
+        'uss_mb': to_mb(getattr(info, 'uss', 0)),
+        'shared_mb': to_mb(getattr(info, 'shared', 0))
+    }
+
+
+def worker_pids(master_pid: int) -> List[int]:
+    """Child processes forked by the prefork master"""
+    try:
+        return [child.pid for child in psutil.Process(master_pid).children()]
+    except psutil.NoSuchProcess:
+        return []
+
+
+def memory_report(pids: List[int]) -> Dict:
+    """Per-process memory plus totals; sum(RSS) far above sum(PSS) means pages are shared"""
+    processes = []
+    for pid in pids:
+        try:
+            processes.append(process_memory(pid))
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+
+    total_rss = sum(p['rss_mb'] for p in processes)
+    total_pss = sum(p['pss_mb'] for p in processes)
+    return {
+        'processes': processes,
+        'total_rss_mb': round(total_rss, 2),
+        'total_pss_mb': round(total_pss, 2),
+        # Fraction of the naive per-process footprint that is saved by sharing
+        'sharing_ratio': round(1 - total_pss / total_rss, 3) if total_rss else 0
+    }
+
+
+def current_report() -> Dict:
+    """Report for this process and, under the prefork master, its sibling workers"""
+    master_pid = int(os.getenv("ATLAS_PREFORK_MASTER", "0"))
+    pids = [master_pid] + worker_pids(master_pid) if master_pid else [os.getpid()]
+    report = memory_report(pids)
+    report['mode'] = 'prefork' if master_pid else 'single'
+    report['self_pid'] = os.getpid()
+    return report
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Serving Metrics
+Counters, gauges and histograms rendered in the Prometheus text exposition format
+"""
+
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Request latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Generation throughput buckets, in tokens per second
+THROUGHPUT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+# Prompt length buckets, in tokens (the model input is capped at 400)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 400, 512, 1024, 2048)
+
+
+def format_value(value: float) -> str:
+    """Prometheus float formatting"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    """Render a {name="value"} label set, escaping as the exposition format requires"""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """One named metric family; values are kept per label combination"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (), fn: Optional[Callable] = None):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        # fn() -> value, read at scrape time instead of being pushed
+        self.fn = fn
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self) -> List[str]:
+        if self.fn is not None:
+            return [f"{self.name} {format_value(self.fn())}"]
+        with self.lock:
+            return [
+                f"{self.name}{format_labels(self.label_names, key)} {format_value(value)}"
+                for key, value in sorted(self.values.items())
+            ]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.values[self.key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self.key(labels)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][index] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self.lock:
+            for key, series in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    labels = format_labels(self.label_names + ("le",), key + (format_value(bound),))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {format_value(series['sum'])}")
+                lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Tuple[str, ...] = (), fn: Optional[Callable] = None) -> Counter:
+        return self.register(Counter(name, help_text, label_names, fn))
+
+    def gauge(self, name: str, help_text: str, label_names: Tuple[str, ...] = (), fn: Optional[Callable] = None) -> Gauge:
+        return self.register(Gauge(name, help_text, label_names, fn))
+
+    def histogram(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text format"""
+        lines = []
+        for metric in self.metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                print(f"⚠️ Could not collect metric {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+class AtlasMetrics(MetricsRegistry):
+    """Inference hot-path metrics used to size the serving fleet"""
+
+    def __init__(self):
+        super().__init__()
+        self.request_latency = self.histogram(
+            "atlas_request_duration_seconds", "HTTP request latency by endpoint (time to first byte for streams)",
+            ("endpoint", "method", "status")
+        )
+        self.stream_ttft = self.histogram(
+            "atlas_stream_time_to_first_token_seconds", "Time until /chat/stream sends its first token"
+        )
+        self.prefill_seconds = self.histogram(
+            "atlas_prefill_seconds", "Time from generate() to the first new token (prompt forward pass)", ("mode",)
+        )
+        self.decode_seconds = self.histogram(
+            "atlas_decode_seconds", "Time spent producing the remaining tokens after the first", ("mode",)
+        )
+        self.tokens_per_second = self.histogram(
+            "atlas_generated_tokens_per_second", "Generated tokens per second of generate() wall time, summed over the batch",
+            ("mode",), buckets=THROUGHPUT_BUCKETS
+        )
+        self.generated_tokens = self.counter(
+            "atlas_generated_tokens_total", "Tokens produced by the model", ("mode",)
+        )
+        self.input_tokens = self.histogram(
+            "atlas_input_tokens", "Prompt length per request before and after the 400-token truncation",
+            ("stage",), buckets=TOKEN_BUCKETS
+        )
+        self.truncated_inputs = self.counter(
+            "atlas_truncated_inputs_total", "Prompts that lost tokens to truncation"
+        )
+        self.responses = self.counter(
+            "atlas_responses_total", "Responses returned, by where they came from", ("source",)
+        )
+        self.fallbacks = self.counter(
+            "atlas_fallback_responses_total", "Canned fallback responses, by reason", ("reason",)
+        )
+        self.cancellations = self.counter(
+            "atlas_cancelled_requests_total", "Requests abandoned before their answer, by reason", ("reason",)
+        )
+        self.cancelled_tokens = self.counter(
+            "atlas_cancelled_tokens_total",
+            "Decode steps skipped because their request was abandoned (max_new_tokens minus tokens already generated)",
+            ("reason",)
+        )
+        self.model_load_seconds = self.gauge(
+            "atlas_model_load_seconds", "Wall time of the last model load including prefix cache and warm-up", ("kind",)
+        )
+
+    def record_generation(self, mode: str, timer, generated_tokens: int):
+        """Split one generate() call into prefill and decode time and record its throughput"""
+        total = timer.finished_at - timer.started_at
+        if timer.first_token_at is not None:
+            self.prefill_seconds.observe(timer.first_token_at - timer.started_at, mode=mode)
+            self.decode_seconds.observe(timer.finished_at - timer.first_token_at, mode=mode)
+        self.generated_tokens.inc(generated_tokens, mode=mode)
+        if total > 0:
+            self.tokens_per_second.observe(generated_tokens / total, mode=mode)
+
+    def record_input_lengths(self, raw_lengths: List[int], kept_lengths: List[int]):
+        """Prompt token counts before and after truncation"""
+        for raw, kept in zip(raw_lengths, kept_lengths):
+            self.input_tokens.observe(raw, stage="raw")
+            self.input_tokens.observe(kept, stage="truncated")
+            if kept < raw:
+                self.truncated_inputs.inc()
+
+    def record_fallback(self, reason: str, count: int = 1):
+        self.fallbacks.inc(count, reason=reason)
+        self.responses.inc(count, source="fallback")
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - ONNX Runtime Backend
+Exports trained atlas_model_* checkpoints to an ONNX decoder with KV-cache inputs and generates through onnxruntime
+
+Usage: python atlas_onnx.py ./atlas_model_20250101_120000 [--output model.onnx]
+"""
+
+import argparse
+import json
+import os
+from types import SimpleNamespace
+from typing import List, Optional
+
+import numpy as np
+import torch
+from transformers import AutoModelForCausalLM, DynamicCache, StoppingCriteriaList
+
+from atlas_generation import build_logits_processors
+
+ONNX_SUBDIR = "onnx"
+ONNX_FILE = "model.onnx"
+META_FILE = "atlas_onnx.json"
+
+
+def onnx_path(model_dir: str) -> str:
+    """Where the exported decoder of a checkpoint lives"""
+    return os.path.join(model_dir, ONNX_SUBDIR, ONNX_FILE)
+
+
+def load_for_export(model_dir: str):
+    """Load a checkpoint in fp32, merging its LoRA adapter into the base weights if it has one"""
+    adapter_config_path = os.path.join(model_dir, 'adapter_config.json')
+    if os.path.exists(adapter_config_path):
+        from peft import PeftModel
+        with open(adapter_config_path, 'r') as f:
+            base_model = json.load(f)['base_model_name_or_path']
+        base = AutoModelForCausalLM.from_pretrained(base_model, torch_dtype=torch.float32)
+        model = PeftModel.from_pretrained(base, model_dir).merge_and_unload()
+    else:
+        model = AutoModelForCausalLM.from_pretrained(model_dir, torch_dtype=torch.float32)
+    return model.eval()
+
+
+class DecoderWithPast(torch.nn.Module):
+    """Flat-tensor wrapper so one ONNX graph serves both prefill (empty past) and decode steps"""
+
+    def __init__(self, model, num_layers: int):
+        super().__init__()
+        self.model = model
+        self.num_layers = num_layers
+
+    def forward(self, input_ids, attention_mask, position_ids, *past):
+        cache = DynamicCache()
+        for layer in range(self.num_layers):
+            cache.update(past[2 * layer], past[2 * layer + 1], layer)
+
+        outputs = self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=cache,
+            use_cache=True
+        )
+        presents = []
+        for layer in outputs.past_key_values.layers:
+            presents.extend([layer.keys, layer.values])
+        return (outputs.logits, *presents)
+
+
+def past_names(num_layers: int, prefix: str = "past_key_values") -> List[str]:
+    return [f"{prefix}.{layer}.{kind}" for layer in range(num_layers) for kind in ("key", "value")]
+
+
+def export_onnx(model_dir: str, output_path: Optional[str] = None, opset: int = 17) -> str:
+    """Export a checkpoint (LoRA merged) to an ONNX decoder that takes and returns the KV-cache"""
+    output_path = output_path or onnx_path(model_dir)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    model = load_for_export(model_dir)
+    config = model.config
+    num_layers = config.num_hidden_layers
+    num_heads = config.num_attention_heads
+    head_dim = config.hidden_size // num_heads
+
+    # Example inputs with left padding and a non-empty past so the traced graph keeps the general mask path
+    batch, past_length, new_length = 2, 3, 4
+    input_ids = torch.randint(0, config.vocab_size, (batch, new_length))
+    attention_mask = torch.ones((batch, past_length + new_length), dtype=torch.long)
+    attention_mask[1, 0] = 0
+    position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)[:, past_length:]
+    past = [torch.randn(batch, num_heads, past_length, head_dim) for _ in range(2 * num_layers)]
+
+    inputs, presents = past_names(num_layers), past_names(num_layers, "present")
+    dynamic_axes = {
+        "input_ids": {0: "batch", 1: "sequence"},
+        "attention_mask": {0: "batch", 1: "total_sequence"},
+        "position_ids": {0: "batch", 1: "sequence"},
+        "logits": {0: "batch", 1: "sequence"}
+    }
+    dynamic_axes.update({name: {0: "batch", 2: "past_sequence"} for name in inputs})
+    dynamic_axes.update({name: {0: "batch", 2: "total_sequence"} for name in presents})
+
+    wrapper = DecoderWithPast(model, num_layers).eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            (input_ids, attention_mask, position_ids, *past),
+            output_path,
+            input_names=["input_ids", "attention_mask", "position_ids", *inputs],
+            output_names=["logits", *presents],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            dynamo=False
+        )
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(output_path)), META_FILE), 'w') as f:
+        json.dump({
+            "source": os.path.abspath(model_dir),
+            "num_layers": num_layers,
+            "num_heads": num_heads,
+            "head_dim": head_dim,
+            "opset": opset
+        }, f, indent=2)
+
+    print(f"📦 Exported {model_dir} to {output_path}")
+    return output_path
+
+
+class OnnxCausalLM:
+    """Stands in for the transformers model in an AtlasCore bundle: a cached forward pass and generate()"""
+
+    def __init__(self, path: str, num_threads: int = 0):
+        import onnxruntime
+        self.ort = onnxruntime
+        self.path = path
+        with open(os.path.join(os.path.dirname(path), META_FILE), 'r') as f:
+            meta = json.load(f)
+        self.num_layers = meta["num_layers"]
+        self.num_heads = meta["num_heads"]
+        self.head_dim = meta["head_dim"]
+        self.num_threads = num_threads
+        self.device = torch.device("cpu")
+        self.input_names = ["input_ids", "attention_mask", "position_ids", *past_names(self.num_layers)]
+        self.session = None
+        self.session_pid = None
+        self.load_session()
+
+    def load_session(self):
+        options = self.ort.SessionOptions()
+        options.intra_op_num_threads = self.num_threads or torch.get_num_threads()
+        options.graph_optimization_level = self.ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = self.ort.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+        self.session_pid = os.getpid()
+
+    def release_session(self):
+        """Drop the session, e.g. in a process about to fork; the next run() opens a new one"""
+        self.session = None
+        self.session_pid = None
+
+    def eval(self):
+        return self
+
+    def run(self, input_ids: torch.Tensor, attention_mask: torch.Tensor, position_ids: torch.Tensor,
+            past: Optional[List[np.ndarray]] = None):
+        """One decoder step; returns logits and the extended KV-cache as numpy arrays"""
+        # onnxruntime thread pools do not survive fork, so each prefork worker opens its own session
+        if self.session_pid != os.getpid():
+            self.load_session()
+
+        if past is None:
+            empty = np.zeros((input_ids.shape[0], self.num_heads, 0, self.head_dim), dtype=np.float32)
+            past = [empty] * (2 * self.num_layers)
+
+        feed = {
+            "input_ids": input_ids.numpy().astype(np.int64),
+            "attention_mask": attention_mask.numpy().astype(np.int64),
+            "position_ids": position_ids.numpy().astype(np.int64)
+        }
+        feed.update(zip(self.input_names[3:], past))
+        outputs = self.session.run(None, feed)
+        return outputs[0], outputs[1:]
+
+    def to_numpy_past(self, cache) -> List[np.ndarray]:
+        past = []
+        for layer in cache.layers:
+            past.extend([layer.keys.float().numpy(), layer.values.float().numpy()])
+        return past
+
+    def to_cache(self, past: List[np.ndarray]) -> DynamicCache:
+        cache = DynamicCache()
+        for layer in range(self.num_layers):
+            cache.update(torch.from_numpy(past[2 * layer]), torch.from_numpy(past[2 * layer + 1]), layer)
+        return cache
+
+    def __call__(self, input_ids: torch.Tensor, attention_mask: Optional[torch.Tensor] = None,
+                 past_key_values=None, use_cache: bool = True, **kwargs):
+        """Forward pass with the same outputs AtlasCore reads from a transformers model"""
+        past = self.to_numpy_past(past_key_values) if past_key_values is not None else None
+        past_length = past[0].shape[2] if past else 0
+        if attention_mask is None:
+            attention_mask = torch.ones((input_ids.shape[0], past_length + input_ids.shape[1]), dtype=torch.long)
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)[:, past_length:]
+
+        logits, presents = self.run(input_ids, attention_mask, position_ids, past)
+        return SimpleNamespace(logits=torch.from_numpy(logits), past_key_values=self.to_cache(presents) if use_cache else None)
+
+    def generate(self, input_ids: torch.Tensor, attention_mask: Optional[torch.Tensor] = None,
+                 max_new_tokens: int = 20, do_sample: bool = False, temperature: float = 1.0,
+                 repetition_penalty: float = 1.0, pad_token_id: Optional[int] = None, eos_token_id: Optional[int] = None,
+                 stopping_criteria: Optional[StoppingCriteriaList] = None, streamer=None, past_key_values=None,
+                 num_return_sequences: int = 1, return_dict_in_generate: bool = False, **kwargs):
+        """Greedy or sampled decoding with the KV-cache kept in onnxruntime outputs, mirroring generate()"""
+        if num_return_sequences != 1 or kwargs.get("adapter_names"):
+            raise ValueError("The ONNX backend generates one sequence per prompt without adapters")
+
+        input_ids = input_ids.cpu()
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        attention_mask = attention_mask.cpu()
+        stopping_criteria = stopping_criteria or StoppingCriteriaList()
+        pad_token_id = pad_token_id if pad_token_id is not None else eos_token_id
+
+        processors = build_logits_processors(do_sample, temperature, repetition_penalty)
+
+        # A cached prefix covers the first tokens of input_ids; only the rest needs a forward pass
+        past = self.to_numpy_past(past_key_values) if past_key_values is not None else None
+        past_length = past[0].shape[2] if past else 0
+        positions = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+        step_ids, step_positions = input_ids[:, past_length:], positions[:, past_length:]
+
+        if streamer is not None:
+            streamer.put(input_ids)
+
+        unfinished = torch.ones(input_ids.shape[0], dtype=torch.bool)
+        for _ in range(max_new_tokens):
+            logits, past = self.run(step_ids, attention_mask, step_positions, past)
+            scores = processors(input_ids, torch.from_numpy(logits[:, -1, :]).float())
+
+            if do_sample:
+                next_tokens = torch.multinomial(torch.softmax(scores, dim=-1), num_samples=1).squeeze(1)
+            else:
+                next_tokens = scores.argmax(dim=-1)
+            # Rows that already finished keep emitting padding, as generate() does
+            next_tokens = torch.where(unfinished, next_tokens, torch.full_like(next_tokens, pad_token_id))
+
+            input_ids = torch.cat([input_ids, next_tokens[:, None]], dim=1)
+            attention_mask = torch.cat([attention_mask, torch.ones((attention_mask.shape[0], 1), dtype=attention_mask.dtype)], dim=1)
+            if streamer is not None:
+                streamer.put(next_tokens)
+
+            if eos_token_id is not None:
+                unfinished &= next_tokens != eos_token_id
+            if len(stopping_criteria):
+                unfinished &= ~stopping_criteria(input_ids, scores)
+            if not unfinished.any():
+                break
+
+            step_ids = next_tokens[:, None]
+            step_positions = step_positions[:, -1:] + 1
+
+        if streamer is not None:
+            streamer.end()
+        if return_dict_in_generate:
+            # Like generate(), the cache covers every token except the last one sampled
+            return SimpleNamespace(sequences=input_ids, past_key_values=self.to_cache(past))
+        return input_ids
+
+
+def load_onnx_model(model_dir: str, num_threads: int = 0) -> OnnxCausalLM:
+    """Open the exported decoder of a checkpoint, exporting it first if needed"""
+    path = onnx_path(model_dir)
+    if not os.path.exists(path):
+        print(f"📦 No ONNX export for {model_dir} yet, exporting...")
+        export_onnx(model_dir, path)
+    return OnnxCausalLM(path, num_threads=num_threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a trained Atlas model to ONNX for the onnxruntime backend")
+    parser.add_argument('model_dir', help="atlas_model_* directory (LoRA adapters are merged into the base model)")
+    parser.add_argument('--output', help=f"Output file (default: <model_dir>/{ONNX_SUBDIR}/{ONNX_FILE})")
+    parser.add_argument('--opset', type=int, default=17)
+    args = parser.parse_args()
+
+    export_onnx(args.model_dir, args.output, args.opset)
+
+
+if __name__ == "__main__":
+    main()
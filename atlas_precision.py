@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Inference Precision Modes
+fp32, bf16 and int8 dynamic quantization for CPU serving
+"""
+
+import torch
+from transformers.pytorch_utils import Conv1D
+
+PRECISION_MODES = ("fp32", "bf16", "int8")
+
+
+def load_dtype(precision: str, use_cuda: bool = False):
+    """dtype to pass to from_pretrained for the chosen precision"""
+    if use_cuda:
+        return torch.float16
+    if precision == "bf16":
+        return torch.bfloat16
+    return torch.float32
+
+
+def conv1d_to_linear(model: torch.nn.Module) -> int:
+    """Swap GPT-2 style Conv1D projections for equivalent nn.Linear layers so they can be quantized"""
+    replaced = 0
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, Conv1D):
+                in_features, out_features = child.weight.shape
+                linear = torch.nn.Linear(in_features, out_features, dtype=child.weight.dtype)
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data.clone()
+                setattr(parent, name, linear)
+                replaced += 1
+    return replaced
+
+
+def apply_precision(model: torch.nn.Module, precision: str) -> torch.nn.Module:
+    """Convert a loaded model to the requested inference precision"""
+    if precision not in PRECISION_MODES:
+        print(f"⚠️ Unknown precision '{precision}', using fp32")
+        precision = "fp32"
+
+    if next(model.parameters()).is_cuda:
+        if precision != "fp32":
+            print(f"⚠️ Precision '{precision}' is a CPU mode, keeping the CUDA float16 weights")
+        return model
+
+    if precision == "bf16":
+        return model.to(torch.bfloat16)
+
+    if precision == "int8":
+        # Dynamic quantization only runs on float32 Linear layers
+        model = model.to(torch.float32)
+        converted = conv1d_to_linear(model)
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        print(f"🔢 Quantized Linear layers to int8 ({converted} Conv1D projections converted)")
+        return model
+
+    return model.to(torch.float32)
+
+
+def model_scale(model: torch.nn.Module) -> int:
+    """Size of a model's transformer blocks from its config, the same whatever precision it runs at
+
+    Counting parameters() would miss int8 Linear weights, which dynamic quantization moves out of the parameters.
+    """
+    config = model.config
+    return config.num_hidden_layers * config.hidden_size ** 2
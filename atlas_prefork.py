@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Prefork Server
+Loads the model once in a master process, then forks uvicorn workers that share its weights copy-on-write.
+The master also watches for new checkpoints and re-forks every worker after a hot-swap or rollback.
+
+Usage: python atlas_prefork.py [--workers 4] [--host 0.0.0.0] [--port 8000] [--report-interval 60]
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+os.environ["ATLAS_PREFORK_MASTER"] = str(os.getpid())
+
+import torch
+import uvicorn
+
+from atlas_app import app, atlas_core, model_registry, registry_config, registry_watching
+from atlas_memory import memory_report
+
+
+class PreforkServer:
+    def __init__(self, workers: int = 2, host: str = "0.0.0.0", port: int = 8000,
+                 threads_per_worker: int = 0, report_interval: float = 60):
+        self.workers = max(1, workers)
+        self.host = host
+        self.port = port
+        # Split cores between workers so their intra-op thread pools do not oversubscribe the CPU
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.workers)
+        self.report_interval = report_interval
+        self.sock = None
+        self.children = {}
+        # Workers replaced after a model change; they finish their requests and are not restarted
+        self.retiring = set()
+        self.stopping = False
+        self.rollback_requested = False
+
+    def bind(self):
+        """Bind the listening socket in the master so every worker accepts on it"""
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+
+    def preload(self):
+        """Load and warm the model before forking so its pages are shared by every worker"""
+        print("🤖 Preloading AtlasCore in the master process...")
+        atlas_core.initialize()
+        self.share_model()
+
+    def share_model(self):
+        """Prepare the active model for sharing with workers forked from now on"""
+        backend = atlas_core.active["backend"] if atlas_core.model_loaded else None
+        if backend == "torch":
+            for parameter in atlas_core.model.parameters():
+                parameter.requires_grad_(False)
+        elif backend == "onnx":
+            # onnxruntime sessions do not survive fork; workers open their own on first use
+            atlas_core.model.release_session()
+            print("ℹ️ ONNX backend: each worker holds its own copy of the decoder weights, only the Python heap is shared")
+        # Move everything allocated so far out of the GC's reach; collections would otherwise
+        # touch object headers in every worker and un-share their pages
+        gc.collect()
+        gc.freeze()
+
+    def spawn(self, index: int):
+        """Fork one worker that serves the app on the inherited socket"""
+        pid = os.fork()
+        if pid:
+            self.children[pid] = index
+            return
+
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+        torch.set_num_threads(self.threads_per_worker)
+        print(f"👷 Worker {index} (pid {os.getpid()}) serving with {self.threads_per_worker} threads")
+
+        config = uvicorn.Config(app, log_level="info")
+        server = uvicorn.Server(config)
+        server.run(sockets=[self.sock])
+        os._exit(0)
+
+    def shutdown(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def request_rollback(self, signum, frame):
+        """A worker got POST /models/rollback"""
+        self.rollback_requested = True
+
+    def reload_workers(self):
+        """Replace every worker with a fresh fork so they all serve the master's new model"""
+        self.share_model()
+        for pid, index in list(self.children.items()):
+            if pid in self.retiring:
+                continue
+            # Start the replacement first; the old worker drains its in-flight requests on SIGTERM
+            self.spawn(index)
+            self.retiring.add(pid)
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        print(f"🔁 Workers re-forked to serve {atlas_core.active['model_path']}")
+
+    def print_report(self):
+        report = memory_report([os.getpid()] + list(self.children))
+        print(f"🧠 Memory: RSS total {report['total_rss_mb']}MB, PSS total {report['total_pss_mb']}MB, "
+              f"sharing ratio {report['sharing_ratio']}")
+        for process in report['processes']:
+            print(f"   pid {process['pid']}: RSS {process['rss_mb']}MB, PSS {process['pss_mb']}MB, "
+                  f"USS {process['uss_mb']}MB")
+
+    def run(self):
+        self.bind()
+        self.preload()
+
+        signal.signal(signal.SIGINT, self.shutdown)
+        signal.signal(signal.SIGTERM, self.shutdown)
+        signal.signal(signal.SIGUSR1, self.request_rollback)
+
+        for index in range(self.workers):
+            self.spawn(index)
+        print(f"🚀 AtlasCore prefork master {os.getpid()} on {self.host}:{self.port} with {self.workers} workers")
+
+        next_report = time.time() + self.report_interval if self.report_interval else None
+        next_poll = time.time() + registry_config['poll_interval_seconds'] if registry_watching else None
+        if next_poll:
+            print(f"👀 Master watching {os.path.abspath(registry_config['models_dir'])} for new checkpoints")
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+
+            if pid:
+                index = self.children.pop(pid)
+                if pid in self.retiring:
+                    self.retiring.discard(pid)
+                elif not self.stopping:
+                    # Re-fork from the master so the replacement shares the same weights
+                    print(f"⚠️ Worker {index} (pid {pid}) exited with status {status}, restarting")
+                    self.spawn(index)
+                continue
+
+            if self.rollback_requested and not self.stopping:
+                self.rollback_requested = False
+                if model_registry.rollback():
+                    self.reload_workers()
+
+            if next_poll and time.time() >= next_poll and not self.stopping:
+                # Loading blocks this loop, but the workers keep serving the current model meanwhile
+                try:
+                    if model_registry.check_for_updates():
+                        self.reload_workers()
+                except Exception as e:
+                    print(f"❌ Model registry poll failed: {e}")
+                next_poll = time.time() + registry_config['poll_interval_seconds']
+
+            if next_report and time.time() >= next_report:
+                self.print_report()
+                next_report = time.time() + self.report_interval
+            time.sleep(0.5)
+
+        print("👋 AtlasCore prefork master stopped")
+
+
+def main():
+    prefork_config = atlas_core.config['prefork']
+    parser = argparse.ArgumentParser(description="Serve AtlasCore from forked workers sharing one copy of the weights")
+    parser.add_argument('--workers', type=int, default=prefork_config['workers'])
+    parser.add_argument('--host', default=prefork_config['host'])
+    parser.add_argument('--port', type=int, default=prefork_config['port'])
+    parser.add_argument('--threads-per-worker', type=int, default=prefork_config['threads_per_worker'])
+    parser.add_argument('--report-interval', type=float, default=prefork_config['report_interval_seconds'],
+                        help="Seconds between RSS/PSS reports from the master (0 disables)")
+    args = parser.parse_args()
+
+    if sys.platform == "win32":
+        print("❌ Prefork mode needs os.fork and is not available on Windows")
+        sys.exit(1)
+
+    PreforkServer(
+        workers=args.workers,
+        host=args.host,
+        port=args.port,
+        threads_per_worker=args.threads_per_worker,
+        report_interval=args.report_interval
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
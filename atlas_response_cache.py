@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Response Cache
+Bounded LRU/TTL caches for generated responses: exact prompt matches, and paraphrases by embedding similarity
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600, max_memory_mb: float = 64):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.entries = OrderedDict()
+        self.memory_bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+    def normalize_prompt(self, prompt: str) -> str:
+        """Case- and whitespace-insensitive form of the prompt"""
+        return re.sub(r'\s+', ' ', prompt).strip().lower()
+
+    def make_key(self, prompt: str, context: Optional[str], params: Dict) -> str:
+        """Cache key from normalized prompt, context and sampling parameters"""
+        payload = json.dumps({
+            'prompt': self.normalize_prompt(prompt),
+            'context': context or '',
+            'params': params
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a fresh cached response and mark it most recently used"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            if self.ttl_seconds and time.time() - entry['created_at'] > self.ttl_seconds:
+                self.remove(key)
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry['response']
+
+    def put(self, key: str, response: str):
+        """Store a response, evicting least recently used entries to stay within bounds"""
+        size = len(key) + len(response.encode('utf-8'))
+        if size > self.max_memory_bytes:
+            return
+
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+
+            self.entries[key] = {
+                'response': response,
+                'created_at': time.time(),
+                'size': size
+            }
+            self.memory_bytes += size
+
+            while len(self.entries) > self.max_entries or self.memory_bytes > self.max_memory_bytes:
+                oldest_key = next(iter(self.entries))
+                self.remove(oldest_key)
+                self.stats['evictions'] += 1
+
+    def remove(self, key: str):
+        """Drop an entry; caller holds the lock"""
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.memory_bytes -= entry['size']
+
+    def clear(self):
+        """Forget every cached response"""
+        with self.lock:
+            self.entries.clear()
+            self.memory_bytes = 0
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'memory_bytes': self.memory_bytes,
+                'max_memory_bytes': self.max_memory_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.stats['hits'],
+                'misses': self.stats['misses'],
+                'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else 0,
+                'evictions': self.stats['evictions'],
+                'expirations': self.stats['expirations']
+            }
+
+
+class SemanticCache:
+    """Nearest-neighbour cache: a prompt whose embedding is close enough to a cached prompt's gets its response
+
+    Brute-force cosine search over a fixed-size matrix, one row per entry, evicted least recently used or after
+    ttl_seconds. Similarity is measured after subtracting the running mean of every prompt looked up, since raw
+    mean-pooled language model states are nearly parallel for any two texts; until min_observed prompts have
+    been seen that mean is unreliable and every lookup misses.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600, similarity_threshold: float = 0.9,
+                 min_observed: int = 16):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.min_observed = min_observed
+        self.lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'hit_similarity_sum': 0.0
+        }
+        self.reset()
+
+    def reset(self):
+        """Empty every slot; the matrix is sized on the first embedding, whose width depends on the model"""
+        self.vectors = None
+        self.namespaces = np.zeros(self.max_entries, dtype=np.int64)
+        self.occupied = np.zeros(self.max_entries, dtype=bool)
+        # slot -> entry, least recently used first
+        self.entries = OrderedDict()
+        self.total = None
+        self.observed = 0
+
+    def make_namespace(self, context: Optional[str], params: Dict) -> int:
+        """Only prompts with the same context and sampling parameters may share an answer"""
+        payload = json.dumps({'context': context or '', 'params': params}, sort_keys=True)
+        return int(hashlib.sha256(payload.encode('utf-8')).hexdigest()[:15], 16)
+
+    def get(self, vector: np.ndarray, namespace: int) -> Optional[Tuple[str, float]]:
+        """Cached response and similarity of the nearest fresh entry above the threshold"""
+        vector = np.asarray(vector, dtype=np.float32)
+        with self.lock:
+            if self.vectors is None:
+                self.vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self.total = np.zeros(vector.shape[0], dtype=np.float64)
+            self.total += vector
+            self.observed += 1
+
+            candidates = np.flatnonzero(self.occupied & (self.namespaces == namespace))
+            if self.observed < self.min_observed or not len(candidates):
+                self.stats['misses'] += 1
+                return None
+
+            mean = (self.total / self.observed).astype(np.float32)
+            rows = self.vectors[candidates] - mean
+            query = vector - mean
+            scores = rows @ query / np.maximum(np.linalg.norm(rows, axis=1) * np.linalg.norm(query), 1e-8)
+            best = int(np.argmax(scores))
+            slot, similarity = int(candidates[best]), float(scores[best])
+            if similarity < self.similarity_threshold:
+                self.stats['misses'] += 1
+                return None
+
+            entry = self.entries[slot]
+            if self.ttl_seconds and time.time() - entry['created_at'] > self.ttl_seconds:
+                self.remove(slot)
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            self.entries.move_to_end(slot)
+            self.stats['hits'] += 1
+            self.stats['hit_similarity_sum'] += similarity
+            return entry['response'], similarity
+
+    def put(self, vector: np.ndarray, namespace: int, response: str):
+        """Store a response under its prompt embedding, evicting the least recently used entry when full"""
+        vector = np.asarray(vector, dtype=np.float32)
+        with self.lock:
+            if self.vectors is None or self.vectors.shape[1] != vector.shape[0]:
+                return
+            if len(self.entries) >= self.max_entries:
+                self.remove(next(iter(self.entries)))
+                self.stats['evictions'] += 1
+            slot = int(np.flatnonzero(~self.occupied)[0])
+
+            self.vectors[slot] = vector
+            self.namespaces[slot] = namespace
+            self.occupied[slot] = True
+            self.entries[slot] = {'response': response, 'created_at': time.time()}
+
+    def remove(self, slot: int):
+        """Free a slot; caller holds the lock"""
+        if self.entries.pop(slot, None) is not None:
+            self.occupied[slot] = False
+
+    def clear(self):
+        """Forget every entry and the running mean, e.g. when embeddings come from a new model"""
+        with self.lock:
+            self.reset()
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters, mean similarity of hits and current size"""
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'similarity_threshold': self.similarity_threshold,
+                'ttl_seconds': self.ttl_seconds,
+                'observed_prompts': self.observed,
+                'hits': self.stats['hits'],
+                'misses': self.stats['misses'],
+                'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else 0,
+                'avg_hit_similarity': round(self.stats['hit_similarity_sum'] / self.stats['hits'], 4) if self.stats['hits'] else 0,
+                'evictions': self.stats['evictions'],
+                'expirations': self.stats['expirations']
+            }
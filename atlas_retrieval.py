@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Retrieval
+Mean-pooled embeddings of the knowledge base and crawled dataset in an in-memory NumPy index with top-k search
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import torch
+
+
+def mean_pool(hidden_states: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
+    """Average the hidden states of real tokens, ignoring padding"""
+    mask = attention_mask.unsqueeze(-1).to(hidden_states.dtype)
+    return (hidden_states * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+
+
+def chunk_text(text: str, max_words: int = 120) -> List[str]:
+    """Split long text into passages of at most max_words words"""
+    words = text.split()
+    return [' '.join(words[start:start + max_words]) for start in range(0, len(words), max_words)]
+
+
+def load_documents(knowledge_base_path: str, dataset_path: str, max_words: int = 120) -> List[Dict]:
+    """Passages from the knowledge base's crawled entries and the training dataset, without duplicates"""
+    documents = []
+    crawled_urls = set()
+
+    try:
+        with open(knowledge_base_path, 'r') as f:
+            knowledge_base = json.load(f)
+        for entry in knowledge_base.get("knowledge_database", {}).get("entries", []):
+            if entry.get("content"):
+                crawled_urls.add(entry.get("url"))
+                for passage in chunk_text(entry["content"], max_words):
+                    documents.append({"text": passage, "source": entry.get("url", "knowledge_base")})
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"⚠️ Could not read {knowledge_base_path}: {e}")
+
+    try:
+        with open(dataset_path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry.get("source") in crawled_urls:
+                    # The crawler copies each page into the dataset too
+                    continue
+                text = f"{entry.get('input', '')}: {entry.get('output', '')}".strip(': ')
+                for passage in chunk_text(text, max_words):
+                    documents.append({"text": passage, "source": entry.get("source", "dataset")})
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"⚠️ Could not read {dataset_path}: {e}")
+
+    return documents
+
+
+def load_added_documents(path: str) -> List[Dict]:
+    """Passages added through the API, in the order they were added"""
+    documents = []
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    documents.append(json.loads(line))
+    except FileNotFoundError:
+        pass
+    except json.JSONDecodeError as e:
+        print(f"⚠️ Could not read {path}: {e}")
+    return documents
+
+
+def save_added_documents(path: str, documents: List[Dict]):
+    """Append API-added passages so indexes built later, for another model or after a restart, include them"""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        for document in documents:
+            f.write(json.dumps(document) + "\n")
+
+
+def document_key(text: str) -> str:
+    return hashlib.sha256(' '.join(text.split()).lower().encode('utf-8')).hexdigest()
+
+
+class VectorIndex:
+    """Exact cosine-similarity search over a growing matrix of embeddings; thread-safe
+
+    Vectors are compared after subtracting the mean of the index, which spreads out the otherwise very similar
+    mean-pooled states of a causal language model.
+    """
+
+    def __init__(self, dimensions: int, initial_capacity: int = 256):
+        self.dimensions = dimensions
+        self.vectors = np.zeros((initial_capacity, dimensions), dtype=np.float32)
+        self.documents = []
+        self.keys = set()
+        self.total = np.zeros(dimensions, dtype=np.float64)
+        # Centered, normalized copy of the used rows; rebuilt on the first search after an add
+        self.normalized = None
+        self.lock = threading.Lock()
+        self.stats = {'searches': 0, 'added': 0, 'duplicates': 0}
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, vectors: np.ndarray, documents: List[Dict]) -> int:
+        """Append embeddings with their documents, skipping texts already indexed; returns how many were added"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimensions)
+        with self.lock:
+            added = 0
+            for vector, document in zip(vectors, documents):
+                key = document_key(document["text"])
+                if key in self.keys:
+                    self.stats['duplicates'] += 1
+                    continue
+                if len(self.documents) == len(self.vectors):
+                    # Double the capacity so a run of adds copies the matrix a logarithmic number of times
+                    self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+                self.vectors[len(self.documents)] = vector
+                self.documents.append(document)
+                self.keys.add(key)
+                self.total += vector
+                added += 1
+            if added:
+                self.normalized = None
+                self.stats['added'] += added
+            return added
+
+    def search(self, vectors: np.ndarray, k: int = 3, min_score: Optional[float] = None) -> List[List[Dict]]:
+        """Top-k documents with their scores for each query vector, best first"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimensions)
+        with self.lock:
+            self.stats['searches'] += len(vectors)
+            count = len(self.documents)
+            if not count:
+                return [[] for _ in vectors]
+
+            mean = (self.total / count).astype(np.float32)
+            if self.normalized is None:
+                centered = self.vectors[:count] - mean
+                self.normalized = centered / np.maximum(np.linalg.norm(centered, axis=1, keepdims=True), 1e-8)
+            # Documents are only ever appended, so the first count entries stay valid after the lock is released
+            matrix, documents = self.normalized, self.documents
+
+        queries = vectors - mean
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-8)
+        scores = queries @ matrix.T
+
+        k = min(k, count)
+        results = []
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k]
+            top = top[np.argsort(-row[top])]
+            results.append([
+                dict(documents[index], score=round(float(row[index]), 4))
+                for index in top
+                if min_score is None or row[index] >= min_score
+            ])
+        return results
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {
+                'documents': len(self.documents),
+                'dimensions': self.dimensions,
+                'capacity': len(self.vectors),
+                'memory_mb': round(self.vectors.nbytes / 1024 / 1024, 2),
+                **self.stats
+            }
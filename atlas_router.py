@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Complexity Routing
+Scores prompts with cheap text features and sends easy ones to the canned fallback or a small resident model,
+keeping the trained model for the hard ones
+"""
+
+import re
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional, Tuple
+
+ROUTES = ("fallback", "small", "main")
+
+# Words that ask for reasoning rather than a quick answer
+REASONING_WORDS = {
+    'why', 'how', 'explain', 'compare', 'analyze', 'analyse', 'evaluate', 'design', 'plan', 'strategy',
+    'tradeoffs', 'tradeoff', 'pros', 'cons', 'versus', 'vs', 'step', 'steps', 'detailed', 'implement',
+    'optimize', 'forecast', 'predict', 'difference', 'impact'
+}
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+CLAUSE_PATTERN = re.compile(r"[?.;!]|,| and | or | then ")
+
+
+class ComplexityRouter:
+    """Picks a route per request; thread-safe so decisions and latencies can be recorded from anywhere"""
+
+    def __init__(self, topic_keywords: Iterable[str], fallback_max_score: float = 0.15,
+                 small_max_score: float = 0.4, endpoints: Iterable[str] = ("chat",)):
+        # Single words and phrases the canned fallback answers have a response for
+        keywords = [keyword.lower() for keyword in topic_keywords]
+        self.topic_words = {keyword for keyword in keywords if ' ' not in keyword}
+        self.topic_phrases = [keyword for keyword in keywords if ' ' in keyword]
+        self.fallback_max_score = fallback_max_score
+        self.small_max_score = small_max_score
+        self.endpoints = set(endpoints)
+        self.lock = threading.Lock()
+        self.stats = {route: {'requests': 0, 'total_seconds': 0.0} for route in ROUTES}
+        self.latencies = {route: deque(maxlen=1000) for route in ROUTES}
+        self.recent = deque(maxlen=20)
+
+    def score(self, prompt: str) -> float:
+        """Complexity in [0, 1] from length, reasoning words, number of clauses and long words"""
+        text = prompt.lower()
+        words = WORD_PATTERN.findall(text)
+        if not words:
+            return 0.0
+
+        length = min(1.0, len(words) / 40)
+        reasoning = min(1.0, sum(1 for word in words if word in REASONING_WORDS) / 3)
+        clauses = min(1.0, len(CLAUSE_PATTERN.findall(text)) / 4)
+        long_words = min(1.0, sum(1 for word in words if len(word) > 8) / len(words) * 4)
+        return round(0.45 * length + 0.3 * reasoning + 0.15 * clauses + 0.1 * long_words, 4)
+
+    def has_canned_answer(self, prompt: str) -> bool:
+        """Whether one of the fallback topics matches as a whole word or phrase"""
+        text = prompt.lower()
+        words = set(WORD_PATTERN.findall(text))
+        return bool(words & self.topic_words) or any(phrase in text for phrase in self.topic_phrases)
+
+    def choose(self, prompt: str, endpoint: Optional[str], small_available: bool,
+               adapter: Optional[str] = None) -> Tuple[str, Optional[float]]:
+        """Route and score for one request; endpoints that are not routed always use the main model, unscored
+
+        So do requests served by a LoRA adapter, which neither the canned answers nor the small model can apply.
+        """
+        if (endpoint or "chat") not in self.endpoints or adapter:
+            return "main", None
+
+        score = self.score(prompt)
+        if score <= self.fallback_max_score and self.has_canned_answer(prompt):
+            route = "fallback"
+        elif score <= self.small_max_score and small_available:
+            route = "small"
+        else:
+            route = "main"
+        return route, score
+
+    def record(self, route: str, score: Optional[float], seconds: float, endpoint: Optional[str] = None):
+        """Log one answered request's route and end-to-end latency"""
+        with self.lock:
+            self.stats[route]['requests'] += 1
+            self.stats[route]['total_seconds'] += seconds
+            self.latencies[route].append(seconds)
+            self.recent.append({
+                'route': route,
+                'score': score,
+                'endpoint': endpoint or "chat",
+                'latency_ms': round(seconds * 1000, 2)
+            })
+
+    def get_stats(self) -> Dict:
+        """Requests and latency per route, plus the latest decisions"""
+        with self.lock:
+            routes = {}
+            for route in ROUTES:
+                requests = self.stats[route]['requests']
+                latencies = sorted(self.latencies[route])
+                routes[route] = {
+                    'requests': requests,
+                    'avg_latency_ms': round(self.stats[route]['total_seconds'] / requests * 1000, 2) if requests else 0,
+                    'p95_latency_ms': round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2) if latencies else 0
+                }
+            total = sum(self.stats[route]['requests'] for route in ROUTES)
+            return {
+                'routes': routes,
+                'offloaded_rate': round(1 - self.stats['main']['requests'] / total, 4) if total else 0,
+                'thresholds': {'fallback_max_score': self.fallback_max_score, 'small_max_score': self.small_max_score},
+                'recent': list(self.recent)
+            }
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Fair Request Scheduling
+Per-user token buckets for admission and a cost-weighted fair queue with a priority lane for the batcher
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+LANES = ("priority", "bulk")
+
+
+class RateLimitedError(Exception):
+    """Raised when a user's token budget cannot cover a request"""
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(f"Rate limit exceeded ({reason}), retry after {retry_after}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class FairScheduler:
+    """Used from the event loop only; the batcher reads it like an asyncio.Queue"""
+
+    def __init__(self, tokens_per_second: float = 200, burst_tokens: int = 2000, max_queued_per_user: int = 16,
+                 priority_endpoints=("chat",), priority_max_cost: int = 256, priority_burst: int = 4,
+                 quantum: int = 256, chars_per_token: float = 4.0):
+        self.tokens_per_second = max(0.001, float(tokens_per_second))
+        self.burst_tokens = max(1, int(burst_tokens))
+        self.max_queued_per_user = max(1, int(max_queued_per_user))
+        self.priority_endpoints = set(priority_endpoints)
+        self.priority_max_cost = int(priority_max_cost)
+        # Consecutive priority picks before one bulk item is let through, so bulk work never starves
+        self.priority_burst = max(1, int(priority_burst))
+        self.quantum = max(1, int(quantum))
+        self.chars_per_token = chars_per_token
+        self.buckets = {}
+        self.in_flight = {}
+        # Per lane: user -> deque of waiting items, in round-robin order
+        self.lanes = {lane: OrderedDict() for lane in LANES}
+        self.deficits = {lane: {} for lane in LANES}
+        self.turn = {lane: None for lane in LANES}
+        self.priority_streak = 0
+        self.size = 0
+        self.not_empty = asyncio.Event()
+        self.stats = {
+            'admitted': 0,
+            'rejected_budget': 0,
+            'rejected_queued': 0,
+            'charged_tokens': 0,
+            'dispatched': {lane: 0 for lane in LANES}
+        }
+
+    def estimate_cost(self, text: str, max_new_tokens: int) -> int:
+        """Upper-bound token cost: estimated prompt tokens plus the full generation budget"""
+        return math.ceil(len(text) / self.chars_per_token) + int(max_new_tokens)
+
+    def lane_for(self, endpoint: Optional[str], cost: int) -> str:
+        """Cheap interactive calls jump ahead of bulk work"""
+        if (endpoint or "chat") in self.priority_endpoints and cost <= self.priority_max_cost:
+            return "priority"
+        return "bulk"
+
+    def refill(self, user: str) -> Dict:
+        now = time.monotonic()
+        bucket = self.buckets.get(user)
+        if bucket is None:
+            bucket = self.buckets[user] = {'tokens': float(self.burst_tokens), 'updated': now}
+        else:
+            bucket['tokens'] = min(self.burst_tokens, bucket['tokens'] + (now - bucket['updated']) * self.tokens_per_second)
+            bucket['updated'] = now
+        return bucket
+
+    def admit(self, user: str, cost: int):
+        """Charge a request to the user's bucket or fail fast with a retry hint"""
+        if self.in_flight.get(user, 0) >= self.max_queued_per_user:
+            self.stats['rejected_queued'] += 1
+            raise RateLimitedError(1, f"more than {self.max_queued_per_user} requests in flight")
+
+        # Requests larger than the burst can still pass once the bucket is full
+        cost = min(cost, self.burst_tokens)
+        bucket = self.refill(user)
+        if bucket['tokens'] < cost:
+            self.stats['rejected_budget'] += 1
+            retry_after = math.ceil((cost - bucket['tokens']) / self.tokens_per_second)
+            raise RateLimitedError(max(1, retry_after), "token budget exhausted")
+
+        bucket['tokens'] -= cost
+        self.in_flight[user] = self.in_flight.get(user, 0) + 1
+        self.stats['admitted'] += 1
+        self.stats['charged_tokens'] += cost
+        self.prune()
+
+    def release(self, user: str):
+        """The user's request got its answer"""
+        remaining = self.in_flight.get(user, 0) - 1
+        if remaining > 0:
+            self.in_flight[user] = remaining
+        else:
+            self.in_flight.pop(user, None)
+
+    def prune(self, max_users: int = 10000):
+        """Forget idle users whose bucket has refilled anyway"""
+        if len(self.buckets) <= max_users:
+            return
+        for user in list(self.buckets):
+            if user not in self.in_flight and self.refill(user)['tokens'] >= self.burst_tokens:
+                del self.buckets[user]
+
+    # asyncio.Queue-compatible interface for AtlasBatcher
+
+    async def put(self, item: Dict):
+        lane = item.get('lane') or "bulk"
+        self.lanes[lane].setdefault(item.get('user') or "anonymous", deque()).append(item)
+        self.size += 1
+        self.not_empty.set()
+
+    async def get(self) -> Dict:
+        while self.size == 0:
+            self.not_empty.clear()
+            await self.not_empty.wait()
+        return self.pop_next()
+
+    def qsize(self) -> int:
+        return self.size
+
+    def pop_next(self) -> Dict:
+        """Priority lane first, with a bulk item let through after every priority_burst picks"""
+        if self.lanes["priority"] and (self.priority_streak < self.priority_burst or not self.lanes["bulk"]):
+            lane = "priority"
+            self.priority_streak += 1
+        else:
+            lane = "bulk"
+            self.priority_streak = 0
+
+        self.size -= 1
+        self.stats['dispatched'][lane] += 1
+        return self.pop_fair(lane)
+
+    def pop_fair(self, lane: str) -> Dict:
+        """Deficit round robin across users, so each gets an equal share of tokens rather than of requests"""
+        users, deficits = self.lanes[lane], self.deficits[lane]
+        while True:
+            user, items = next(iter(users.items()))
+            if self.turn[lane] != user:
+                # A user's turn starts: grant one quantum of tokens
+                self.turn[lane] = user
+                deficits[user] = deficits.get(user, 0) + self.quantum
+
+            cost = items[0].get('cost', 0)
+            if deficits[user] >= cost:
+                deficits[user] -= cost
+                item = items.popleft()
+                if not items:
+                    del users[user]
+                    deficits.pop(user, None)
+                    self.turn[lane] = None
+                return item
+
+            # Not enough credit yet; carry it over to the user's next turn
+            users.move_to_end(user)
+            self.turn[lane] = None
+
+    def get_stats(self) -> Dict:
+        """Bucket, lane and rejection counters"""
+        return {
+            'tokens_per_second': self.tokens_per_second,
+            'burst_tokens': self.burst_tokens,
+            'tracked_users': len(self.buckets),
+            'users_in_flight': len(self.in_flight),
+            'queued': {lane: sum(len(items) for items in self.lanes[lane].values()) for lane in LANES},
+            'dispatched': dict(self.stats['dispatched']),
+            'admitted': self.stats['admitted'],
+            'rejected_budget': self.stats['rejected_budget'],
+            'rejected_queued': self.stats['rejected_queued'],
+            'charged_tokens': self.stats['charged_tokens']
+        }
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Conversation Sessions
+Per-user conversation state with the KV-cache of the turns so far, bounded by total cached tokens
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class SessionStore:
+    def __init__(self, max_total_tokens: int = 32768, max_session_tokens: int = 768, max_turns: int = 20,
+                 ttl_seconds: float = 1800):
+        self.max_total_tokens = max(1, int(max_total_tokens))
+        self.max_session_tokens = max(1, int(max_session_tokens))
+        self.max_turns = max(1, int(max_turns))
+        self.ttl_seconds = ttl_seconds
+        self.sessions = OrderedDict()
+        self.total_tokens = 0
+        self.checked_out = set()
+        # Sessions reset while a turn was running must not come back when it finishes
+        self.reset_pending = set()
+        self.lock = threading.Lock()
+        self.stats = {
+            'turns': 0,
+            'resumed_turns': 0,
+            'reused_tokens': 0,
+            'prefilled_tokens': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'resets': 0
+        }
+
+    def checkout(self, user_id: str) -> Optional[Dict]:
+        """Take a user's session out of the store for the duration of one turn"""
+        with self.lock:
+            session = self.sessions.get(user_id)
+            if session is None:
+                return None
+            self.remove(user_id)
+            if self.ttl_seconds and time.time() - session['updated_at'] > self.ttl_seconds:
+                self.stats['expirations'] += 1
+                return None
+            self.checked_out.add(user_id)
+            return session
+
+    def checkin(self, user_id: str, session: Optional[Dict]):
+        """Put a session back after its turn, evicting least recently used sessions to stay within budget"""
+        with self.lock:
+            self.checked_out.discard(user_id)
+            if user_id in self.reset_pending:
+                self.reset_pending.discard(user_id)
+                session = None
+            if session is None:
+                return
+
+            self.stats['turns'] += 1
+            self.stats['reused_tokens'] += session['reused_tokens']
+            self.stats['prefilled_tokens'] += session['prefilled_tokens']
+            if session['reused_tokens']:
+                self.stats['resumed_turns'] += 1
+
+            if session['tokens'] > self.max_total_tokens:
+                return
+
+            # A concurrent turn for the same user may have finished first; the latest one wins
+            self.remove(user_id)
+            session['turns'] = session['turns'][-self.max_turns:]
+            session['updated_at'] = time.time()
+            self.sessions[user_id] = session
+            self.total_tokens += session['tokens']
+
+            while self.total_tokens > self.max_total_tokens:
+                oldest = next(iter(self.sessions))
+                self.remove(oldest)
+                self.stats['evictions'] += 1
+
+    def remove(self, user_id: str):
+        """Drop a session; caller holds the lock"""
+        session = self.sessions.pop(user_id, None)
+        if session:
+            self.total_tokens -= session['tokens']
+
+    def reset(self, user_id: str) -> bool:
+        """Forget a user's conversation; returns whether there was one"""
+        with self.lock:
+            existed = user_id in self.sessions or user_id in self.checked_out
+            self.remove(user_id)
+            if user_id in self.checked_out:
+                self.reset_pending.add(user_id)
+            if existed:
+                self.stats['resets'] += 1
+            return existed
+
+    def clear(self):
+        """Forget every session, e.g. when the serving model changes"""
+        with self.lock:
+            self.sessions.clear()
+            self.total_tokens = 0
+
+    def describe(self, user_id: str) -> Optional[Dict]:
+        """Recent turns and cache size of one session"""
+        with self.lock:
+            session = self.sessions.get(user_id)
+            if session is None:
+                return None
+            return {
+                'user_id': user_id,
+                'turns': list(session['turns']),
+                'cached_tokens': session['tokens'],
+                'context': session['context'],
+                'adapter': session['adapter'],
+                'updated_at': session['updated_at']
+            }
+
+    def get_stats(self) -> Dict:
+        """Session counts, token budget and prefill savings"""
+        with self.lock:
+            processed = self.stats['reused_tokens'] + self.stats['prefilled_tokens']
+            return {
+                'sessions': len(self.sessions),
+                'total_tokens': self.total_tokens,
+                'max_total_tokens': self.max_total_tokens,
+                'max_session_tokens': self.max_session_tokens,
+                'turns': self.stats['turns'],
+                'resumed_turns': self.stats['resumed_turns'],
+                'reused_tokens': self.stats['reused_tokens'],
+                'prefilled_tokens': self.stats['prefilled_tokens'],
+                'prefill_saved_ratio': round(self.stats['reused_tokens'] / processed, 4) if processed else 0,
+                'evictions': self.stats['evictions'],
+                'expirations': self.stats['expirations'],
+                'resets': self.stats['resets']
+            }
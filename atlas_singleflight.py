@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Request Coalescing
+Identical requests that arrive while one is already generating wait for that generation instead of starting their own
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import Awaitable, Callable, Dict, Optional
+
+from atlas_batcher import abandon
+from atlas_generation import CancellationToken
+
+
+def settle(task: asyncio.Future, waiter: asyncio.Future):
+    """Copy a shared call's outcome to one caller that is still waiting"""
+    if task.cancelled():
+        if not waiter.done():
+            waiter.cancel()
+        return
+    # Reading the exception also marks it retrieved when every caller has already gone
+    error = task.exception()
+    if waiter.done():
+        return
+    if error is not None:
+        waiter.set_exception(error)
+    else:
+        waiter.set_result(task.result())
+
+
+class SingleFlight:
+    """Used from the event loop only"""
+
+    def __init__(self):
+        self.calls = {}
+        self.stats = {
+            'leaders': 0,
+            'joins': 0,
+            'max_waiters': 0
+        }
+
+    def make_key(self, prompt: str, context: Optional[str], endpoint: Optional[str], params: Dict) -> str:
+        """Key from the exact prompt, context, endpoint and decoding parameters"""
+        payload = json.dumps({
+            'prompt': prompt,
+            'context': context or '',
+            'endpoint': endpoint or 'chat',
+            'params': params
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    async def do(self, key: str, fn: Callable[[CancellationToken], Awaitable],
+                 token: Optional[CancellationToken] = None):
+        """Await fn(shared_token) once per key; callers arriving while it runs share its result or exception
+
+        A caller whose own token fires gets GenerationCancelled right away. The shared token, and with it the
+        generation, is only cancelled once every caller has gone.
+        """
+        call = self.calls.get(key)
+        if call is None:
+            # The shared call runs as its own task so one caller going away does not fail the others
+            shared = CancellationToken()
+            call = self.calls[key] = {'task': asyncio.ensure_future(fn(shared)), 'token': shared, 'waiters': 1}
+            call['task'].add_done_callback(lambda task: self.forget(key, call))
+            self.stats['leaders'] += 1
+        else:
+            call['waiters'] += 1
+            self.stats['joins'] += 1
+            self.stats['max_waiters'] = max(self.stats['max_waiters'], call['waiters'])
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        call['task'].add_done_callback(lambda task: settle(task, waiter))
+        if token is not None:
+            token.add_callback(lambda reason: loop.call_soon_threadsafe(abandon, waiter, reason))
+        try:
+            return await waiter
+        finally:
+            call['waiters'] -= 1
+            if not call['waiters'] and not call['task'].done():
+                # Later identical requests must start afresh instead of joining a dying generation
+                self.forget(key, call)
+                call['token'].cancel(token.cancel_reason() if token is not None and token.is_set() else "disconnected")
+
+    def forget(self, key: str, call: Dict):
+        if self.calls.get(key) is call:
+            del self.calls[key]
+
+    def get_stats(self) -> Dict:
+        """Shared generations and the requests that joined them"""
+        total = self.stats['leaders'] + self.stats['joins']
+        return {
+            'in_flight': len(self.calls),
+            'leaders': self.stats['leaders'],
+            'joins': self.stats['joins'],
+            'join_rate': round(self.stats['joins'] / total, 4) if total else 0,
+            'max_waiters': self.stats['max_waiters']
+        }
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Inference Worker Pool
+Runs CPU-heavy generation off the event loop with bounded admission
+"""
+
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+
+class PoolOverloadedError(Exception):
+    """Raised when the admission queue is full"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Inference queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class InferencePool:
+    def __init__(self, max_workers: int = 2, max_queue_size: int = 64, retry_after_seconds: int = 1):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue_size = max(1, int(max_queue_size))
+        self.retry_after_seconds = max(1, int(retry_after_seconds))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="atlas-inference")
+        self.lock = threading.Lock()
+        self.admitted = 0
+        self.active = 0
+        self.stats = {
+            'admitted_total': 0,
+            'rejected_total': 0,
+            'completed_runs': 0,
+            'failed_runs': 0,
+            'total_run_seconds': 0.0
+        }
+
+    def admit(self):
+        """Reserve an admission slot or fail fast when the queue is full"""
+        with self.lock:
+            if self.admitted >= self.max_queue_size:
+                self.stats['rejected_total'] += 1
+                raise PoolOverloadedError(self.estimate_retry_after())
+            self.admitted += 1
+            self.stats['admitted_total'] += 1
+
+    def release(self):
+        """Free an admission slot once the request has its answer"""
+        with self.lock:
+            self.admitted = max(0, self.admitted - 1)
+
+    def estimate_retry_after(self) -> int:
+        """Rough seconds until a slot frees up, based on observed run times"""
+        runs = self.stats['completed_runs'] + self.stats['failed_runs']
+        if not runs:
+            return self.retry_after_seconds
+        avg_run = self.stats['total_run_seconds'] / runs
+        backlog = max(1, self.admitted - self.active)
+        return max(self.retry_after_seconds, math.ceil(avg_run * backlog / self.max_workers))
+
+    async def run(self, fn: Callable, *args):
+        """Execute fn(*args) on a worker thread without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.execute, fn, *args)
+
+    def execute(self, fn: Callable, *args):
+        """Worker-side wrapper that tracks active work and run time"""
+        started = time.perf_counter()
+        with self.lock:
+            self.active += 1
+        try:
+            result = fn(*args)
+            with self.lock:
+                self.stats['completed_runs'] += 1
+            return result
+        except Exception:
+            with self.lock:
+                self.stats['failed_runs'] += 1
+            raise
+        finally:
+            with self.lock:
+                self.active -= 1
+                self.stats['total_run_seconds'] += time.perf_counter() - started
+
+    def shutdown(self):
+        """Stop accepting work and let running jobs finish"""
+        self.executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict:
+        """Queue depth and admission counters"""
+        with self.lock:
+            runs = self.stats['completed_runs'] + self.stats['failed_runs']
+            return {
+                'max_workers': self.max_workers,
+                'max_queue_size': self.max_queue_size,
+                'queue_depth': self.admitted,
+                'active_workers': self.active,
+                'admitted_total': self.stats['admitted_total'],
+                'rejected_total': self.stats['rejected_total'],
+                'completed_runs': self.stats['completed_runs'],
+                'failed_runs': self.stats['failed_runs'],
+                'avg_run_ms': round(self.stats['total_run_seconds'] / runs * 1000, 2) if runs else 0
+            }
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Assisted Decoding Benchmark
+Draft-token acceptance rate, latency and greedy output agreement of assisted generation against plain decoding
+
+Usage: python benchmarks/benchmark_assisted.py [--draft-model distilgpt2] [--num-assistant-tokens 3 5 8] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from atlas_app import AtlasCore, ENDPOINT_CONTEXTS
+
+SAMPLE_PROMPTS = [
+    ("How to generate revenue with AI automation?", None),
+    ("What are the best crisis management strategies?", ENDPOINT_CONTEXTS["analyze"]),
+    ("Current trends in business automation", ENDPOINT_CONTEXTS["research"])
+]
+
+
+class ForwardCounter:
+    """Counts forward passes of a model through a hook"""
+
+    def __init__(self, model):
+        self.calls = 0
+        self.handle = model.register_forward_hook(self.hook)
+
+    def hook(self, module, inputs, outputs):
+        self.calls += 1
+
+    def remove(self):
+        self.handle.remove()
+
+
+def generated_tokens(core: AtlasCore) -> int:
+    """Tokens produced so far, read from the generation metrics"""
+    return int(sum(core.metrics.generated_tokens.values.values()))
+
+
+def run(core: AtlasCore, iterations: int) -> dict:
+    """Latency, responses and forward-pass counts for every sample prompt"""
+    bundle = core.active
+    main_counter = ForwardCounter(bundle["model"])
+    draft_counter = ForwardCounter(bundle["draft"]["model"]) if bundle["draft"] else None
+    tokens_before = generated_tokens(core)
+    latencies, responses = [], []
+
+    try:
+        for prompt, context in SAMPLE_PROMPTS:
+            for _ in range(iterations):
+                started = time.perf_counter()
+                response = core.generate_response(prompt, context)
+                latencies.append((time.perf_counter() - started) * 1000)
+            responses.append(response)
+    finally:
+        main_counter.remove()
+        if draft_counter:
+            draft_counter.remove()
+
+    tokens = generated_tokens(core) - tokens_before
+    result = {
+        'median_latency_ms': round(statistics.median(latencies), 2),
+        'generated_tokens': tokens,
+        'main_forward_passes': main_counter.calls,
+        'tokens_per_main_forward': round(tokens / main_counter.calls, 2) if main_counter.calls else 0,
+        'responses': responses
+    }
+    if draft_counter:
+        # Each verification pass keeps the accepted draft tokens plus one token of its own
+        accepted = tokens - main_counter.calls
+        result['draft_forward_passes'] = draft_counter.calls
+        result['acceptance_rate'] = round(max(0, accepted) / draft_counter.calls, 3) if draft_counter.calls else 0
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark assisted decoding with a draft model")
+    parser.add_argument('--draft-model', default="distilgpt2")
+    parser.add_argument('--num-assistant-tokens', nargs='+', type=int, default=[3, 5, 8])
+    parser.add_argument('--max-new-tokens', type=int, default=64)
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    core = AtlasCore()
+    # Greedy decoding to a fixed length: assisted output must match plain decoding token for token
+    core.config['response_cache']['deterministic'] = True
+    core.config['decoding']['default'].update({
+        'max_new_tokens': args.max_new_tokens,
+        'stop_at_newline': False,
+        'stop_strings': []
+    })
+    core.config['assisted_decoding'].update({'enabled': True, 'draft_model': args.draft_model, 'schedule': "constant"})
+    core.load_model()
+    bundle = core.active
+    if not core.model_loaded or not bundle["draft"]:
+        print("❌ Assisted decoding is not available for the loaded model")
+        return
+    draft = bundle["draft"]
+
+    bundle["draft"] = None
+    core.generate_response("Hello")  # warm-up
+    print("\n⏱️ Plain decoding...")
+    baseline = run(core, args.iterations)
+    results = [dict(baseline, mode="plain", num_assistant_tokens=0)]
+
+    bundle["draft"] = draft
+    for num_tokens in args.num_assistant_tokens:
+        draft["model"].generation_config.num_assistant_tokens = num_tokens
+        print(f"⏱️ Assisted decoding, {num_tokens} draft tokens...")
+        row = run(core, args.iterations)
+        row.update(
+            mode="assisted",
+            num_assistant_tokens=num_tokens,
+            speedup=round(baseline['median_latency_ms'] / row['median_latency_ms'], 2),
+            same_outputs=row['responses'] == baseline['responses']
+        )
+        results.append(row)
+
+    for row in results:
+        del row['responses']
+
+    print("\n📊 Assisted decoding")
+    print(f"{'mode':<10}{'draft':>6}{'latency ms':>12}{'tok/pass':>10}{'accept':>8}{'speedup':>9}{'same':>6}")
+    for row in results:
+        print(f"{row['mode']:<10}{row['num_assistant_tokens']:>6}{row['median_latency_ms']:>12}{row['tokens_per_main_forward']:>10}"
+              f"{str(row.get('acceptance_rate', '-')):>8}{str(row.get('speedup', '-')):>9}{str(row.get('same_outputs', '-')):>6}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Cancellation Check
+Aborts non-streaming requests mid-generation and checks that the server notices the disconnect, frees their
+continuous-batching rows and counts them as cancelled, instead of decoding answers nobody will read
+
+Runs against the same stand-in model as load_test.py, with long generations so the abort lands mid-decode.
+
+Usage: python benchmarks/benchmark_cancellation.py [--abort-after 1.0] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import socket
+import sys
+import tempfile
+import time
+
+import requests
+
+from load_test import build_stand_in_model, free_port, start_server, wait_until_ready
+
+# Long enough that every request is still decoding when its client goes away
+SERVER_OVERRIDES = {
+    "batching": {"mode": "continuous", "max_batch_size": 8},
+    "decoding": {"default": {"max_new_tokens": 900, "do_sample": False, "stop_at_newline": False, "stop_strings": []}},
+    "coalescing": {"enabled": False},
+    "deadlines": {"default_seconds": 300, "max_seconds": 300, "disconnect_poll_seconds": 0.25}
+}
+
+CASES = [
+    ("/chat", {"message": "Write a long plan for a small business"}),
+    ("/chat/batch", {"requests": [{"message": f"Long plan number {i}"} for i in range(4)]})
+]
+
+
+def abort_request(url: str, path: str, body: dict, abort_after: float):
+    """Send a POST, then close the connection before the response arrives"""
+    host, port = url.split("//", 1)[1].split(":")
+    payload = json.dumps(body).encode()
+    sock = socket.create_connection((host, int(port)))
+    sock.sendall(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+    )
+    time.sleep(abort_after)
+    sock.close()
+
+
+def cancelled_count(url: str) -> float:
+    text = requests.get(f"{url}/metrics", timeout=10).text
+    match = re.search(r'atlas_cancelled_requests_total\{reason="disconnected"\} ([0-9.e+]+)', text)
+    return float(match.group(1)) if match else 0.0
+
+
+def wait_until_idle(url: str, timeout: float) -> float:
+    """Seconds until the batcher holds no rows and no queued requests"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        batching = requests.get(f"{url}/status", timeout=10).json()["batching"]
+        if batching["active"] == 0 and batching["pending"] == 0:
+            return time.perf_counter() - started
+        time.sleep(0.1)
+    return float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that aborted non-streaming requests release their batch rows")
+    parser.add_argument('--abort-after', type=float, default=1.0, help="Seconds between sending a request and closing it")
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="atlas_cancellation_")
+    server = None
+    try:
+        print(f"🧪 Building stand-in model in {workdir}...")
+        build_stand_in_model(os.path.join(workdir, "atlas_model_loadtest"), 2, 128, 0)
+        port = free_port()
+        server = start_server(workdir, port, False, SERVER_OVERRIDES)
+        url = f"http://127.0.0.1:{port}"
+        wait_until_ready(url, server, args.timeout)
+
+        results = []
+        for path, body in CASES:
+            before = cancelled_count(url)
+            abort_request(url, path, body, args.abort_after)
+            active = requests.get(f"{url}/status", timeout=10).json()["batching"]["active"]
+            released_after = wait_until_idle(url, args.timeout)
+            cancelled = cancelled_count(url) - before
+            # A request counts once, however many rows it held
+            passed = released_after < args.timeout and cancelled >= 1
+            results.append({
+                "endpoint": path,
+                "rows_right_after_abort": active,
+                "released_after_seconds": round(released_after, 2),
+                "cancelled": cancelled,
+                "passed": passed
+            })
+            print(f"{'✅' if passed else '❌'} {path}: {active} rows at abort, idle after {released_after:.2f}s, "
+                  f"{cancelled:.0f} cancelled")
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"✅ Results saved to {args.output}")
+        if not all(result["passed"] for result in results):
+            sys.exit(1)
+
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Continuous Batching Benchmark
+Sustained tokens per second and per-class latency under a mix of short and long requests, comparing one request
+at a time, static micro-batching and continuous batching
+
+Usage: python benchmarks/benchmark_continuous.py [--concurrency 8] [--requests 48] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from atlas_app import AtlasCore, ENDPOINT_CONTEXTS
+from atlas_batcher import AtlasBatcher
+from atlas_continuous import ContinuousBatcher
+
+MODES = ("per_request", "static", "continuous")
+
+# Short interactive answers mixed with long research answers; lengths are fixed so every mode does the same work
+REQUEST_CLASSES = {
+    "short": {"endpoint": "chat", "context": None, "max_new_tokens": 16, "weight": 3, "prompts": [
+        "How to generate revenue with AI automation?",
+        "What should I do first in a cash emergency?",
+        "Give me one idea for a digital product"
+    ]},
+    "long": {"endpoint": "research", "context": ENDPOINT_CONTEXTS["research"], "max_new_tokens": 128, "weight": 1, "prompts": [
+        "Current trends in business automation",
+        "How are small companies adopting AI tools?"
+    ]}
+}
+
+
+def generated_tokens(core: AtlasCore) -> int:
+    """Tokens produced so far, read from the generation metrics"""
+    return int(sum(core.metrics.generated_tokens.values.values()))
+
+
+def percentile(samples: list, pct: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(pct / 100 * len(samples)))] if samples else 0
+
+
+def build_schedule(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    names = list(REQUEST_CLASSES)
+    weights = [REQUEST_CLASSES[name]["weight"] for name in names]
+    return [(name, rng.choice(REQUEST_CLASSES[name]["prompts"])) for name in rng.choices(names, weights=weights, k=count)]
+
+
+def make_batcher(core: AtlasCore, mode: str, max_batch_size: int):
+    if mode == "continuous":
+        return ContinuousBatcher(core, max_batch_size=max_batch_size)
+    if mode == "static":
+        return AtlasBatcher(core.generate_batch, max_batch_size=max_batch_size, batch_window_ms=15)
+    return AtlasBatcher(core.generate_batch, max_batch_size=1, batch_window_ms=0)
+
+
+async def run_mode(core: AtlasCore, mode: str, schedule: list, concurrency: int, max_batch_size: int) -> dict:
+    """Replay the schedule with a fixed number of closed-loop clients"""
+    batcher = make_batcher(core, mode, max_batch_size)
+    batcher.start()
+    pending = list(enumerate(schedule))
+    latencies = {name: [] for name in REQUEST_CLASSES}
+    responses = [None] * len(schedule)
+
+    async def client():
+        while pending:
+            index, (name, prompt) = pending.pop(0)
+            spec = REQUEST_CLASSES[name]
+            started = time.perf_counter()
+            responses[index] = await batcher.submit(prompt, spec["context"], None, spec["endpoint"])
+            latencies[name].append((time.perf_counter() - started) * 1000)
+
+    tokens_before = generated_tokens(core)
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    tokens = generated_tokens(core) - tokens_before
+    stats = batcher.get_stats()
+    await batcher.stop()
+
+    return {
+        'mode': mode,
+        'elapsed_seconds': round(elapsed, 2),
+        'generated_tokens': tokens,
+        'tokens_per_second': round(tokens / elapsed, 1),
+        'requests_per_second': round(len(schedule) / elapsed, 2),
+        'latency_ms': {
+            name: {
+                'p50': round(statistics.median(samples), 1) if samples else 0,
+                'p95': round(percentile(samples, 95), 1)
+            }
+            for name, samples in latencies.items()
+        },
+        'avg_batch_size': stats.get('avg_active_rows', stats.get('avg_batch_size')),
+        'responses': responses
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark continuous batching against the static and per-request paths")
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=MODES)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=48)
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    core = AtlasCore()
+    # Greedy decoding without stop conditions makes every mode generate exactly the same tokens
+    core.config['response_cache']['deterministic'] = True
+    for spec in REQUEST_CLASSES.values():
+        core.config['decoding'][spec['endpoint']] = {
+            'max_new_tokens': spec['max_new_tokens'],
+            'stop_at_newline': False,
+            'stop_strings': []
+        }
+    core.load_model()
+    if not core.model_loaded:
+        print("❌ No model could be loaded")
+        return
+
+    schedule = build_schedule(args.requests, args.seed)
+    # Warm-up
+    asyncio.run(run_mode(core, "per_request", schedule[:2], 1, 1))
+
+    results = []
+    for mode in args.modes:
+        print(f"\n⏱️ {mode}: {args.requests} requests, {args.concurrency} clients...")
+        results.append(asyncio.run(run_mode(core, mode, schedule, args.concurrency, args.max_batch_size)))
+
+    baseline = results[0]
+    for row in results:
+        row['speedup_vs_' + baseline['mode']] = round(row['tokens_per_second'] / baseline['tokens_per_second'], 2)
+        row['same_outputs_as_' + baseline['mode']] = row['responses'] == baseline['responses']
+    for row in results:
+        del row['responses']
+
+    print("\n📊 Batching modes")
+    print(f"{'mode':<13}{'tok/s':>8}{'req/s':>8}{'short p50':>11}{'short p95':>11}{'long p50':>10}{'long p95':>10}{'batch':>7}")
+    for row in results:
+        short, long = row['latency_ms']['short'], row['latency_ms']['long']
+        print(f"{row['mode']:<13}{row['tokens_per_second']:>8}{row['requests_per_second']:>8}{short['p50']:>11}"
+              f"{short['p95']:>11}{long['p50']:>10}{long['p95']:>10}{row['avg_batch_size']:>7}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
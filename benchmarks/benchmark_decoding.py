@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Decoding Policy Benchmark
+Generated tokens and latency per endpoint with and without early termination at the stop condition
+
+Usage: python benchmarks/benchmark_decoding.py [--iterations 3] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transformers import StoppingCriteriaList
+
+from atlas_app import AtlasCore, ENDPOINT_CONTEXTS
+
+SAMPLE_PROMPTS = [
+    "How to generate revenue with AI automation?",
+    "What are the best crisis management strategies?",
+    "How to analyze market trends effectively?",
+    "Write a short pitch for a freelance design service"
+]
+
+ENDPOINTS = ["chat"] + list(ENDPOINT_CONTEXTS)
+
+
+def generated_tokens(core: AtlasCore) -> int:
+    """Tokens produced so far, read from the generation metrics"""
+    return int(sum(core.metrics.generated_tokens.values.values()))
+
+
+def run_endpoint(core: AtlasCore, endpoint: str, iterations: int) -> dict:
+    """Latency, token count and responses for every sample prompt on one endpoint"""
+    context = ENDPOINT_CONTEXTS.get(endpoint)
+    latencies, responses = [], []
+    tokens_before = generated_tokens(core)
+
+    for prompt in SAMPLE_PROMPTS:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            response = core.generate_response(prompt, context, endpoint=endpoint)
+            latencies.append((time.perf_counter() - started) * 1000)
+        responses.append(response)
+
+    runs = len(SAMPLE_PROMPTS) * iterations
+    return {
+        'median_latency_ms': round(statistics.median(latencies), 2),
+        'tokens_per_request': round((generated_tokens(core) - tokens_before) / runs, 1),
+        'responses': responses
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark early termination of AtlasCore decoding policies")
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    core = AtlasCore()
+    # Greedy decoding so both runs produce the same text and only the amount of work differs
+    core.config['response_cache']['deterministic'] = True
+    core.config['prefix_cache']['enabled'] = False
+    core.load_model()
+    if not core.model_loaded:
+        raise RuntimeError("model failed to load")
+
+    policy_criteria = core.stopping_criteria
+    results = []
+    for endpoint in ENDPOINTS:
+        print(f"\n⏱️ Benchmarking /{endpoint}...")
+        # Before: run out max_new_tokens and trim afterwards, as generation did without stop criteria
+        core.stopping_criteria = lambda policy, bundle, input_length: StoppingCriteriaList()
+        before = run_endpoint(core, endpoint, args.iterations)
+        core.stopping_criteria = policy_criteria
+        after = run_endpoint(core, endpoint, args.iterations)
+
+        results.append({
+            'endpoint': endpoint,
+            'policy': core.decoding_policy(endpoint),
+            'before': {k: v for k, v in before.items() if k != 'responses'},
+            'after': {k: v for k, v in after.items() if k != 'responses'},
+            'identical_responses': before['responses'] == after['responses'],
+            'token_reduction': round(1 - after['tokens_per_request'] / before['tokens_per_request'], 3)
+            if before['tokens_per_request'] else None,
+            'speedup': round(before['median_latency_ms'] / after['median_latency_ms'], 2)
+            if after['median_latency_ms'] else None
+        })
+
+    print("\n📊 Early termination")
+    print(f"{'endpoint':<10}{'tokens before':>15}{'tokens after':>14}{'ms before':>11}{'ms after':>10}{'speedup':>9}{'same':>6}")
+    for row in results:
+        print(f"{row['endpoint']:<10}{row['before']['tokens_per_request']:>15}{row['after']['tokens_per_request']:>14}"
+              f"{row['before']['median_latency_ms']:>11}{row['after']['median_latency_ms']:>10}"
+              f"{str(row['speedup']):>9}{'yes' if row['identical_responses'] else 'no':>6}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
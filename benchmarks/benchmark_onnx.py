@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - ONNX Runtime Backend Benchmark
+Compares the torch and onnxruntime backends side by side on latency, memory and output agreement
+
+Usage: python benchmarks/benchmark_onnx.py [--backends torch onnx] [--new-tokens 32] [--output results.json]
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil
+import torch
+
+from atlas_app import AtlasCore
+
+BACKENDS = ("torch", "onnx")
+
+SAMPLE_PROMPTS = [
+    "How to generate revenue with AI automation?",
+    "What are the best crisis management strategies?",
+    "How to analyze market trends effectively?"
+]
+
+
+def rss_mb() -> float:
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def greedy_tokens(core: AtlasCore, prompts: list, new_tokens: int) -> list:
+    """Greedy continuation token ids, generated through whichever model the bundle holds"""
+    inputs = core.encode_inputs([core.build_input_text(prompt) for prompt in prompts])
+    with torch.no_grad():
+        output = core.model.generate(
+            input_ids=inputs['input_ids'],
+            attention_mask=inputs['attention_mask'],
+            max_new_tokens=new_tokens,
+            do_sample=False,
+            pad_token_id=core.tokenizer.pad_token_id
+        )
+    return output[:, inputs['input_ids'].shape[1]:].tolist()
+
+
+def median_ms(fn, iterations: int) -> float:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def benchmark_backend(backend: str, new_tokens: int, iterations: int) -> dict:
+    """Load the newest checkpoint on one backend and measure it"""
+    gc.collect()
+    rss_before = rss_mb()
+
+    core = AtlasCore()
+    core.config['inference']['backend'] = backend
+    core.config['response_cache']['deterministic'] = True
+    started = time.perf_counter()
+    core.load_model()
+    load_seconds = time.perf_counter() - started
+    if not core.model_loaded or core.active['backend'] != backend:
+        raise RuntimeError(f"{backend} backend failed to load")
+
+    rss_loaded = rss_mb()
+    greedy_tokens(core, SAMPLE_PROMPTS[:1], 2)  # warm-up
+
+    single_ms = median_ms(lambda: greedy_tokens(core, SAMPLE_PROMPTS[:1], new_tokens), iterations)
+    batch_ms = median_ms(lambda: greedy_tokens(core, SAMPLE_PROMPTS, new_tokens), iterations)
+    endpoint_ms = median_ms(lambda: core.generate_response(SAMPLE_PROMPTS[0], endpoint="chat"), iterations)
+
+    result = {
+        'backend': backend,
+        'model_path': core.load_state['model_path'],
+        'load_seconds': round(load_seconds, 2),
+        'rss_after_load_mb': round(rss_loaded - rss_before, 2),
+        'rss_after_run_mb': round(rss_mb() - rss_before, 2),
+        'single_ms': round(single_ms, 2),
+        'single_ms_per_token': round(single_ms / new_tokens, 3),
+        'batch_ms': round(batch_ms, 2),
+        'batch_ms_per_token': round(batch_ms / new_tokens, 3),
+        'chat_response_ms': round(endpoint_ms, 2),
+        'outputs': greedy_tokens(core, SAMPLE_PROMPTS, new_tokens)
+    }
+
+    del core
+    gc.collect()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the torch and onnxruntime inference backends")
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--new-tokens', type=int, default=32)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    for backend in args.backends:
+        print(f"\n⏱️ Benchmarking {backend}...")
+        try:
+            results.append(benchmark_backend(backend, args.new_tokens, args.iterations))
+        except Exception as e:
+            print(f"❌ {backend} failed: {e}")
+
+    # Greedy outputs should match the torch backend token for token
+    baseline = next((r for r in results if r['backend'] == 'torch'), None)
+    for row in results:
+        if baseline:
+            pairs = [(a, b) for ours, ref in zip(row['outputs'], baseline['outputs']) for a, b in zip(ours, ref)]
+            row['token_agreement_vs_torch'] = round(sum(a == b for a, b in pairs) / len(pairs), 3) if pairs else None
+    for row in results:
+        del row['outputs']
+
+    print("\n📊 Backend comparison")
+    print(f"{'backend':<8}{'load s':>8}{'RSS MB':>9}{'1x ms/tok':>11}{'3x ms/tok':>11}{'/chat ms':>10}{'agree':>8}")
+    for row in results:
+        print(f"{row['backend']:<8}{row['load_seconds']:>8}{row['rss_after_run_mb']:>9}{row['single_ms_per_token']:>11}"
+              f"{row['batch_ms_per_token']:>11}{row['chat_response_ms']:>10}{str(row.get('token_agreement_vs_torch', '-')):>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
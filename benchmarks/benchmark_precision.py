@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Precision Mode Benchmark
+Compares fp32, bf16 and int8 inference on latency, memory footprint and output quality
+
+Usage: python benchmarks/benchmark_precision.py [--modes fp32 bf16 int8] [--new-tokens 32] [--output results.json]
+"""
+
+import argparse
+import gc
+import io
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil
+import torch
+
+from atlas_app import AtlasCore
+from atlas_precision import PRECISION_MODES
+
+SAMPLE_PROMPTS = [
+    "How to generate revenue with AI automation?",
+    "What are the best crisis management strategies?",
+    "How to analyze market trends effectively?"
+]
+
+REFERENCE_TEXTS = [
+    "User: How to generate revenue with AI automation?\nAtlas: Build automated content systems, intelligent lead generation tools and AI-powered consulting services.",
+    "User: What are the best crisis management strategies?\nAtlas: Assess the situation objectively, secure financial stability and communicate transparently with stakeholders."
+]
+
+
+def model_size_mb(model) -> float:
+    """Serialized size of the weights, which counts packed int8 parameters correctly"""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+def perplexity(core: AtlasCore) -> float:
+    """Average perplexity over the reference texts"""
+    losses = []
+    for text in REFERENCE_TEXTS:
+        ids = core.tokenizer(text, return_tensors='pt')['input_ids'].to(core.model.device)
+        with torch.no_grad():
+            losses.append(core.model(input_ids=ids, labels=ids).loss.float().item())
+    return math.exp(statistics.mean(losses))
+
+
+def greedy_tokens(core: AtlasCore, prompt: str, new_tokens: int) -> list:
+    """Greedy continuation token ids for one prompt"""
+    inputs = core.encode_inputs([core.build_input_text(prompt)])
+    with torch.no_grad():
+        output = core.model.generate(
+            input_ids=inputs['input_ids'].to(core.model.device),
+            attention_mask=inputs['attention_mask'].to(core.model.device),
+            max_new_tokens=new_tokens,
+            min_new_tokens=new_tokens,
+            do_sample=False,
+            pad_token_id=core.tokenizer.pad_token_id
+        )
+    return output[0, inputs['input_ids'].shape[1]:].tolist()
+
+
+def benchmark_mode(precision: str, new_tokens: int, iterations: int) -> dict:
+    """Load the model in one precision mode and measure it"""
+    gc.collect()
+    rss_before = psutil.Process().memory_info().rss
+
+    core = AtlasCore()
+    core.config['inference']['precision'] = precision
+    core.config['prefix_cache']['enabled'] = False
+    core.load_model()
+    if not core.model_loaded:
+        raise RuntimeError("model failed to load")
+
+    rss_after = psutil.Process().memory_info().rss
+    greedy_tokens(core, SAMPLE_PROMPTS[0], 2)  # warm-up
+
+    latencies, outputs = [], []
+    for prompt in SAMPLE_PROMPTS:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            tokens = greedy_tokens(core, prompt, new_tokens)
+            latencies.append((time.perf_counter() - started) * 1000)
+        outputs.append(tokens)
+
+    result = {
+        'precision': precision,
+        'model_path': core.load_state['model_path'],
+        'weights_mb': round(model_size_mb(core.model), 2),
+        'rss_delta_mb': round((rss_after - rss_before) / (1024 * 1024), 2),
+        'median_latency_ms': round(statistics.median(latencies), 2),
+        'ms_per_token': round(statistics.median(latencies) / new_tokens, 3),
+        'perplexity': round(perplexity(core), 3),
+        'outputs': outputs
+    }
+
+    del core
+    gc.collect()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AtlasCore inference precision modes")
+    parser.add_argument('--modes', nargs='+', default=list(PRECISION_MODES), choices=PRECISION_MODES)
+    parser.add_argument('--new-tokens', type=int, default=32)
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    for precision in args.modes:
+        print(f"\n⏱️ Benchmarking {precision}...")
+        try:
+            results.append(benchmark_mode(precision, args.new_tokens, args.iterations))
+        except Exception as e:
+            print(f"❌ {precision} failed: {e}")
+
+    # Quality check: greedy token agreement with the fp32 baseline
+    baseline = next((r for r in results if r['precision'] == 'fp32'), None)
+    for row in results:
+        if baseline:
+            matches = sum(a == b for ours, ref in zip(row['outputs'], baseline['outputs']) for a, b in zip(ours, ref))
+            total = sum(len(ref) for ref in baseline['outputs'])
+            row['token_agreement_vs_fp32'] = round(matches / total, 3) if total else None
+    for row in results:
+        del row['outputs']
+
+    print("\n📊 Precision comparison")
+    print(f"{'mode':<7}{'weights MB':>12}{'RSS Δ MB':>10}{'median ms':>11}{'ms/token':>10}{'ppl':>10}{'agree':>8}")
+    for row in results:
+        print(f"{row['precision']:<7}{row['weights_mb']:>12}{row['rss_delta_mb']:>10}{row['median_latency_ms']:>11}"
+              f"{row['ms_per_token']:>10}{row['perplexity']:>10}{str(row.get('token_agreement_vs_fp32', '-')):>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
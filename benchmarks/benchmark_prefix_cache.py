@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - Prefix KV-Cache Benchmark
+Measures prefill time per endpoint with and without the precomputed context prefix
+
+Usage: python benchmarks/benchmark_prefix_cache.py [--iterations 20] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+
+from atlas_app import ENDPOINT_CONTEXTS, atlas_core
+from atlas_generation import clone_cache
+
+SAMPLE_PROMPTS = [
+    "How to generate revenue with AI automation?",
+    "What are the best crisis management strategies for a small business?",
+    "Analyze the market trends for digital products in 2025 and suggest a launch plan"
+]
+
+
+def time_forward(fn, iterations: int) -> float:
+    """Median wall time of fn() in milliseconds"""
+    fn()  # warm-up
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def benchmark_endpoint(endpoint: str, context: str, iterations: int) -> dict:
+    """Compare full prefill against suffix-only prefill over the cached prefix"""
+    model = atlas_core.model
+    prefix = atlas_core.prefix_cache[context]
+    full_ms, cached_ms, full_tokens, suffix_tokens = [], [], [], []
+
+    for prompt in SAMPLE_PROMPTS:
+        full = atlas_core.encode_inputs([atlas_core.build_input_text(prompt, context)])
+        suffix = atlas_core.encode_inputs([atlas_core.build_suffix_text(prompt)], max_length=400 - prefix['length'])
+        full_ids = full['input_ids'].to(model.device)
+        suffix_ids = suffix['input_ids'].to(model.device)
+
+        def run_full():
+            with torch.no_grad():
+                model(input_ids=full_ids, use_cache=True)
+
+        def run_cached():
+            with torch.no_grad():
+                model(input_ids=suffix_ids, past_key_values=clone_cache(prefix['past_key_values']), use_cache=True)
+
+        full_ms.append(time_forward(run_full, iterations))
+        cached_ms.append(time_forward(run_cached, iterations))
+        full_tokens.append(full_ids.shape[1])
+        suffix_tokens.append(suffix_ids.shape[1])
+
+    full_avg = statistics.mean(full_ms)
+    cached_avg = statistics.mean(cached_ms)
+    return {
+        'endpoint': f"/{endpoint}",
+        'prefix_tokens': prefix['length'],
+        'avg_full_tokens': round(statistics.mean(full_tokens), 1),
+        'avg_suffix_tokens': round(statistics.mean(suffix_tokens), 1),
+        'full_prefill_ms': round(full_avg, 3),
+        'cached_prefill_ms': round(cached_avg, 3),
+        'savings_pct': round(100 * (1 - cached_avg / full_avg), 1) if full_avg else 0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prefix KV-cache prefill savings")
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    atlas_core.initialize()
+    if not atlas_core.model_loaded or not atlas_core.prefix_cache:
+        print("❌ No model or prefix cache available, nothing to benchmark")
+        sys.exit(1)
+
+    torch.set_grad_enabled(False)
+    results = []
+    for endpoint, context in ENDPOINT_CONTEXTS.items():
+        if context in atlas_core.prefix_cache:
+            results.append(benchmark_endpoint(endpoint, context, args.iterations))
+
+    print("\n📊 Prefill latency per endpoint (median ms, averaged over sample prompts)")
+    print(f"{'endpoint':<12}{'prefix':>8}{'full tok':>10}{'suffix tok':>12}{'full ms':>10}{'cached ms':>11}{'saved':>8}")
+    for row in results:
+        print(f"{row['endpoint']:<12}{row['prefix_tokens']:>8}{row['avg_full_tokens']:>10}{row['avg_suffix_tokens']:>12}"
+              f"{row['full_prefill_ms']:>10}{row['cached_prefill_ms']:>11}{row['savings_pct']:>7}%")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Atlas IA - API Load Test
+Replays a prompt mix against atlas_app at stepped concurrency and reports per-endpoint throughput,
+p50/p95/p99 latency and error rate
+
+By default a tiny randomly initialized GPT-2 with a locally trained BPE tokenizer is built in a temporary
+directory and atlas_app is started against it, so nothing is downloaded. Pass --url to load an already
+running server instead.
+
+Usage: python benchmarks/load_test.py [--concurrency 1 2 4 8] [--requests 40] [--mix mix.json] [--output results.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import requests
+
+# Each entry is replayed with probability proportional to its weight
+DEFAULT_MIX = [
+    {"endpoint": "/chat", "weight": 4, "messages": [
+        "How to generate revenue with AI automation?",
+        "What should I do first in a cash emergency?",
+        "Give me one idea for a digital product"
+    ]},
+    {"endpoint": "/analyze", "weight": 2, "messages": [
+        "Analyze the market for AI consulting services",
+        "What are the risks of relying on a single client?"
+    ]},
+    {"endpoint": "/generate", "weight": 1, "messages": ["Write a short pitch for a freelance design service"]},
+    {"endpoint": "/research", "weight": 1, "messages": ["Current trends in business automation"]},
+    {"endpoint": "/chat/stream", "weight": 1, "messages": ["How do I find my first customers?"]}
+]
+
+# Text the stand-in tokenizer is trained on
+TOKENIZER_CORPUS = ["atlas_dataset.jsonl", "knowledge_base.json", "README.md", "atlas_app.py"]
+
+
+def build_stand_in_model(model_dir: str, layers: int, hidden: int, seed: int):
+    """Save a randomly initialized GPT-2 and a small byte-level BPE tokenizer as an atlas_model_* checkpoint"""
+    import torch
+    from tokenizers import ByteLevelBPETokenizer
+    from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+
+    texts = []
+    for name in TOKENIZER_CORPUS:
+        path = os.path.join(REPO_ROOT, name)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                texts.append(f.read())
+
+    bpe = ByteLevelBPETokenizer()
+    bpe.train_from_iterator(texts, vocab_size=1000, special_tokens=["<|endoftext|>"], show_progress=False)
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=bpe._tokenizer,
+        bos_token="<|endoftext|>",
+        eos_token="<|endoftext|>",
+        unk_token="<|endoftext|>"
+    )
+    tokenizer.save_pretrained(model_dir)
+
+    torch.manual_seed(seed)
+    config = GPT2Config(
+        vocab_size=len(tokenizer),
+        n_layer=layers,
+        n_embd=hidden,
+        n_head=max(1, hidden // 32),
+        n_positions=1024,
+        bos_token_id=tokenizer.eos_token_id,
+        eos_token_id=tokenizer.eos_token_id
+    )
+    GPT2LMHeadModel(config).save_pretrained(model_dir)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir: str, port: int, enable_cache: bool, overrides: Optional[Dict] = None) -> subprocess.Popen:
+    """Run atlas_app under uvicorn with the stand-in model as the only checkpoint; overrides replace config sections"""
+    config_path = os.path.join(workdir, "serving_config.json")
+    with open(config_path, 'w') as f:
+        json.dump({
+            "model_registry": {"enabled": False},
+            "response_cache": {"enabled": enable_cache},
+            # Every load-test request comes from one address; per-client budgets would measure the rate limiter instead
+            "scheduling": {"enabled": False},
+            **(overrides or {})
+        }, f)
+
+    env = dict(os.environ)
+    env.update({
+        "ATLAS_SERVING_CONFIG": config_path,
+        "PYTHONPATH": REPO_ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+        "HF_HUB_OFFLINE": "1",
+        "TRANSFORMERS_OFFLINE": "1"
+    })
+    log = open(os.path.join(workdir, "server.log"), 'w')
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "atlas_app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+def wait_until_ready(url: str, server: subprocess.Popen, timeout: float):
+    """Poll the readiness probe until the model is loaded and warmed up"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}")
+        try:
+            response = requests.get(f"{url}/ready", timeout=2)
+            if response.status_code == 200:
+                if not response.json().get("model_loaded"):
+                    print("⚠️ Server is ready without a model; results measure fallback responses only")
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server not ready after {timeout:.0f}s")
+
+
+def percentile(samples: list, pct: float) -> float:
+    """Nearest-rank percentile of already sorted samples"""
+    if not samples:
+        return 0
+    index = max(0, min(len(samples) - 1, math.ceil(pct / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+def build_schedule(mix: list, count: int, rng: random.Random) -> list:
+    """Draw count (endpoint, message) pairs from the weighted mix"""
+    weights = [entry.get("weight", 1) for entry in mix]
+    schedule = []
+    for entry in rng.choices(mix, weights=weights, k=count):
+        schedule.append((entry["endpoint"], rng.choice(entry["messages"])))
+    return schedule
+
+
+def send(session: requests.Session, url: str, endpoint: str, message: str, timeout: float) -> dict:
+    """One request; streams are timed until the last event arrives"""
+    started = time.perf_counter()
+    try:
+        response = session.post(f"{url}{endpoint}", json={"message": message}, timeout=timeout)
+        status = response.status_code
+        error = None if status == 200 else response.text[:200]
+        if status == 200 and endpoint.endswith("/stream") and "event: done" not in response.text:
+            error = "stream ended without a done event"
+    except requests.RequestException as e:
+        status, error = None, str(e)
+    return {
+        "endpoint": endpoint,
+        "status": status,
+        "error": error,
+        "latency_ms": (time.perf_counter() - started) * 1000
+    }
+
+
+def run_level(url: str, concurrency: int, schedule: list, timeout: float) -> dict:
+    """Replay the schedule with a fixed number of concurrent clients"""
+    local = threading.local()
+
+    def worker(item):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return send(local.session, url, item[0], item[1], timeout)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, schedule))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "elapsed_seconds": round(elapsed, 3),
+        "overall": summarize(results, elapsed),
+        "endpoints": {
+            endpoint: summarize([r for r in results if r["endpoint"] == endpoint], elapsed)
+            for endpoint in sorted({r["endpoint"] for r in results})
+        }
+    }
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    """Throughput, latency percentiles and error rate for a set of requests"""
+    latencies = sorted(r["latency_ms"] for r in results if r["error"] is None)
+    errors = [r for r in results if r["error"] is not None]
+    statuses = {}
+    for r in results:
+        key = str(r["status"]) if r["status"] is not None else "connection_error"
+        statuses[key] = statuses.get(key, 0) + 1
+
+    return {
+        "requests": len(results),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "error_rate": round(len(errors) / len(results), 4) if results else 0,
+        "status_codes": statuses
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the AtlasCore API at stepped concurrency")
+    parser.add_argument('--url', help="Target a running server instead of starting one with the stand-in model")
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 2, 4, 8])
+    parser.add_argument('--requests', type=int, default=40, help="Requests per concurrency level")
+    parser.add_argument('--mix', help="JSON file with a prompt mix, in the same shape as DEFAULT_MIX")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument('--layers', type=int, default=2, help="Stand-in model depth")
+    parser.add_argument('--hidden', type=int, default=128, help="Stand-in model width")
+    parser.add_argument('--enable-cache', action='store_true', help="Keep the response cache on in the started server")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    mix = DEFAULT_MIX
+    if args.mix:
+        with open(args.mix, 'r') as f:
+            mix = json.load(f)
+
+    workdir, server, url = None, None, args.url
+    try:
+        if url is None:
+            workdir = tempfile.mkdtemp(prefix="atlas_load_test_")
+            print(f"🧪 Building stand-in model in {workdir}...")
+            build_stand_in_model(os.path.join(workdir, "atlas_model_loadtest"), args.layers, args.hidden, args.seed)
+            port = free_port()
+            server = start_server(workdir, port, args.enable_cache)
+            url = f"http://127.0.0.1:{port}"
+        url = url.rstrip('/')
+
+        print(f"⏳ Waiting for {url}/ready...")
+        try:
+            wait_until_ready(url, server, args.timeout)
+        except RuntimeError:
+            if workdir:
+                with open(os.path.join(workdir, "server.log"), 'r') as f:
+                    print(f.read()[-2000:])
+            raise
+
+        rng = random.Random(args.seed)
+        levels = []
+        for concurrency in args.concurrency:
+            print(f"\n⏱️ Concurrency {concurrency}: {args.requests} requests...")
+            level = run_level(url, concurrency, build_schedule(mix, args.requests, rng), args.timeout)
+            levels.append(level)
+            overall = level["overall"]
+            print(f"   {overall['throughput_rps']} req/s, p50 {overall['p50_ms']}ms, p95 {overall['p95_ms']}ms, "
+                  f"p99 {overall['p99_ms']}ms, errors {overall['error_rate']:.1%}")
+
+        results = {
+            "target": args.url or "stand-in",
+            "requests_per_level": args.requests,
+            "seed": args.seed,
+            "levels": levels
+        }
+
+        print("\n📊 Per-endpoint results")
+        print(f"{'conc':>5} {'endpoint':<14}{'req/s':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for level in levels:
+            for endpoint, row in level["endpoints"].items():
+                print(f"{level['concurrency']:>5} {endpoint:<14}{row['throughput_rps']:>8}{row['p50_ms']:>10}"
+                      f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['error_rate']:>8.1%}")
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"✅ Results saved to {args.output}")
+        else:
+            print(json.dumps(results, indent=2))
+
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()